@@ -0,0 +1,321 @@
+import random
+import re
+import threading
+import time
+from datetime import UTC, datetime
+from email.utils import parsedate_to_datetime
+
+import requests
+from metrics import RequestMetrics
+from openhexa.sdk import current_run
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+# Statuses worth retrying: throttling and transient gateway/server failures
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+THROTTLE_STATUSES = frozenset({429, 503})
+
+# Methods that can be sent again without side effects. Others (POST, PATCH) are only
+# retried when the server cannot have handled them: connection never established, or
+# request refused with 429/503.
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE", "TRACE"})
+
+# Connection pools kept per session (one per host) and connections kept per host
+POOL_CONNECTIONS = 10
+DEFAULT_POOL_MAXSIZE = 10
+
+# Keep connections open between requests and let servers compress responses
+POOLED_SESSION_HEADERS = {"Accept-Encoding": "gzip, deflate", "Connection": "keep-alive"}
+
+# Path segments identifying a resource, replaced by a placeholder in endpoint templates
+ID_SEGMENT = re.compile(r"^\d+$")
+UUID_SEGMENT = re.compile(r"^(uuid:)?[0-9a-f]{8}(-?[0-9a-f]{4}){3}-?[0-9a-f]{12}$", re.IGNORECASE)
+
+
+class TokenBucket:
+    """Adaptive token-bucket rate limiter shared by all the requests of a run.
+
+    Tokens refill at the current rate, up to `burst` tokens. When the server throttles
+    (429/503), the rate is halved and every caller is paused for the `Retry-After`
+    delay; while requests succeed, the rate then grows back by about one request per
+    second every second, up to `max_rate`. A `max_rate` of 0 disables rate limiting.
+    """
+
+    def __init__(self, max_rate: float, burst: int | None = None, min_rate: float = 0.5):
+        self.max_rate = max_rate
+        self.min_rate = min(min_rate, max_rate) if max_rate > 0 else 0
+        self.rate = max_rate
+        self.burst = burst or max(1, int(max_rate))
+        self._tokens = float(self.burst)
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Block until a request is allowed to be sent."""
+        if self.max_rate <= 0:
+            return
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now >= self._paused_until:
+                    elapsed = now - self._updated_at
+                    self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+                    self._updated_at = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = (1 - self._tokens) / self.rate
+                else:
+                    wait = self._paused_until - now
+            time.sleep(wait)
+
+    def throttled(self, retry_after: float | None = None) -> None:
+        """Slow down after the server signalled it is overloaded.
+
+        Args:
+            retry_after (float | None): Delay requested by the server, in seconds.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self.max_rate > 0:
+                self.rate = max(self.min_rate, self.rate / 2)
+                self._tokens = min(self._tokens, 0)
+                self._updated_at = now
+            if retry_after:
+                self._paused_until = max(self._paused_until, now + retry_after)
+
+    def succeeded(self) -> None:
+        """Grow the rate back towards `max_rate` after a successful request."""
+        if self.max_rate <= 0 or self.rate >= self.max_rate:
+            return
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + 1 / max(self.rate, 1))
+
+
+class ResilientAdapter(HTTPAdapter):
+    """HTTP adapter adding rate limiting and retries to every request of a session.
+
+    Requests are retried with exponential backoff and full jitter, honouring the
+    `Retry-After` header when the server sends one:
+    - GET, HEAD, OPTIONS, PUT, DELETE and TRACE on connection errors, timeouts and
+      429/502/503/504 responses.
+    - POST and PATCH only when the connection could not be established (connect
+      timeout, refused connection, unresolved host) and on 429/503 responses. After a
+      read timeout or a 502/504 the server may have handled the request already, and
+      sending it again could create a duplicate instance or edit.
+
+    Mounted on the IASO API client, it covers both the pipeline's own calls and the ones
+    made by the OpenHEXA toolbox.
+
+    When `metrics` is given, every attempt is recorded there with its endpoint, status,
+    latency and payload sizes.
+    """
+
+    def __init__(
+        self,
+        limiter: TokenBucket | None = None,
+        retries: int = 5,
+        backoff_factor: float = 0.5,
+        backoff_max: float = 60.0,
+        metrics: RequestMetrics | None = None,
+        **kwargs: object,
+    ):
+        super().__init__(**kwargs)
+        self.limiter = limiter
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.backoff_max = backoff_max
+        self.metrics = metrics
+
+    def send(self, request: requests.PreparedRequest, **kwargs: object) -> requests.Response:
+        """Send a request, retrying transient failures.
+
+        Returns:
+            requests.Response: The last response received from the server.
+        """
+        attempt = 0
+        while True:
+            if self.limiter is not None:
+                self.limiter.acquire()
+
+            started_at = time.perf_counter()
+            try:
+                response = super().send(request, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as exc:
+                self._record(request, type(exc).__name__, started_at, attempt)
+                if attempt >= self.retries or not (
+                    request.method in IDEMPOTENT_METHODS or _not_sent(exc)
+                ):
+                    raise
+                delay = self._backoff(attempt)
+                current_run.log_warning(
+                    f"{request.method} {request.path_url} failed ({exc}), "
+                    f"retrying in {delay:.1f}s ({attempt + 1}/{self.retries})"
+                )
+            else:
+                self._record(request, response, started_at, attempt, bool(kwargs.get("stream")))
+                retry_statuses = (
+                    RETRY_STATUSES if request.method in IDEMPOTENT_METHODS else THROTTLE_STATUSES
+                )
+                if response.status_code not in retry_statuses or attempt >= self.retries:
+                    if self.limiter is not None and response.status_code < 400:
+                        self.limiter.succeeded()
+                    return response
+
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                if self.limiter is not None and response.status_code in THROTTLE_STATUSES:
+                    self.limiter.throttled(retry_after)
+                delay = max(retry_after or 0, self._backoff(attempt))
+                current_run.log_warning(
+                    f"{request.method} {request.path_url} returned {response.status_code}, "
+                    f"retrying in {delay:.1f}s ({attempt + 1}/{self.retries})"
+                )
+                response.close()
+
+            attempt += 1
+            time.sleep(delay)
+
+    def _record(
+        self,
+        request: requests.PreparedRequest,
+        outcome: requests.Response | str,
+        started_at: float,
+        attempt: int,
+        stream: bool = False,
+    ) -> None:
+        if self.metrics is None:
+            return
+        if isinstance(outcome, str):
+            status, received = outcome, 0
+        elif stream:
+            # Reading the body would defeat streaming, trust the announced size
+            status, received = outcome.status_code, int(outcome.headers.get("Content-Length") or 0)
+        else:
+            # Read now as requests would right after, so the latency covers the download
+            status, received = outcome.status_code, len(outcome.content)
+        body = request.body
+        self.metrics.add(
+            f"{request.method} {endpoint_template(request.path_url)}",
+            status,
+            time.perf_counter() - started_at,
+            bytes_sent=len(body) if isinstance(body, bytes | str) else 0,
+            bytes_received=received,
+            retry=attempt > 0,
+        )
+
+    def _backoff(self, attempt: int) -> float:
+        # Exponential backoff with full jitter
+        return random.uniform(0, min(self.backoff_max, self.backoff_factor * 2**attempt))
+
+
+def _not_sent(exc: requests.RequestException) -> bool:
+    """Whether a request failed before reaching the server, so it is safe to send again.
+
+    Returns:
+        bool: True for connect timeouts and connections that could not be opened.
+    """
+    if isinstance(exc, requests.ConnectTimeout):
+        return True
+    reason = getattr(exc.args[0], "reason", None) if exc.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Parse a `Retry-After` header given either in seconds or as an HTTP date.
+
+    Args:
+        value (str | None): Raw header value.
+
+    Returns:
+        float | None: Delay in seconds, or None if the header is missing or invalid.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=UTC)
+    return max(0.0, (retry_at - datetime.now(UTC)).total_seconds())
+
+
+def endpoint_template(path_url: str) -> str:
+    """Return the template of a request path, grouping the requests to the same endpoint.
+
+    Numeric IDs and UUIDs are replaced by `{id}` and `{uuid}`, and the query string is
+    dropped, e.g. `/api/instances/42/?fields=id` becomes `/api/instances/{id}/`.
+
+    Returns:
+        str: The path template.
+    """
+    path = path_url.split("?", 1)[0]
+    return "/".join(
+        "{id}"
+        if ID_SEGMENT.match(segment)
+        else "{uuid}"
+        if UUID_SEGMENT.match(segment)
+        else segment
+        for segment in path.split("/")
+    )
+
+
+def mount_resilient_adapter(
+    session: requests.Session,
+    limiter: TokenBucket | None = None,
+    retries: int = 5,
+    pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+    metrics: RequestMetrics | None = None,
+) -> ResilientAdapter:
+    """Mount a pooled `ResilientAdapter` on a session for both HTTP and HTTPS.
+
+    Connections are kept alive and reused between requests, with at most
+    `pool_maxsize` connections per host: it should match the number of requests the
+    pipeline sends concurrently, further requests waiting for a free connection
+    instead of opening short-lived ones.
+
+    Args:
+        session (requests.Session): Session to configure, e.g. `iaso.api_client`.
+        limiter (TokenBucket | None): Rate limiter shared by the run.
+        retries (int): Maximum number of retries per request.
+        pool_maxsize (int): Maximum number of connections per host.
+        metrics (RequestMetrics | None): Collector of the requests sent by the session.
+
+    Returns:
+        ResilientAdapter: The mounted adapter.
+    """
+    adapter = ResilientAdapter(
+        limiter=limiter,
+        retries=retries,
+        metrics=metrics,
+        pool_connections=POOL_CONNECTIONS,
+        pool_maxsize=max(1, pool_maxsize),
+        pool_block=True,
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update(POOLED_SESSION_HEADERS)
+    return adapter
+
+
+def session_sharing_adapters(session: requests.Session) -> requests.Session:
+    """Return a new session reusing the transport adapters of `session`.
+
+    Requests sent to other hosts (e.g. Enketo, or XLS files in object storage) then
+    reuse the same connection pools, rate limiter and retry policy as the IASO API
+    client.
+
+    Returns:
+        requests.Session: A session without IASO default headers or authentication.
+    """
+    new_session = requests.Session()
+    new_session.headers.update(POOLED_SESSION_HEADERS)
+    for prefix, adapter in session.adapters.items():
+        new_session.mount(prefix, adapter)
+    return new_session
@@ -0,0 +1,340 @@
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+
+import polars as pl
+import requests
+from openhexa.sdk import current_run
+from openhexa.toolbox.iaso import IASO, dataframe
+
+# Maximum size of the form metadata cache, oldest used entries are evicted first
+METADATA_CACHE_MAX_BYTES = 256 * 1024 * 1024
+# Sheets of a version in the form metadata of `dataframe.get_form_metadata`
+TOOLBOX_SHEETS = ("questions", "choices")
+# Column of the cached rows holding their question name or choice list
+_KEY_COLUMN = "__key__"
+
+
+def _safe_name(value: object) -> str:
+    """Turn a form or version ID into a file name.
+
+    Returns:
+        str: The ID, with characters other than letters, digits, `-` and `_` replaced.
+    """
+    return "".join(c if c.isalnum() or c in "-_" else "_" for c in str(value)) or "_"
+
+
+def _empty_marker(sheet_path: Path) -> Path:
+    """Return the marker file standing for a sheet without columns.
+
+    Returns:
+        Path: The path of the sheet, with the `.empty` suffix.
+    """
+    return sheet_path.with_suffix(".empty")
+
+
+def _is_cached(sheet_path: Path) -> bool:
+    return sheet_path.exists() or _empty_marker(sheet_path).exists()
+
+
+class FormMetadataCache:
+    """Workspace-level cache of the parsed XLSForm sheets of form versions.
+
+    Sheets are stored as Parquet, keyed by form ID, version ID and a digest of the XLS
+    file: its ETag, or the hash of its content when the server sends none. The
+    validators of the cached file are sent with the next download of the same version
+    (`If-None-Match`/`If-Modified-Since`), so an unchanged file is neither downloaded
+    nor parsed again. Entries least recently used are evicted once the cache grows
+    beyond `max_bytes`.
+
+    Layout: `<directory>/<form_id>/<version_id>/current.json` holds the digest and
+    validators of the latest file seen, `<directory>/<form_id>/<version_id>/<digest>/`
+    its parsed sheets. Sheets without columns (e.g. the choices of a form without any)
+    are not written as Parquet: an empty `<sheet>.empty` marker stands for them.
+
+    Cache failures are logged and never fail the run: the metadata is then downloaded
+    and parsed as without cache.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int = METADATA_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def _version_dir(self, form_id: int, version_id: str) -> Path:
+        return self.directory / _safe_name(form_id) / _safe_name(version_id)
+
+    def _current(self, form_id: int, version_id: str) -> dict:
+        try:
+            return json.loads((self._version_dir(form_id, version_id) / "current.json").read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def conditional_headers(
+        self, form_id: int, version_id: str, sheets: tuple[str, ...]
+    ) -> dict[str, str]:
+        """Return the headers revalidating the cached XLS file of a form version.
+
+        Returns:
+            dict[str, str]: `If-None-Match`/`If-Modified-Since` headers, empty if the
+                sheets are not all cached.
+        """
+        current = self._current(form_id, version_id)
+        digest = current.get("digest")
+        if not digest or not all(
+            _is_cached(self._sheet_path(form_id, version_id, digest, sheet)) for sheet in sheets
+        ):
+            return {}
+        headers = {}
+        if current.get("etag"):
+            headers["If-None-Match"] = current["etag"]
+        if current.get("last_modified"):
+            headers["If-Modified-Since"] = current["last_modified"]
+        return headers
+
+    def _sheet_path(self, form_id: int, version_id: str, digest: str, sheet: str) -> Path:
+        return self._version_dir(form_id, version_id) / digest / f"{_safe_name(sheet)}.parquet"
+
+    @staticmethod
+    def digest(response: requests.Response) -> str:
+        """Return the digest identifying the XLS file of a download.
+
+        Returns:
+            str: The hash of the ETag of the file, or of its content without ETag.
+        """
+        etag = response.headers.get("ETag")
+        content = etag.encode("utf-8") if etag else response.content
+        return hashlib.sha256(content).hexdigest()[:32]
+
+    def load(
+        self, form_id: int, version_id: str, sheets: tuple[str, ...], digest: str | None = None
+    ) -> dict[str, pl.DataFrame] | None:
+        """Load parsed sheets, by default the ones of the latest file seen.
+
+        Returns:
+            dict[str, pl.DataFrame] | None: The sheets by name, or None if they are not
+                all cached.
+        """
+        digest = digest or self._current(form_id, version_id).get("digest")
+        if not digest:
+            return None
+        loaded = {}
+        for sheet in sheets:
+            path = self._sheet_path(form_id, version_id, digest, sheet)
+            try:
+                if _empty_marker(path).exists():
+                    loaded[sheet] = pl.DataFrame()
+                    path = _empty_marker(path)
+                else:
+                    loaded[sheet] = pl.read_parquet(path)
+                os.utime(path)  # Mark as recently used
+            except FileNotFoundError:
+                return None
+            except (OSError, pl.exceptions.PolarsError) as exc:
+                current_run.log_warning(f"Ignoring unreadable form metadata cache `{path}`: {exc}")
+                return None
+        return loaded
+
+    def store(
+        self,
+        form_id: int,
+        version_id: str,
+        sheets: dict[str, pl.DataFrame],
+        response: requests.Response | None = None,
+        digest: str | None = None,
+    ) -> None:
+        """Store the parsed sheets of the XLS file downloaded in `response`.
+
+        Sheets not parsed from a single download can be stored under an explicit
+        `digest` instead; they are then never revalidated.
+        """
+        digest = digest or self.digest(response)
+        path = self._version_dir(form_id, version_id) / digest
+        headers = response.headers if response is not None else {}
+        current = {
+            "digest": digest,
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+        }
+        try:
+            path.mkdir(parents=True, exist_ok=True)
+            for sheet, df in sheets.items():
+                sheet_path = self._sheet_path(form_id, version_id, digest, sheet)
+                if not df.width:
+                    _empty_marker(sheet_path).touch()
+                    continue
+                partial = sheet_path.with_suffix(f".{os.getpid()}.tmp")
+                df.write_parquet(partial)
+                partial.replace(sheet_path)
+            current_path = path.parent / "current.json"
+            partial = current_path.with_suffix(f".{os.getpid()}.tmp")
+            partial.write_text(json.dumps(current))
+            partial.replace(current_path)
+        except (OSError, pl.exceptions.PolarsError) as exc:
+            current_run.log_warning(f"Could not cache form metadata in `{path}`: {exc}")
+            return
+        self.evict()
+
+    def evict(self) -> None:
+        """Remove the least recently used entries until the cache fits in `max_bytes`."""
+        entries = []
+        for entry in self.directory.glob("*/*/*"):
+            if not entry.is_dir():
+                continue
+            files = [f.stat() for f in entry.iterdir() if f.is_file()]
+            if files:
+                entries.append(
+                    (max(f.st_mtime for f in files), sum(f.st_size for f in files), entry)
+                )
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+
+
+def get_cached_form_metadata(
+    iaso: IASO, form_id: int, cache_dir: Path, max_bytes: int = METADATA_CACHE_MAX_BYTES
+) -> dict:
+    """Return the form metadata of `dataframe.get_form_metadata`, cached across runs.
+
+    The form versions (ID, version ID, update date and XLS file of each) are listed with
+    a single lightweight request, and their fingerprint is the digest of the cache
+    entries: the toolbox only downloads and parses the XLS files again when a version
+    was added or changed. The questions and choices of each version are stored as
+    tables of a `FormMetadataCache` entry; metadata the tables cannot restore exactly is
+    not cached.
+
+    Args:
+        iaso (IASO): An authenticated IASO object.
+        form_id (int): The ID of the form.
+        cache_dir (Path): Directory of the cache.
+        max_bytes (int): Maximum size of the cache.
+
+    Returns:
+        dict: Form metadata, as returned by `dataframe.get_form_metadata`.
+    """
+    digest = _form_versions_digest(iaso, form_id)
+    if digest is None:
+        return dataframe.get_form_metadata(iaso, form_id)
+
+    cache = FormMetadataCache(cache_dir, max_bytes)
+    metadata = _load_toolbox_metadata(cache, form_id, digest)
+    if metadata is not None:
+        current_run.log_info(f"Form {form_id} metadata loaded from cache")
+        return metadata
+
+    metadata = dataframe.get_form_metadata(iaso, form_id)
+    try:
+        entries = _toolbox_tables(metadata)
+        if _from_toolbox_tables(entries) != metadata:
+            return metadata
+    except (AttributeError, KeyError, TypeError, ValueError, pl.exceptions.PolarsError):
+        return metadata
+    # The index goes last, so that entries stored in part are never loaded
+    for version_id, sheets in sorted(entries.items(), key=lambda entry: entry[0] == "index"):
+        cache.store(form_id, version_id, sheets, digest=digest)
+    return metadata
+
+
+def _form_versions_digest(iaso: IASO, form_id: int) -> str | None:
+    """Fingerprint the versions of a form, to detect changes of its metadata.
+
+    Returns:
+        str | None: Hash of the versions of the form, or None if they could not be listed.
+    """
+    try:
+        response = iaso.api_client.get(
+            "/api/formversions/",
+            params={"form_id": str(form_id), "fields": "id,version_id,updated_at,xls_file"},
+        )
+        response.raise_for_status()
+        versions = response.json().get("form_versions", [])
+    except (requests.RequestException, ValueError) as exc:
+        current_run.log_warning(f"Could not list the versions of form {form_id}: {exc}")
+        return None
+
+    # Files may be served with short-lived signed URLs: only their path identifies them
+    signature = sorted(
+        (
+            str(version.get("id")),
+            str(version.get("version_id")),
+            str(version.get("updated_at")),
+            str(version.get("xls_file") or "").split("?", 1)[0],
+        )
+        for version in versions
+    )
+    return hashlib.sha256(json.dumps(signature).encode("utf-8")).hexdigest()[:32]
+
+
+def _toolbox_tables(metadata: dict) -> dict[str, dict[str, pl.DataFrame]]:
+    """Split toolbox form metadata into the sheets of its cache entries.
+
+    Returns:
+        dict[str, dict[str, pl.DataFrame]]: The sheets by entry: `index` lists the keys
+            of the versions, `<n>` holds the questions and choices of the n-th version.
+    """
+    entries = {
+        "index": {
+            "versions": pl.DataFrame(
+                {
+                    "key": [str(key) for key in metadata],
+                    "is_int": [isinstance(key, int) for key in metadata],
+                },
+                schema={"key": pl.String, "is_int": pl.Boolean},
+            )
+        }
+    }
+    for position, version in enumerate(metadata.values()):
+        questions = [
+            {_KEY_COLUMN: name, **question} for name, question in version["questions"].items()
+        ]
+        choices = [
+            {_KEY_COLUMN: list_name, **choice}
+            for list_name, choice_list in version["choices"].items()
+            for choice in choice_list
+        ]
+        entries[str(position)] = {
+            "questions": pl.DataFrame(questions, infer_schema_length=None),
+            "choices": pl.DataFrame(choices, infer_schema_length=None),
+        }
+    return entries
+
+
+def _from_toolbox_tables(entries: dict[str, dict[str, pl.DataFrame]]) -> dict:
+    """Rebuild toolbox form metadata from the sheets of its cache entries.
+
+    Returns:
+        dict: Form metadata, as returned by `dataframe.get_form_metadata`.
+    """
+    metadata = {}
+    for position, (key, is_int) in enumerate(entries["index"]["versions"].iter_rows()):
+        sheets = entries[str(position)]
+        questions = {}
+        for row in sheets["questions"].to_dicts():
+            questions[row.pop(_KEY_COLUMN)] = row
+        choices = {}
+        for row in sheets["choices"].to_dicts():
+            choices.setdefault(row.pop(_KEY_COLUMN), []).append(row)
+        metadata[int(key) if is_int else key] = {"questions": questions, "choices": choices}
+    return metadata
+
+
+def _load_toolbox_metadata(cache: FormMetadataCache, form_id: int, digest: str) -> dict | None:
+    """Load toolbox form metadata stored by `get_cached_form_metadata`.
+
+    Returns:
+        dict | None: Form metadata, or None if it is not all cached.
+    """
+    index = cache.load(form_id, "index", ("versions",), digest)
+    if index is None:
+        return None
+    entries = {"index": index}
+    for position in range(index["versions"].height):
+        sheets = cache.load(form_id, str(position), TOOLBOX_SHEETS, digest)
+        if sheets is None:
+            return None
+        entries[str(position)] = sheets
+    return _from_toolbox_tables(entries)
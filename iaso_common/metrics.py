@@ -0,0 +1,484 @@
+import bisect
+import json
+import math
+import threading
+import time
+from collections import Counter
+from collections.abc import Callable, Generator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+
+from openhexa.sdk import current_run
+
+
+@dataclass
+class Measurement:
+    """Records processed and bytes written by a measured block, settable from within it.
+
+    `records` counts the records the block received, `records_out` the ones it produced
+    (e.g. the rows left after a filter), the same as `records` when left to None.
+    """
+
+    records: int = 1
+    bytes: int = 0
+    records_out: int | None = None
+
+
+# Relative width of the latency buckets percentiles are computed from (about 4.4%)
+LATENCY_BUCKET_RATIO = 2 ** (1 / 16)
+# Smallest latency told apart from 0, in seconds
+LATENCY_RESOLUTION = 1e-6
+# Merged call intervals kept per stage before the oldest are folded into a total
+MAX_BUSY_SPANS = 64
+
+
+@dataclass
+class _Latencies:
+    """Running count, total, maximum and log-spaced histogram of call durations.
+
+    Memory is bounded by the number of buckets in use, about 500 from a microsecond to
+    an hour, whatever the number of calls. Percentiles are the upper bound of the bucket
+    holding the nearest rank, so they are at most `LATENCY_BUCKET_RATIO` times the exact
+    value.
+    """
+
+    count: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+    buckets: Counter = field(default_factory=Counter)
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.buckets[_bucket_index(seconds)] += 1
+
+    def copy(self) -> "_Latencies":
+        return _Latencies(self.count, self.total_seconds, self.max_seconds, Counter(self.buckets))
+
+    def percentiles_ms(self, *percentiles: float) -> list[float]:
+        """Nearest-rank percentiles of the durations, in milliseconds.
+
+        Returns:
+            list[float]: One value per percentile, 0 if there is no duration.
+        """
+        if not self.count:
+            return [0.0] * len(percentiles)
+        indexes, ranks = [], []
+        for index, count in sorted(self.buckets.items()):
+            indexes.append(index)
+            ranks.append(count + (ranks[-1] if ranks else 0))
+        values = []
+        for percentile in percentiles:
+            rank = max(1, math.ceil(percentile / 100 * self.count))
+            index = indexes[bisect.bisect_left(ranks, rank)]
+            upper = LATENCY_RESOLUTION * LATENCY_BUCKET_RATIO**index if index else 0.0
+            values.append(round(min(upper, self.max_seconds) * 1000, 3))
+        return values
+
+
+@dataclass
+class _BusyTime:
+    """Length of the union of the call intervals of a stage, merged as calls end.
+
+    The latest `MAX_BUSY_SPANS` disjoint spans are kept; older ones are folded into
+    `folded_seconds`. Calls end when they are recorded, so a new interval only overlaps
+    recent spans unless it started before many idle gaps: its part before the folded
+    spans is then left out rather than counted twice.
+    """
+
+    spans: list[tuple[float, float]] = field(default_factory=list)
+    folded_seconds: float = 0.0
+    folded_until: float = -math.inf
+
+    def add(self, start: float, end: float) -> None:
+        start = max(start, self.folded_until)
+        if end <= start:
+            return
+        # Spans are sorted and disjoint: merge the ones overlapping [start, end]
+        first = bisect.bisect_left(self.spans, start, key=lambda span: span[1])
+        last = first
+        while last < len(self.spans) and self.spans[last][0] <= end:
+            start = min(start, self.spans[last][0])
+            end = max(end, self.spans[last][1])
+            last += 1
+        self.spans[first:last] = [(start, end)]
+        if len(self.spans) > MAX_BUSY_SPANS:
+            oldest_start, oldest_end = self.spans.pop(0)
+            self.folded_seconds += oldest_end - oldest_start
+            self.folded_until = oldest_end
+
+    @property
+    def seconds(self) -> float:
+        return self.folded_seconds + sum(end - start for start, end in self.spans)
+
+
+@dataclass
+class _Stage:
+    """Timings collected for one stage of the import."""
+
+    latencies: _Latencies = field(default_factory=_Latencies)
+    busy: _BusyTime = field(default_factory=_BusyTime)
+    records: int = 0
+    records_out: int = 0
+    cpu_seconds: float = 0.0
+    bytes: int = 0
+    failures: int = 0
+
+
+class StageMetrics:
+    """Thread-safe collector of per-stage timings of an import run.
+
+    Each measurement records the duration of one call of a stage (rendering a record,
+    registering a batch, uploading a submission, ...) and the number of records it
+    received and produced. Throughput is computed over the wall-clock time during which at least
+    one call of the stage was running, so concurrent calls are not over-counted and
+    idle time between calls is not counted. Calls are aggregated as they are recorded
+    (see `_Latencies` and `_BusyTime`), so memory does not grow with the input.
+
+    The CPU time of a call is measured with `cpu_clock`. The default, the time of the
+    thread running the call, keeps concurrent calls apart but leaves out the work handed
+    over to Polars threads or to worker processes. Pipelines running one stage at a time
+    can pass `time.process_time` to include it.
+    """
+
+    def __init__(self, cpu_clock: Callable[[], float] = time.thread_time):
+        self._stages: dict[str, _Stage] = {}
+        self._lock = threading.Lock()
+        self._cpu_clock = cpu_clock
+
+    @contextmanager
+    def measure(self, stage: str, records: int = 1) -> Generator[Measurement, None, None]:
+        """Time the enclosed block as one call of `stage`.
+
+        Args:
+            stage (str): Name of the stage.
+            records (int): Number of records processed by the block, which can also be
+                set on the yielded `Measurement` once known.
+
+        Yields:
+            Measurement: The measurement of the block, counted as a failure if it raises.
+        """
+        measurement = Measurement(records)
+        started_at = time.perf_counter()
+        cpu_started_at = self._cpu_clock()
+        failed = True
+        try:
+            yield measurement
+            failed = False
+        finally:
+            self.add(
+                stage,
+                time.perf_counter() - started_at,
+                measurement.records,
+                started_at,
+                cpu_seconds=self._cpu_clock() - cpu_started_at,
+                bytes_written=measurement.bytes,
+                failed=failed,
+                records_out=measurement.records_out,
+            )
+
+    def add(
+        self,
+        stage: str,
+        seconds: float,
+        records: int = 1,
+        started_at: float | None = None,
+        cpu_seconds: float = 0.0,
+        bytes_written: int = 0,
+        failed: bool = False,
+        records_out: int | None = None,
+    ) -> None:
+        """Record one call of `stage`.
+
+        Args:
+            stage (str): Name of the stage.
+            seconds (float): Duration of the call.
+            records (int): Number of records received by the call.
+            started_at (float | None): `time.perf_counter()` value when the call started.
+            cpu_seconds (float): CPU time spent by the call.
+            bytes_written (int): Bytes written or sent by the call.
+            failed (bool): Whether the call raised an exception.
+            records_out (int | None): Number of records produced by the call, `records` if
+                None.
+        """
+        started_at = time.perf_counter() - seconds if started_at is None else started_at
+        with self._lock:
+            entry = self._stages.setdefault(stage, _Stage())
+            entry.latencies.add(seconds)
+            entry.busy.add(started_at, started_at + seconds)
+            entry.records += records
+            entry.records_out += records if records_out is None else records_out
+            entry.cpu_seconds += cpu_seconds
+            entry.bytes += bytes_written
+            entry.failures += failed
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        """Summarize the collected timings per stage.
+
+        Returns:
+            dict[str, dict[str, float]]: For each stage, the number of calls and failed
+                calls, the records received (`records_in`) and produced (`records_out`),
+                the summed duration of the calls (`cumulative_call_seconds`, counting
+                concurrent calls each), the wall-clock time during which a call was
+                running (`wall_seconds`), the CPU time, the bytes written, the throughput
+                in records received per wall-clock second and the p50/p90/p99/max latency
+                of a call in milliseconds.
+        """
+        with self._lock:
+            stages = {
+                name: (
+                    s.latencies.copy(),
+                    s.busy.seconds,
+                    s.records,
+                    s.records_out,
+                    s.cpu_seconds,
+                    s.bytes,
+                    s.failures,
+                )
+                for name, s in self._stages.items()
+            }
+
+        summary = {}
+        for name, (
+            latencies,
+            busy,
+            records,
+            records_out,
+            cpu_seconds,
+            bytes_written,
+            failures,
+        ) in stages.items():
+            wall_seconds = max(busy, 1e-9)
+            p50, p90, p99 = latencies.percentiles_ms(50, 90, 99)
+            summary[name] = {
+                "calls": latencies.count,
+                "failures": failures,
+                "records_in": records,
+                "records_out": records_out,
+                "cumulative_call_seconds": round(latencies.total_seconds, 6),
+                "wall_seconds": round(wall_seconds, 6),
+                "cpu_seconds": round(cpu_seconds, 6),
+                "bytes": bytes_written,
+                "records_per_second": round(records / wall_seconds, 2),
+                "p50_ms": p50,
+                "p90_ms": p90,
+                "p99_ms": p99,
+                "max_ms": round(latencies.max_seconds * 1000, 3),
+            }
+        return summary
+
+    def log_summary(self) -> None:
+        """Log a one-line summary per stage."""
+        for name, stage in self.summary().items():
+            failures = f", {stage['failures']} failed call(s)" if stage["failures"] else ""
+            current_run.log_info(
+                f"Stage `{name}`: {stage['records_in']} -> {stage['records_out']} records in "
+                f"{stage['wall_seconds']:.2f}s "
+                f"({stage['records_per_second']} records/s, {stage['cpu_seconds']:.2f}s CPU, "
+                f"{stage['bytes']} bytes), latency p50={stage['p50_ms']}ms "
+                f"p90={stage['p90_ms']}ms p99={stage['p99_ms']}ms{failures}"
+            )
+
+    def write(self, path: Path, **context: object) -> Path:
+        """Write the summary as JSON.
+
+        Args:
+            path (Path): Destination file.
+            **context (object): Extra values describing the run, stored alongside.
+
+        Returns:
+            Path: The written file.
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(
+            json.dumps({**context, "stages": self.summary()}, indent=2, default=str),
+            encoding="utf-8",
+        )
+        return path
+
+
+# Upper bounds of the latency histogram buckets of HTTP requests, in milliseconds
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000)
+LATENCY_BUCKETS = (
+    *(f"<={bound}ms" for bound in LATENCY_BUCKETS_MS),
+    f">{LATENCY_BUCKETS_MS[-1]}ms",
+)
+
+
+@dataclass
+class _Endpoint:
+    """Requests collected for one endpoint."""
+
+    latencies: _Latencies = field(default_factory=_Latencies)
+    histogram: Counter = field(default_factory=Counter)
+    retries: int = 0
+    statuses: Counter = field(default_factory=Counter)
+    bytes_sent: int = 0
+    bytes_received: int = 0
+
+
+class RequestMetrics:
+    """Thread-safe collector of the HTTP requests sent during a run.
+
+    Requests are grouped by endpoint, e.g. `GET /api/instances/{id}/`. Each attempt
+    counts as one request, so retries show up both in the request count and in
+    `retries`. Requests that failed without response (connection errors, timeouts)
+    are counted under the name of the exception instead of a status code.
+    """
+
+    def __init__(self):
+        self._endpoints: dict[str, _Endpoint] = {}
+        self._lock = threading.Lock()
+
+    def add(
+        self,
+        endpoint: str,
+        status: int | str,
+        seconds: float,
+        bytes_sent: int = 0,
+        bytes_received: int = 0,
+        retry: bool = False,
+    ) -> None:
+        """Record one request.
+
+        Args:
+            endpoint (str): Method and path template of the request.
+            status (int | str): Status code of the response, or the name of the exception
+                raised instead.
+            seconds (float): Time until the response was received in full.
+            bytes_sent (int): Size of the request body.
+            bytes_received (int): Size of the response body.
+            retry (bool): Whether the request retried a failed one.
+        """
+        with self._lock:
+            entry = self._endpoints.setdefault(endpoint, _Endpoint())
+            entry.latencies.add(seconds)
+            entry.histogram[_latency_bucket(seconds)] += 1
+            entry.retries += retry
+            entry.statuses[str(status)] += 1
+            entry.bytes_sent += bytes_sent
+            entry.bytes_received += bytes_received
+
+    def summary(self) -> dict[str, dict]:
+        """Summarize the requests per endpoint, the slowest endpoints first.
+
+        Returns:
+            dict[str, dict]: For each endpoint, the number of requests and retries, the
+                count per status, the bytes sent and received, the total time, the
+                p50/p90/p99/max latency in milliseconds and the latency histogram.
+        """
+        with self._lock:
+            endpoints = {
+                name: (
+                    e.latencies.copy(),
+                    dict(e.histogram),
+                    e.retries,
+                    dict(e.statuses),
+                    e.bytes_sent,
+                    e.bytes_received,
+                )
+                for name, e in self._endpoints.items()
+            }
+
+        summary = {}
+        for name, (latencies, histogram, retries, statuses, sent, received) in sorted(
+            endpoints.items(), key=lambda item: -item[1][0].total_seconds
+        ):
+            p50, p90, p99 = latencies.percentiles_ms(50, 90, 99)
+            summary[name] = {
+                "requests": latencies.count,
+                "retries": retries,
+                "statuses": dict(sorted(statuses.items())),
+                "bytes_sent": sent,
+                "bytes_received": received,
+                "total_seconds": round(latencies.total_seconds, 6),
+                "p50_ms": p50,
+                "p90_ms": p90,
+                "p99_ms": p99,
+                "max_ms": round(latencies.max_seconds * 1000, 3),
+                "histogram": {
+                    bucket: histogram[bucket] for bucket in LATENCY_BUCKETS if bucket in histogram
+                },
+            }
+        return summary
+
+    def log_summary(self) -> None:
+        """Log a one-line summary per endpoint, the slowest endpoints first."""
+        summary = self.summary()
+        total = sum(endpoint["requests"] for endpoint in summary.values())
+        current_run.log_info(f"{total} HTTP request(s) sent to {len(summary)} endpoint(s)")
+        for name, endpoint in summary.items():
+            statuses = ", ".join(f"{status}={n}" for status, n in endpoint["statuses"].items())
+            current_run.log_info(
+                f"`{name}`: {endpoint['requests']} requests ({endpoint['retries']} retries; "
+                f"{statuses}) in {endpoint['total_seconds']:.2f}s, latency "
+                f"p50={endpoint['p50_ms']}ms p99={endpoint['p99_ms']}ms "
+                f"max={endpoint['max_ms']}ms, {endpoint['bytes_sent']} bytes sent, "
+                f"{endpoint['bytes_received']} bytes received"
+            )
+
+
+def write_run_profile(
+    output_dir: Path,
+    metrics: StageMetrics,
+    request_metrics: RequestMetrics | None = None,
+    name: str = "run_profile",
+    **context: object,
+) -> Path | None:
+    """Log the profile of a run and save it as `<name>_<timestamp>.json` in `output_dir`.
+
+    A profile that cannot be written is reported as a warning, never failing the run.
+
+    Args:
+        output_dir (Path): Folder of the profile, created if needed.
+        metrics (StageMetrics): Per-stage timings of the run.
+        request_metrics (RequestMetrics | None): HTTP requests sent during the run, saved
+            under `http`.
+        name (str): Prefix of the file name.
+        **context (object): Extra values describing the run, stored alongside.
+
+    Returns:
+        Path | None: The written file, or None if it could not be written.
+    """
+    metrics.log_summary()
+    if request_metrics is not None:
+        request_metrics.log_summary()
+        context["http"] = request_metrics.summary()
+
+    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    path = output_dir / f"{name}_{timestamp}.json"
+    try:
+        metrics.write(path, **context)
+    except OSError as exc:
+        current_run.log_warning(f"Could not save the run profile to `{path}`: {exc}")
+        return None
+
+    current_run.log_info(f"Run profile saved to `{path}`")
+    return path
+
+
+def _bucket_index(seconds: float) -> int:
+    """Index of the `_Latencies` bucket of a duration.
+
+    Returns:
+        int: 0 for durations up to `LATENCY_RESOLUTION`, else the smallest `k` such
+            that the duration is at most `LATENCY_RESOLUTION * LATENCY_BUCKET_RATIO**k`.
+    """
+    if seconds <= LATENCY_RESOLUTION:
+        return 0
+    return math.ceil(math.log(seconds / LATENCY_RESOLUTION, LATENCY_BUCKET_RATIO) - 1e-9)
+
+
+def _latency_bucket(seconds: float) -> str:
+    """Name of the latency histogram bucket of a request.
+
+    Returns:
+        str: The bucket, e.g. `<=250ms`.
+    """
+    for bound in LATENCY_BUCKETS_MS:
+        if seconds * 1000 <= bound:
+            return f"<={bound}ms"
+    return f">{LATENCY_BUCKETS_MS[-1]}ms"
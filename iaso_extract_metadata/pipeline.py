@@ -2,12 +2,16 @@
 
 import hashlib
 import re
+import time
 import unicodedata
 from datetime import datetime
 from pathlib import Path
 
 import polars as pl
 import xlsxwriter
+from iaso_http import TokenBucket, mount_resilient_adapter
+from metadata_cache import get_cached_form_metadata
+from metrics import RequestMetrics, StageMetrics, write_run_profile
 from openhexa.sdk import (
     IASOConnection,
     current_run,
@@ -17,7 +21,17 @@ from openhexa.sdk import (
 )
 from openhexa.sdk.datasets.dataset import Dataset, DatasetVersion
 from openhexa.sdk.pipelines.parameter import IASOWidget
-from openhexa.toolbox.iaso import IASO, dataframe
+from openhexa.toolbox.iaso import IASO
+
+# Upper bound of the request rate sent to IASO, lowered automatically on throttling
+MAX_REQUESTS_PER_SECOND = 20
+
+# Form metadata is kept here across runs, so unchanged forms are not downloaded again
+METADATA_CACHE_DIR = Path("iaso-pipelines", "extract-metadata", ".cache", "form-metadata")
+METADATA_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# Run profiles are saved next to the exported file, or here if the run fails before export
+DEFAULT_OUTPUT_DIR = Path("iaso-pipelines", "extract-metadata")
 
 
 @pipeline("iaso_extract_metadata")
@@ -89,39 +103,60 @@ def iaso_extract_metadata(
     Pipeline functions should only call tasks and should never perform
     IO operations or expensive computations.
     """
-    iaso = authenticate_iaso(iaso_connection)
-    form_name = get_form_name(iaso, form_id)
+    metrics = StageMetrics(cpu_clock=time.process_time)
+    request_metrics = RequestMetrics()
+    output_dir = Path(workspace.files_path, DEFAULT_OUTPUT_DIR)
 
-    questions, choices = fetch_form_metadata(iaso, form_id)
+    try:
+        with metrics.measure("authenticate_iaso"):
+            iaso = authenticate_iaso(iaso_connection, request_metrics)
+        form_name = get_form_name(iaso, form_id)
+
+        with metrics.measure("fetch_form_metadata") as measurement:
+            questions, choices = fetch_form_metadata(iaso, form_id)
+            measurement.records = len(questions) + len(choices)
+
+        with metrics.measure("export_to_file", len(questions) + len(choices)) as measurement:
+            output_file_path = export_to_file(
+                questions,
+                choices,
+                form_name,
+                output_file_name,
+                output_format,
+            )
+            measurement.bytes = output_file_path.stat().st_size
+        output_dir = output_file_path.parent
 
-    output_file_path = export_to_file(
-        questions,
-        choices,
-        form_name,
-        output_file_name,
-        output_format,
-    )
+        if db_table_name:
+            with metrics.measure("export_to_database", len(questions) + len(choices)):
+                export_to_database(questions, choices, db_table_name, save_mode)
 
-    if db_table_name:
-        export_to_database(questions, choices, db_table_name, save_mode)
+        if dataset:
+            with metrics.measure("export_to_dataset") as measurement:
+                added = export_to_dataset(file_path=output_file_path, dataset=dataset)
+                measurement.bytes = output_file_path.stat().st_size if added else 0
 
-    if dataset:
-        export_to_dataset(file_path=output_file_path, dataset=dataset)
+        current_run.log_info("Pipeline execution successful ✅")
 
-    current_run.log_info("Pipeline execution successful ✅")
+    finally:
+        write_run_profile(output_dir, metrics, request_metrics, pipeline="iaso_extract_metadata")
 
 
-def authenticate_iaso(conn: IASOConnection) -> IASO:
+def authenticate_iaso(conn: IASOConnection, request_metrics: RequestMetrics | None = None) -> IASO:
     """Authenticates and returns an IASO object.
 
     Args:
         conn (IASOConnection): IASO connection details.
+        request_metrics (RequestMetrics | None): Collector of the requests sent to IASO.
 
     Returns:
         IASO: An authenticated IASO object.
     """
     try:
         iaso = IASO(conn.url, conn.username, conn.password)
+        mount_resilient_adapter(
+            iaso.api_client, TokenBucket(MAX_REQUESTS_PER_SECOND), metrics=request_metrics
+        )
         current_run.log_info("IASO authentication successful")
         return iaso
     except Exception as e:
@@ -160,7 +195,9 @@ def fetch_form_metadata(iaso: IASO, form_id: int) -> pl.DataFrame:
     Returns:
         pl.DataFrame: Metadata for the form.
     """
-    form_metadata = dataframe.get_form_metadata(iaso, form_id)
+    form_metadata = get_cached_form_metadata(
+        iaso, form_id, Path(workspace.files_path, METADATA_CACHE_DIR), METADATA_CACHE_MAX_BYTES
+    )
 
     valid_versions = {k: v for k, v in form_metadata.items() if isinstance(k, int)}
     if valid_versions:
@@ -265,12 +302,15 @@ def export_to_database(questions: pl.DataFrame, choices: pl.DataFrame, table_nam
         raise
 
 
-def export_to_dataset(file_path: Path, dataset: Dataset | None) -> None:
+def export_to_dataset(file_path: Path, dataset: Dataset | None) -> bool:
     """Export organizational units data to geopackage dataset.
 
     Args:
         file_path: Path to the exported file to be added to the dataset
         dataset: Target dataset for export
+
+    Returns:
+        True if the file was added to a new dataset version, False if unchanged
     """
     latest_version = dataset.latest_version
     if bool(latest_version) and in_dataset_version(file_path, latest_version):
@@ -278,7 +318,7 @@ def export_to_dataset(file_path: Path, dataset: Dataset | None) -> None:
             f"Form metadata file `{file_path.name}` already exists in dataset version "
             f"`{latest_version.name}` and no changes have been detected"
         )
-        return
+        return False
 
     version_number = int(latest_version.name.lstrip("v")) + 1 if latest_version else 1
     version = dataset.create_version(f"v{version_number}")
@@ -287,6 +327,7 @@ def export_to_dataset(file_path: Path, dataset: Dataset | None) -> None:
         f"Form metadata file `{file_path.name}` successfully added to {dataset.name} "
         f"dataset in version `{version.name}`"
     )
+    return True
 
 
 def clean_string(data: str) -> str:
@@ -334,7 +375,7 @@ def _generate_output_file_path(form_name: str, output_file_name: str, output_for
         output_file_path.parent.mkdir(parents=True, exist_ok=True)
         return output_file_path
 
-    output_dir = Path(workspace.files_path, "iaso-pipelines", "extract-metadata")
+    output_dir = Path(workspace.files_path, DEFAULT_OUTPUT_DIR)
     output_dir.mkdir(exist_ok=True, parents=True)
 
     base_name = f"md_{clean_string(form_name)}"
@@ -5,6 +5,7 @@ from __future__ import annotations
 import hashlib
 import json
 import re
+import time
 import unicodedata
 from datetime import datetime
 from io import StringIO
@@ -13,6 +14,8 @@ from pathlib import Path
 import geopandas as gpd
 import polars as pl
 import topojson as tp
+from iaso_http import TokenBucket, mount_resilient_adapter
+from metrics import RequestMetrics, StageMetrics, write_run_profile
 from openhexa.sdk import (
     IASOConnection,
     current_run,
@@ -28,6 +31,15 @@ from sqlalchemy import create_engine
 # Precompile regex pattern for string cleaning
 CLEAN_PATTERN = re.compile(r"[^\w\s-]")
 
+# Upper bound of the request rate sent to IASO, lowered automatically on throttling
+MAX_REQUESTS_PER_SECOND = 20
+
+# Run profiles are saved next to the exported file, or here if the run fails before export
+DEFAULT_OUTPUT_DIR = Path("iaso-pipelines", "extract-orgunits")
+
+# Files written alongside a shapefile
+SHAPEFILE_SIDECARS = (".shx", ".dbf", ".prj", ".cpg")
+
 
 @pipeline("iaso_extract_orgunits")
 @parameter(
@@ -114,35 +126,64 @@ def iaso_extract_orgunits(
         dataset: Optional dataset for geopackage export
     """
     current_run.log_info("Starting IASO organizational units extraction pipeline")
+    metrics = StageMetrics(cpu_clock=time.process_time)
+    request_metrics = RequestMetrics()
+    output_dir = Path(workspace.files_path, DEFAULT_OUTPUT_DIR)
 
-    iaso_client = authenticate_iaso(iaso_connection)
+    try:
+        with metrics.measure("authenticate_iaso"):
+            iaso_client = authenticate_iaso(iaso_connection, request_metrics)
 
-    org_units_df = fetch_org_units(iaso_client, ou_type_id)
-    org_units_df = org_units_df.select(sorted(org_units_df.columns)).sort(org_units_df.columns)
+        with metrics.measure("fetch_org_units") as measurement:
+            org_units_df = fetch_org_units(iaso_client, ou_type_id)
+            measurement.records = len(org_units_df)
 
-    output_file_path = export_to_file(
-        org_units_df=org_units_df,
-        ou_type_id=ou_type_id,
-        output_file_name=output_file_name,
-        output_format=output_format,
-    )
-    current_run.log_info(f"Data exported to file: `{output_file_path}`")
+        with metrics.measure("sort_org_units", len(org_units_df)) as measurement:
+            org_units_df = org_units_df.select(sorted(org_units_df.columns)).sort(
+                org_units_df.columns
+            )
+            measurement.records_out = len(org_units_df)
+
+        with metrics.measure("export_to_file", len(org_units_df)) as measurement:
+            output_file_path = export_to_file(
+                org_units_df=org_units_df,
+                ou_type_id=ou_type_id,
+                output_file_name=output_file_name,
+                output_format=output_format,
+            )
+            measurement.records_out = len(org_units_df)
+            measurement.bytes = _exported_size(output_file_path)
+        output_dir = output_file_path.parent
+        current_run.log_info(f"Data exported to file: `{output_file_path}`")
+
+        if db_table_name:
+            with metrics.measure("export_to_database", len(org_units_df)) as measurement:
+                export_to_database(
+                    org_units_df=org_units_df, table_name=db_table_name, save_mode=save_mode
+                )
+                measurement.records_out = len(org_units_df)
+                measurement.bytes = org_units_df.estimated_size()
 
-    if db_table_name:
-        export_to_database(org_units_df=org_units_df, table_name=db_table_name, save_mode=save_mode)
+        if dataset:
+            with metrics.measure("export_to_dataset") as measurement:
+                added = export_to_dataset(file_path=output_file_path, dataset=dataset)
+                measurement.bytes = _exported_size(output_file_path) if added else 0
 
-    if dataset:
-        export_to_dataset(file_path=output_file_path, dataset=dataset)
+        current_run.log_info("Pipeline executed successfully ✅")
 
-    current_run.log_info("Pipeline executed successfully ✅")
+    finally:
+        write_run_profile(output_dir, metrics, request_metrics, pipeline="iaso_extract_orgunits")
 
 
 # @iaso_extract_orgunits.task
-def authenticate_iaso(connection: IASOConnection) -> IASO:
+def authenticate_iaso(
+    connection: IASOConnection, request_metrics: RequestMetrics | None = None
+) -> IASO:
     """Establish authenticated connection to IASO API.
 
     Args:
         connection: IASO connection parameters
+        request_metrics: Optional collector of the requests sent to IASO
 
     Returns:
         Authenticated IASO client instance
@@ -152,6 +193,9 @@ def authenticate_iaso(connection: IASOConnection) -> IASO:
     """
     try:
         iaso = IASO(connection.url, connection.username, connection.password)
+        mount_resilient_adapter(
+            iaso.api_client, TokenBucket(MAX_REQUESTS_PER_SECOND), metrics=request_metrics
+        )
         current_run.log_info("IASO authentication successful")
         return iaso
     except Exception as err:
@@ -330,7 +374,7 @@ def export_to_file(
 
     current_run.add_file_output(output_file_path.as_posix())
     if output_format == ".shp":
-        for suffix in [".shx", ".dbf", ".prj", ".cpg"]:
+        for suffix in SHAPEFILE_SIDECARS:
             current_run.add_file_output(output_file_path.with_suffix(suffix).as_posix())
 
     return output_file_path
@@ -370,12 +414,15 @@ def export_to_database(
 
 
 # @iaso_extract_orgunits.task
-def export_to_dataset(file_path: Path, dataset: Dataset | None) -> None:
+def export_to_dataset(file_path: Path, dataset: Dataset | None) -> bool:
     """Export organizational units data to geopackage dataset.
 
     Args:
         file_path: Path to the exported file to be added to the dataset
         dataset: Target dataset for export
+
+    Returns:
+        True if the file was added to a new dataset version, False if unchanged
     """
     latest_version = dataset.latest_version
     if bool(latest_version) and in_dataset_version(file_path, latest_version):
@@ -383,7 +430,7 @@ def export_to_dataset(file_path: Path, dataset: Dataset | None) -> None:
             f"Organizational units file `{file_path.name}` already exists in dataset version "
             f"`{latest_version.name}` and no changes have been detected"
         )
-        return
+        return False
 
     version_number = int(latest_version.name.lstrip("v")) + 1 if latest_version else 1
     version = dataset.create_version(f"v{version_number}")
@@ -391,13 +438,14 @@ def export_to_dataset(file_path: Path, dataset: Dataset | None) -> None:
     if file_path.suffix != ".shp":
         version.add_file(file_path, file_path.name)
     else:
-        for suffix in [".shp", ".shx", ".dbf", ".prj", ".cpg"]:
+        for suffix in (".shp", *SHAPEFILE_SIDECARS):
             version.add_file(file_path.with_suffix(suffix), file_path.with_suffix(suffix).name)
 
     current_run.log_info(
         f"Organizational units file `{file_path.name}` successfully added to {dataset.name} "
         f"dataset in version `{version.name}`"
     )
+    return True
 
 
 def _generate_output_file_path(
@@ -448,7 +496,7 @@ def _generate_output_file_path(
 
         return output_file_path
 
-    output_dir = Path(workspace.files_path, "iaso-pipelines", "extract-orgunits")
+    output_dir = Path(workspace.files_path, DEFAULT_OUTPUT_DIR)
     output_dir.mkdir(parents=True, exist_ok=True)
 
     base_name = (
@@ -462,6 +510,18 @@ def _generate_output_file_path(
     return output_dir / file_name
 
 
+def _exported_size(file_path: Path) -> int:
+    """Return the size of an exported file, including the sidecar files of a shapefile.
+
+    Returns:
+        int: The size in bytes.
+    """
+    paths = [file_path]
+    if file_path.suffix == ".shp":
+        paths += [file_path.with_suffix(suffix) for suffix in SHAPEFILE_SIDECARS]
+    return sum(path.stat().st_size for path in paths if path.exists())
+
+
 def _prepare_geodataframe(df: pl.DataFrame) -> gpd.GeoDataFrame:
     """Convert Polars DataFrame to GeoDataFrame with proper geometry."""  # noqa: DOC201
     return (
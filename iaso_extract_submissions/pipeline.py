@@ -4,11 +4,15 @@ from __future__ import annotations
 
 import hashlib
 import re
+import time
 import unicodedata
 from datetime import datetime
 from pathlib import Path
 
 import polars as pl
+from iaso_http import TokenBucket, mount_resilient_adapter
+from metadata_cache import get_cached_form_metadata
+from metrics import RequestMetrics, StageMetrics, write_run_profile
 from openhexa.sdk import (
     IASOConnection,
     current_run,
@@ -23,6 +27,16 @@ from openhexa.toolbox.iaso import IASO, dataframe
 # Precompile regex pattern for string cleaning
 CLEAN_PATTERN = re.compile(r"[^\w\s-]")
 
+# Upper bound of the request rate sent to IASO, lowered automatically on throttling
+MAX_REQUESTS_PER_SECOND = 20
+
+# Form metadata is kept here across runs, so unchanged forms are not downloaded again
+METADATA_CACHE_DIR = Path("iaso-pipelines", "extract-submissions", ".cache", "form-metadata")
+METADATA_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# Run profiles are saved next to the exported file, or here if the run fails before export
+DEFAULT_OUTPUT_DIR = Path("iaso-pipelines", "extract-submissions")
+
 
 @pipeline("iaso_extract_submissions")
 @parameter("iaso_connection", name="IASO connection", type=IASOConnection, required=True)
@@ -107,24 +121,47 @@ def iaso_extract_submissions(
 ):
     """Pipeline orchestration function for extracting and processing form submissions."""
     current_run.log_info("Starting form submissions extraction pipeline")
+    metrics = StageMetrics(cpu_clock=time.process_time)
+    request_metrics = RequestMetrics()
+    output_dir = Path(workspace.files_path, DEFAULT_OUTPUT_DIR)
 
     try:
-        iaso = authenticate_iaso(iaso_connection)
+        with metrics.measure("authenticate_iaso"):
+            iaso = authenticate_iaso(iaso_connection, request_metrics)
         form_name = get_form_name(iaso, form_id)
         cutoff_date = parse_cutoff_date(last_updated)
 
-        submissions = fetch_submissions(iaso, form_id, cutoff_date)
-        submissions = process_choices(submissions, choices_to_labels, iaso, form_id)
-        submissions = deduplicate_columns(submissions)
+        with metrics.measure("fetch_submissions") as measurement:
+            submissions = fetch_submissions(iaso, form_id, cutoff_date)
+            measurement.records = len(submissions)
 
-        output_file_path = export_to_file(submissions, form_name, output_file_name, output_format)
+        with metrics.measure("process_choices", len(submissions)) as measurement:
+            submissions = process_choices(submissions, choices_to_labels, iaso, form_id)
+            measurement.records_out = len(submissions)
+
+        with metrics.measure("process_submissions", len(submissions)) as measurement:
+            submissions = _process_submissions(deduplicate_columns(submissions))
+            measurement.records_out = len(submissions)
+
+        with metrics.measure("export_to_file", len(submissions)) as measurement:
+            output_file_path = export_to_file(
+                submissions, form_name, output_file_name, output_format
+            )
+            measurement.records_out = len(submissions)
+            measurement.bytes = output_file_path.stat().st_size
+        output_dir = output_file_path.parent
         current_run.log_info(f"Data exported to file: `{output_file_path}`")
 
         if db_table_name:
-            export_to_database(submissions, db_table_name, save_mode)
+            with metrics.measure("export_to_database", len(submissions)) as measurement:
+                written = export_to_database(submissions, db_table_name, save_mode)
+                measurement.records_out = len(submissions) if written else 0
+                measurement.bytes = submissions.estimated_size() if written else 0
 
         if dataset:
-            export_to_dataset(file_path=output_file_path, dataset=dataset)
+            with metrics.measure("export_to_dataset") as measurement:
+                added = export_to_dataset(file_path=output_file_path, dataset=dataset)
+                measurement.bytes = output_file_path.stat().st_size if added else 0
 
         current_run.log_info("Pipeline execution successful ✅")
 
@@ -132,18 +169,25 @@ def iaso_extract_submissions(
         current_run.log_error(f"Pipeline failed: {exc}")
         raise
 
+    finally:
+        write_run_profile(output_dir, metrics, request_metrics, pipeline="iaso_extract_submissions")
 
-def authenticate_iaso(conn: IASOConnection) -> IASO:
+
+def authenticate_iaso(conn: IASOConnection, request_metrics: RequestMetrics | None = None) -> IASO:
     """Authenticates and returns an IASO object.
 
     Args:
         conn (IASOConnection): IASO connection details.
+        request_metrics (RequestMetrics | None): Collector of the requests sent to IASO.
 
     Returns:
         IASO: An authenticated IASO object.
     """
     try:
         iaso = IASO(conn.url, conn.username, conn.password)
+        mount_resilient_adapter(
+            iaso.api_client, TokenBucket(MAX_REQUESTS_PER_SECOND), metrics=request_metrics
+        )
         current_run.log_info("IASO authentication successful")
         return iaso
     except Exception as exc:
@@ -236,7 +280,12 @@ def process_choices(
         return submissions
 
     try:
-        form_metadata = dataframe.get_form_metadata(iaso_client, form_id)
+        form_metadata = get_cached_form_metadata(
+            iaso_client,
+            form_id,
+            Path(workspace.files_path, METADATA_CACHE_DIR),
+            METADATA_CACHE_MAX_BYTES,
+        )
         return dataframe.replace_labels(
             submissions=submissions, form_metadata=form_metadata, language="French"
         )
@@ -267,7 +316,7 @@ def deduplicate_columns(submissions: pl.DataFrame) -> pl.DataFrame:
             duplicates_columns[col].remove(duplicates_columns[col][0])
 
     submissions.columns = cleaned_columns
-    return _process_submissions(submissions)
+    return submissions
 
 
 def export_to_file(
@@ -301,33 +350,42 @@ def export_to_file(
     return output_file_path
 
 
-def export_to_database(submissions: pl.DataFrame, table_name: str, mode: str) -> None:
+def export_to_database(submissions: pl.DataFrame, table_name: str, mode: str) -> bool:
     """Saves form submissions to a database.
 
     Args:
         submissions: DataFrame containing the form submissions.
         table_name: Name of the database table where submissions will be saved.
         mode: Mode to use when saving the table (replace or append).
+
+    Returns:
+        bool: True if the submissions were saved, False if the table schema does not match.
     """
-    if _validate_schema(submissions, table_name):
-        mode = mode or "replace"
-        submissions.write_database(
-            table_name=table_name,
-            connection=workspace.database_url,
-            if_table_exists=mode,
-        )
-        current_run.add_database_output(table_name)
-        current_run.log_info(
-            f"Form submissions saved to database {len(submissions)} rows into `{table_name}`"
-        )
+    if not _validate_schema(submissions, table_name):
+        return False
+
+    mode = mode or "replace"
+    submissions.write_database(
+        table_name=table_name,
+        connection=workspace.database_url,
+        if_table_exists=mode,
+    )
+    current_run.add_database_output(table_name)
+    current_run.log_info(
+        f"Form submissions saved to database {len(submissions)} rows into `{table_name}`"
+    )
+    return True
 
 
-def export_to_dataset(file_path: Path, dataset: Dataset | None) -> None:
+def export_to_dataset(file_path: Path, dataset: Dataset | None) -> bool:
     """Saves form submissions to the specified dataset.
 
     Args:
         file_path (Path): The path to the file containing the submissions data.
         dataset (Dataset): The dataset where the submissions will be stored.
+
+    Returns:
+        bool: True if the file was added to a new dataset version, False if unchanged.
     """
     latest_version = dataset.latest_version
     if bool(latest_version) and in_dataset_version(file_path, latest_version):
@@ -335,7 +393,7 @@ def export_to_dataset(file_path: Path, dataset: Dataset | None) -> None:
             f"Form submissions file `{file_path.name}` already exists in dataset version "
             f"`{latest_version.name}` and no changes have been detected"
         )
-        return
+        return False
 
     version_number = int(latest_version.name.lstrip("v")) + 1 if latest_version else 1
     version = dataset.create_version(f"v{version_number}")
@@ -344,6 +402,7 @@ def export_to_dataset(file_path: Path, dataset: Dataset | None) -> None:
         f"Form submissions file `{file_path.name}` successfully added to {dataset.name} "
         f"dataset in version `{version.name}`"
     )
+    return True
 
 
 def _process_submissions(submissions: pl.DataFrame) -> pl.DataFrame:
@@ -442,7 +501,7 @@ def _generate_output_file_path(form_name: str, output_file_name: str, output_for
         output_file_path.parent.mkdir(parents=True, exist_ok=True)
         return output_file_path
 
-    output_dir = Path(workspace.files_path, "iaso-pipelines", "extract-submissions")
+    output_dir = Path(workspace.files_path, DEFAULT_OUTPUT_DIR)
     output_dir.mkdir(exist_ok=True, parents=True)
 
     base_name = f"{clean_string(form_name)}"
@@ -0,0 +1,135 @@
+import polars as pl
+from openhexa.sdk import current_run
+
+# Instance fields fetched from IASO to compare the current content of the instances
+CONTENT_FIELDS = (
+    "id",
+    "is_locked",
+    "file_content",
+    "org_unit",
+    "org_unit_id",
+    "latitude",
+    "longitude",
+    "altitude",
+    "accuracy",
+)
+# Instance fields patched in UPDATE mode, keyed by their name in the instance payload
+LOCATION_FIELDS = ("org_unit", "latitude", "longitude", "altitude", "accuracy")
+
+
+def _canonical(column: str) -> pl.Expr:
+    """Normalize a string column so equal values compare equal on both sides.
+
+    Blank values become null and numbers are written the same way whatever their
+    source type, e.g. `3`, `3.0` and `" 3 "` all become `3`.
+
+    Returns:
+        pl.Expr: The normalized column.
+    """
+    text = pl.col(column).str.strip_chars()
+    number = text.cast(pl.Float64, strict=False)
+    is_integer = number.is_not_null() & (number % 1 == 0) & (number.abs() < 2**53)
+    return (
+        pl.when(text.str.len_chars() == 0)
+        .then(None)
+        .when(is_integer)
+        .then(number.cast(pl.Int64).cast(pl.String))
+        .when(number.is_not_null())
+        .then(number.cast(pl.String))
+        .otherwise(text)
+        .alias(column)
+    )
+
+
+def content_hashes(df: pl.DataFrame) -> pl.Series:
+    """Hash the content of every row of string columns in a single pass.
+
+    Returns:
+        pl.Series: The hash of each row, in the order of `df`.
+    """
+    if not df.columns:
+        return pl.Series("hash", [0] * len(df), dtype=pl.UInt64)
+    return df.select(pl.struct(_canonical(column) for column in df.columns).hash().alias("hash"))[
+        "hash"
+    ]
+
+
+def _current_org_unit(instance: dict) -> object:
+    """Return the org unit ID of an instance as returned by the IASO list endpoint.
+
+    Returns:
+        object: The org unit ID, or None if unknown.
+    """
+    org_unit = instance.get("org_unit")
+    if isinstance(org_unit, dict):
+        return org_unit.get("id")
+    return instance.get("org_unit_id", org_unit)
+
+
+def find_unchanged(
+    df: pl.DataFrame,
+    answer_columns: list[str],
+    payloads: list[dict | None],
+    instances: list[dict | None],
+) -> list[bool]:
+    """Flag the rows whose content is already the current content of their instance.
+
+    The answers of each row and, when the row patches its instance, its org unit and
+    coordinates are hashed, and so are the same fields of the instance fetched from
+    IASO. Rows whose instance was not fetched, or was fetched without its
+    `file_content`, are always considered changed.
+
+    Args:
+        df (pl.DataFrame): The submissions to update.
+        answer_columns (list[str]): Columns holding form answers, compared with the
+            `file_content` of the instances.
+        payloads (list[dict | None]): The instance payload of each row, as built by
+            `build_instance_payloads`.
+        instances (list[dict | None]): The instance of each row fetched from IASO with
+            `CONTENT_FIELDS`, in the order of `df`.
+
+    Returns:
+        list[bool]: Whether each row is unchanged, in the order of `df`.
+    """
+    local = df.select(pl.col(column).cast(pl.String) for column in answer_columns)
+    contents = [(instance or {}).get("file_content") for instance in instances]
+    remote = pl.DataFrame(
+        {
+            column: [
+                None if content is None or content.get(column) is None else str(content[column])
+                for content in contents
+            ]
+            for column in answer_columns
+        },
+        schema=dict.fromkeys(answer_columns, pl.String),
+    )
+
+    # Location fields are only compared for the rows patching them
+    current = [
+        {**(instance or {}), "org_unit": _current_org_unit(instance or {})}
+        for instance in instances
+    ]
+    location_columns = {}
+    for field in LOCATION_FIELDS:
+        location_columns[f"local_{field}"] = [
+            None if payload is None or payload.get(field) is None else str(payload[field])
+            for payload in payloads
+        ]
+        location_columns[f"remote_{field}"] = [
+            None if payload is None or instance.get(field) is None else str(instance[field])
+            for payload, instance in zip(payloads, current, strict=True)
+        ]
+    locations = pl.DataFrame(location_columns, schema=dict.fromkeys(location_columns, pl.String))
+    local = local.hstack(locations.select(f"local_{field}" for field in LOCATION_FIELDS))
+    remote = remote.hstack(
+        locations.select(
+            pl.col(f"remote_{field}").alias(f"local_{field}") for field in LOCATION_FIELDS
+        )
+    )
+
+    has_content = pl.Series([isinstance(content, dict) for content in contents], dtype=pl.Boolean)
+    unchanged = (content_hashes(local) == content_hashes(remote)) & has_content
+    current_run.log_info(
+        f"{unchanged.sum()} of {len(df)} row(s) match the current content of their instance"
+    )
+    return unchanged.to_list()
@@ -0,0 +1,258 @@
+import base64
+import json
+import threading
+import time
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import TracebackType
+from urllib.parse import parse_qs, urlsplit, urlunsplit
+
+import requests
+from iaso_http import ResilientAdapter, TokenBucket
+from metrics import RequestMetrics
+from openhexa.sdk import current_run
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+# IASO endpoints written to (or used to write) by the import, answered by the stub
+STUB_PATHS = (
+    "/api/token/",
+    "/api/instances",
+    "/sync/form_upload/",
+    "/api/enketo/",
+    "/submission/",
+)
+
+
+def _stub_token() -> str:
+    """Build an unsigned JWT valid for a day, as returned by `/api/token/`.
+
+    Returns:
+        str: The token.
+    """
+
+    def encode(part: dict) -> str:
+        return base64.urlsafe_b64encode(json.dumps(part).encode()).rstrip(b"=").decode()
+
+    claims = {"user_id": 0, "exp": int(time.time()) + 86400}
+    return f"{encode({'alg': 'none', 'typ': 'JWT'})}.{encode(claims)}."
+
+
+def stub_response(method: str, path: str, base_url: str, query: str = "") -> tuple[int, object]:
+    """Answer a request to one of the `STUB_PATHS` like IASO would on success.
+
+    Args:
+        method (str): HTTP method of the request.
+        path (str): Path of the request URL.
+        base_url (str): Scheme and host the request was sent to, used for Enketo URLs.
+        query (str): Query string of the request URL.
+
+    Returns:
+        tuple[int, object]: Status code and JSON body of the response.
+    """
+    if path.startswith("/api/token/"):
+        token = _stub_token()
+        return 200, {"access": token, "refresh": token}
+
+    if path.startswith("/api/enketo/edit/"):
+        instance_uuid = path.rstrip("/").rsplit("/", 1)[-1]
+        return 200, {"edit_url": f"{base_url}/edit/stub?instance_id={instance_uuid}"}
+
+    if path.startswith(("/sync/form_upload/", "/submission/")):
+        return 201, {}
+
+    if path.rstrip("/") == "/api/instances" and method == "GET":
+        ids = (parse_qs(query).get("ids") or [""])[0]
+        instances = [
+            {"id": int(instance_id), "is_locked": False}
+            for instance_id in ids.split(",")
+            if instance_id.isdigit()
+        ]
+        return 200, {"instances": instances, "has_next": False}
+
+    if path.startswith("/api/instances") and method == "GET":
+        instance_id = path.rstrip("/").rsplit("/", 1)[-1]
+        return 200, {"id": instance_id, "is_locked": False}
+
+    if path.startswith("/api/instances"):
+        return 200, {}
+
+    return 404, {"detail": "Not found."}
+
+
+class StubAdapter(HTTPAdapter):
+    """Transport adapter answering IASO write endpoints in-process.
+
+    No socket is opened, so the pipeline runs up to the network boundary and the
+    measured throughput is the one of reading, validating, rendering and building
+    the payloads. `latency` seconds are waited before each answer, to simulate the
+    round trip to IASO.
+    """
+
+    def __init__(self, latency: float = 0.0, **kwargs: object):
+        super().__init__(**kwargs)
+        self.latency = latency
+
+    def send(self, request: requests.PreparedRequest, **kwargs: object) -> requests.Response:
+        """Answer the request with `stub_response`, after `latency` seconds.
+
+        Returns:
+            requests.Response: The stub response.
+        """
+        if self.latency > 0:
+            time.sleep(self.latency)
+        url = urlsplit(request.url)
+        status, body = stub_response(
+            request.method or "GET", url.path, f"{url.scheme}://{url.netloc}", url.query
+        )
+        response = requests.Response()
+        response.status_code = status
+        response.reason = HTTPStatus(status).phrase
+        response.headers = CaseInsensitiveDict({"Content-Type": "application/json"})
+        response._content = json.dumps(body).encode("utf-8")
+        response.encoding = "utf-8"
+        response.url = request.url or ""
+        response.request = request
+        return response
+
+
+class _StubRequestHandler(BaseHTTPRequestHandler):
+    """Request handler of `StubServer`, answering with `stub_response`."""
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; avoid delayed-ACK stalls on keep-alive
+    disable_nagle_algorithm = True
+
+    def _handle(self) -> None:
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if self.server.latency > 0:
+            time.sleep(self.server.latency)
+        url = urlsplit(self.path)
+        status, body = stub_response(
+            self.command, url.path, f"http://{self.headers['Host']}", url.query
+        )
+        content = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def do_GET(self) -> None:
+        self._handle()
+
+    def do_POST(self) -> None:
+        self._handle()
+
+    def do_PATCH(self) -> None:
+        self._handle()
+
+    def do_DELETE(self) -> None:
+        self._handle()
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+        pass
+
+
+class _StubHTTPServer(ThreadingHTTPServer):
+    """Threaded HTTP server of `StubServer`, answering each request after `latency` seconds."""
+
+    def __init__(self, address: tuple[str, int], latency: float):
+        super().__init__(address, _StubRequestHandler)
+        self.latency = latency
+
+
+class StubServer:
+    """Local HTTP server answering IASO write endpoints, run in a background thread.
+
+    Each request is answered in its own thread after `latency` seconds, simulating the
+    round trip to IASO without serializing concurrent requests.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0):
+        self._server = _StubHTTPServer((host, port), latency)
+        self.url = f"http://{host}:{self._server.server_address[1]}"
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def __enter__(self) -> "StubServer":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Stop the server."""
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class RedirectAdapter(ResilientAdapter):
+    """Resilient adapter sending every request to another host (e.g. a `StubServer`)."""
+
+    def __init__(self, target_url: str, **kwargs: object):
+        super().__init__(**kwargs)
+        self.target = urlsplit(target_url)
+
+    def send(self, request: requests.PreparedRequest, **kwargs: object) -> requests.Response:
+        """Send the request to the target host, keeping its path and query.
+
+        Returns:
+            requests.Response: The response of the target host.
+        """
+        url = urlsplit(request.url)
+        request = request.copy()
+        request.url = urlunsplit(
+            (self.target.scheme, self.target.netloc, url.path, url.query, url.fragment)
+        )
+        return super().send(request, **kwargs)
+
+
+def mount_dry_run(
+    session: requests.Session,
+    server_url: str,
+    mode: str,
+    limiter: TokenBucket | None = None,
+    metrics: RequestMetrics | None = None,
+    latency: float = 0.0,
+) -> StubServer | None:
+    """Route the IASO write endpoints of a session to a stub.
+
+    Adapters are mounted on the `STUB_PATHS` prefixes of `server_url` only, so form
+    metadata is still read from IASO while nothing is written to it.
+
+    Args:
+        session (requests.Session): Session to configure, e.g. `iaso.api_client`.
+        server_url (str): Base URL of the IASO server.
+        mode (str): `OFFLINE` to answer in-process, `LOCAL_STUB` to send the requests
+            over HTTP to a local stub server.
+        limiter (TokenBucket | None): Rate limiter applied to the requests sent to the
+            local stub server.
+        metrics (RequestMetrics | None): Collector of the requests sent to the local stub
+            server.
+        latency (float): Seconds the stub waits before answering each request.
+
+    Returns:
+        StubServer | None: The started stub server in `LOCAL_STUB` mode, to be closed
+            once the run is done.
+    """
+    server = None
+    if mode == "LOCAL_STUB":
+        server = StubServer(latency=latency)
+        adapter: HTTPAdapter = RedirectAdapter(server.url, limiter=limiter, metrics=metrics)
+        current_run.log_info(f"Dry run: IASO write requests are sent to {server.url}")
+    else:
+        adapter = StubAdapter(latency)
+        current_run.log_info("Dry run: IASO write requests are answered offline")
+    if latency > 0:
+        current_run.log_info(f"Dry run: the stub answers each request after {latency * 1000:g}ms")
+
+    base_url = server_url.rstrip("/")
+    for path in STUB_PATHS:
+        session.mount(f"{base_url}{path}", adapter)
+    return server
@@ -0,0 +1,69 @@
+import threading
+from urllib.parse import urlparse
+
+import requests
+from iaso_client import TokenManager
+from openhexa.sdk import current_run
+
+
+class EnketoClient:
+    """Client uploading edited submissions to Enketo.
+
+    IASO returns an Enketo edit URL per instance, but the submission endpoint derived
+    from it (`scheme://netloc/submission/<form token>`) only depends on the form. It is
+    resolved once through `api/enketo/edit/<uuid>/` and reused for the following
+    uploads, which all go through the same pooled keep-alive session. If Enketo
+    rejects an upload on the cached route, the route is resolved again for that
+    record and the upload retried once.
+    """
+
+    def __init__(self, token_manager: TokenManager, session: requests.Session):
+        self.token_manager = token_manager
+        self.session = session
+        self.resolve_count = 0
+        self._route: str | None = None
+        self._lock = threading.Lock()
+
+    def resolve(self, instance_uuid: str) -> str:
+        """Resolve the Enketo submission URL through the IASO edit endpoint and cache it.
+
+        Args:
+            instance_uuid (str): UUID of the instance to edit, without `uuid:` prefix.
+
+        Returns:
+            str: The Enketo submission URL.
+        """
+        edit_url_res = self.token_manager.request("GET", f"api/enketo/edit/{instance_uuid}/")
+        edit_url = urlparse(edit_url_res.json().get("edit_url", ""))
+        route = f"{edit_url.scheme}://{edit_url.netloc}/submission/{edit_url.path.split('/')[-1]}"
+        with self._lock:
+            self._route = route
+            self.resolve_count += 1
+        return route
+
+    def submit(self, instance_uuid: str, file_name: str, xml_data: bytes) -> requests.Response:
+        """Upload an edited submission.
+
+        Args:
+            instance_uuid (str): UUID of the edited instance, without `uuid:` prefix.
+            file_name (str): Name of the XML submission file.
+            xml_data (bytes): Content of the XML submission.
+
+        Returns:
+            requests.Response: The Enketo response of the last upload attempt.
+        """
+        cached_route = self._route
+        route = cached_route or self.resolve(instance_uuid)
+        response = self._post(route, file_name, xml_data)
+        if response.status_code in (200, 201) or cached_route is None:
+            return response
+
+        current_run.log_debug(
+            f"Enketo rejected the cached submission route ({response.status_code}), "
+            f"resolving it again for instance {instance_uuid}"
+        )
+        return self._post(self.resolve(instance_uuid), file_name, xml_data)
+
+    def _post(self, route: str, file_name: str, xml_data: bytes) -> requests.Response:
+        files = {"xml_submission_file": (file_name, xml_data, "application/xml")}
+        return self.token_manager.request("POST", route, session=self.session, files=files)
@@ -1,11 +1,17 @@
 import base64
 import json
+import math
+import threading
+import time
+from dataclasses import dataclass
 from functools import lru_cache
-from io import BytesIO
+from pathlib import Path
+from typing import Any
 
-import pandas as pd
 import polars as pl
 import requests
+from iaso_http import session_sharing_adapters
+from metadata_cache import FormMetadataCache
 from openhexa.sdk import IASOConnection, current_run
 from openhexa.toolbox.iaso import IASO
 from utils import clean_string
@@ -80,20 +86,48 @@ def get_app_id(iaso: IASO, project_id: int) -> str:
     return app_id
 
 
+@dataclass(frozen=True)
+class FormMetadata:
+    """The parsed XLSForm of a form version.
+
+    Attributes:
+        version_id (str): Version ID of the form version, `latest` if unknown.
+        questions (pl.DataFrame): The questions (survey) sheet, empty if the form
+            version has no XLS file.
+        choices (pl.DataFrame): The choices sheet, empty if the form has none.
+    """
+
+    version_id: str
+    questions: pl.DataFrame
+    choices: pl.DataFrame
+
+
+# Sheets of the XLSForm kept in `FormMetadata`
+FORM_SHEETS = ("questions", "choices")
+
+
 @lru_cache(maxsize=10)
-def get_form_metadata(
-    iaso: IASO, form_id: int, form_version: str | None = None, type_metadata: str = "questions"
-) -> pl.DataFrame:
-    """Retrieve metadata for a given form.
+def load_form_metadata(
+    iaso: IASO,
+    form_id: int,
+    form_version: str | None = None,
+    cache_dir: Path | None = None,
+) -> FormMetadata:
+    """Retrieve the questions and choices of a form version, from a single download.
+
+    The XLSForm file is downloaded once and its sheets are read in one pass. When
+    `cache_dir` is given, the parsed sheets are kept there across runs (see
+    `FormMetadataCache`): the file is only downloaded and parsed again when IASO
+    serves a different file for the form version.
 
     Args:
         iaso (IASO): An authenticated IASO object.
         form_id (int): The ID of the form.
-        form_version (str): form version id
-        type_metadata (str): Type of metadata to retrieve ('questions' or 'choices').
+        form_version (str | None): form version id, the latest version by default.
+        cache_dir (Path | None): Directory of the form metadata cache.
 
     Returns:
-        pl.DataFrame: DataFrame containing form metadata.
+        FormMetadata: The questions and choices of the form version.
     """
     try:
         if form_version:
@@ -105,11 +139,14 @@ def get_form_metadata(
             res = iaso.api_client.get("/api/formversions/", params=params)
             form_versions = res.json().get("form_versions", [])
             xls_url = next((fv.get("xls_file") for fv in form_versions if fv.get("xls_file")), "")
+            version_id = str(form_version)
         else:
             res = iaso.api_client.get(
                 f"/api/forms/{form_id}", params={"fields": "latest_form_version"}
             )
-            xls_url = res.json().get("latest_form_version", {}).get("xls_file", "")
+            latest_version = res.json().get("latest_form_version") or {}
+            xls_url = latest_version.get("xls_file", "")
+            version_id = str(latest_version.get("version_id") or "latest")
     except requests.RequestException as e:
         current_run.log_error(f"Form metadata fetch failed (network): {e}")
         raise
@@ -118,29 +155,32 @@ def get_form_metadata(
         raise
 
     if not xls_url:
-        return pl.DataFrame()
-
-    if type_metadata not in ("questions", "choices"):
-        raise ValueError("type_metadata must be 'questions' or 'choices'")
+        return FormMetadata(version_id, pl.DataFrame(), pl.DataFrame())
 
+    cache = FormMetadataCache(cache_dir) if cache_dir is not None else None
     try:
-        resp = requests.get(xls_url, timeout=30)
+        # Pooled session without the IASO credentials, as files may be served by a third party
+        session = session_sharing_adapters(iaso.api_client)
+        headers = cache.conditional_headers(form_id, version_id, FORM_SHEETS) if cache else {}
+        resp = session.get(xls_url, timeout=30, headers=headers)
+        if resp.status_code == 304 and cache is not None:
+            sheets = cache.load(form_id, version_id, FORM_SHEETS)
+            if sheets is not None:
+                current_run.log_info(f"Form {form_id} version {version_id} loaded from cache")
+                return FormMetadata(version_id, **sheets)
+            resp = session.get(xls_url, timeout=30)
         resp.raise_for_status()
-        bio = BytesIO(resp.content)
-        df_pd = (
-            pd.read_excel(bio, dtype=str)
-            if type_metadata == "questions"
-            else pd.read_excel(bio, sheet_name="choices", dtype=str)
-        )
-        df_pd = df_pd.dropna(how="all")
-        df_pl = pl.from_pandas(df_pd)
 
-        str_cols = [name for name, dtype in df_pl.schema.items() if dtype == pl.Utf8]
-        if str_cols:
-            df_pl = df_pl.with_columns(
-                [pl.col(c).str.replace_all(r"(^\s+)|(\s+$)", "") for c in str_cols]
-            )
-        return df_pl
+        # The server may not support conditional requests: the file can still be known
+        if cache is not None:
+            sheets = cache.load(form_id, version_id, FORM_SHEETS, cache.digest(resp))
+            if sheets is not None:
+                return FormMetadata(version_id, **sheets)
+
+        sheets = _parse_xlsform(resp.content)
+        if cache is not None:
+            cache.store(form_id, version_id, sheets, resp)
+        return FormMetadata(version_id, **sheets)
     except requests.RequestException as ex:
         current_run.log_error(f"Failed to download xls from {xls_url}: {ex}")
         raise
@@ -149,6 +189,33 @@ def get_form_metadata(
         raise
 
 
+def _parse_xlsform(content: bytes) -> dict[str, pl.DataFrame]:
+    """Parse the questions (first sheet) and choices sheets of an XLSForm file.
+
+    The workbook is opened once with calamine and every cell is read as text, with
+    surrounding whitespace stripped and empty rows dropped in the same pass.
+
+    Returns:
+        dict[str, pl.DataFrame]: The `questions` and `choices` sheets; `choices` is
+            empty if the form has none.
+    """
+    sheets = pl.read_excel(
+        content,
+        sheet_id=0,
+        engine="calamine",
+        infer_schema_length=0,
+        drop_empty_rows=True,
+        raise_if_empty=False,
+    )
+    names = list(sheets)
+    return {
+        key: sheets[name].with_columns(pl.col(pl.String).str.strip_chars())
+        if name in sheets
+        else pl.DataFrame()
+        for key, name in zip(FORM_SHEETS, (names[0], "choices"), strict=True)
+    }
+
+
 def validate_user_roles(iaso: IASO, app_id: str) -> bool:
     """Check if the user has the required role for the given app_id.
 
@@ -259,17 +326,202 @@ def fetch_form_meta(iaso: IASO, form_id: int) -> dict:
         raise
 
 
-def get_user_id_from_jwt(token: str) -> str:
-    """Extract user ID from a JWT token.
+def get_jwt_payload(token: str) -> dict:
+    """Decode the payload of a JWT token without verifying its signature.
 
     Args:
         token (str): JWT token string.
 
     Returns:
-        str: User ID extracted from the token, or empty string if not found.
+        dict: The decoded JWT claims.
     """
     payload_b64 = token.split(".")[1]
     payload_b64 += "=" * (-len(payload_b64) % 4)
     payload = base64.urlsafe_b64decode(payload_b64)
-    payload = json.loads(payload)
+    return json.loads(payload)
+
+
+def get_user_id_from_jwt(token: str) -> str:
+    """Extract user ID from a JWT token.
+
+    Args:
+        token (str): JWT token string.
+
+    Returns:
+        str: User ID extracted from the token, or empty string if not found.
+    """
+    payload = get_jwt_payload(token)
     return payload.get("user_id", "") or payload.get("id", "") or payload.get("sub", "")
+
+
+class TokenManager:
+    """IASO bearer token shared by all the requests of a run.
+
+    The token is obtained from `/api/token/` on first use and cached until shortly
+    before the expiry decoded from its `exp` claim, so long imports refresh it
+    proactively instead of failing once it expires. Requests sent through `request`
+    carry the current token and are retried once with a fresh token on a 401.
+    The manager can be shared between threads.
+    """
+
+    def __init__(self, iaso: IASO, refresh_margin: float = 60.0):
+        self.iaso = iaso
+        self.refresh_margin = refresh_margin
+        self.refresh_count = 0
+        self._token: str | None = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def token(self) -> str:
+        """Current access token, refreshed if it is about to expire."""
+        with self._lock:
+            if self._token is None or time.time() >= self._expires_at - self.refresh_margin:
+                self._refresh()
+            return self._token
+
+    @property
+    def user_id(self) -> str:
+        """ID of the user the token was issued for."""
+        return get_user_id_from_jwt(self.token)
+
+    def headers(self) -> dict[str, str]:
+        """Return Authorization headers carrying the current token.
+
+        Returns:
+            dict[str, str]: Authorization header mapping.
+        """
+        return {"Authorization": f"Bearer {self.token}"}
+
+    def invalidate(self, token: str) -> None:
+        """Force a refresh on next use, unless another thread already replaced `token`.
+
+        Args:
+            token (str): The token that was rejected by the server.
+        """
+        with self._lock:
+            if self._token == token:
+                self._token = None
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        session: requests.Session | None = None,
+        **kwargs: Any,
+    ) -> requests.Response:
+        """Send an authenticated request, retrying once with a fresh token on a 401.
+
+        Args:
+            method (str): HTTP method.
+            url (str): URL, relative to the IASO server when using the IASO API client.
+            session (requests.Session | None): Session used to send the request
+                (default: the IASO API client).
+            **kwargs: Extra arguments forwarded to `session.request`.
+
+        Returns:
+            requests.Response: The server response.
+        """
+        session = session or self.iaso.api_client
+        extra_headers = kwargs.pop("headers", None) or {}
+
+        token = self.token
+        response = self._send(session, method, url, token, extra_headers, **kwargs)
+        if response.status_code == 401:
+            current_run.log_warning(f"Access token rejected on {method} {url}, refreshing it")
+            self.invalidate(token)
+            response = self._send(session, method, url, self.token, extra_headers, **kwargs)
+        return response
+
+    @staticmethod
+    def _send(
+        session: requests.Session,
+        method: str,
+        url: str,
+        token: str,
+        extra_headers: dict,
+        **kwargs: Any,
+    ) -> requests.Response:
+        headers = {**extra_headers, "Authorization": f"Bearer {token}"}
+        try:
+            return session.request(method, url, headers=headers, **kwargs)
+        except requests.HTTPError as exc:
+            # Some clients raise on error statuses: surface 401s so they can be retried
+            if exc.response is not None and exc.response.status_code == 401:
+                return exc.response
+            raise
+
+    def _refresh(self) -> None:
+        headers = get_token_headers(self.iaso)
+        token = headers["Authorization"].removeprefix("Bearer ")
+        try:
+            exp = float(get_jwt_payload(token).get("exp") or math.inf)
+        except (IndexError, ValueError, TypeError):
+            exp = math.inf
+        self._token = token
+        self._expires_at = exp
+        self.refresh_count += 1
+
+
+def fetch_instances_state(
+    token_manager: TokenManager,
+    form_id: int,
+    instance_ids: list[int],
+    chunk_size: int = 500,
+    page_size: int = 100,
+    fields: tuple[str, ...] = ("id", "is_locked"),
+) -> dict[int, dict]:
+    """Fetch the lock status of many instances with bulk `/api/instances/` list calls.
+
+    Instance IDs are requested in chunks of `chunk_size`, each chunk being paginated
+    by `page_size` results. A chunk that cannot be fetched is skipped with a warning: its instances
+    are then missing from the result and must be checked one by one.
+
+    Args:
+        token_manager (TokenManager): Token manager used to authenticate the requests.
+        form_id (int): ID of the form the instances belong to.
+        instance_ids (list[int]): IDs of the instances to fetch.
+        chunk_size (int): Maximum number of instance IDs per request.
+        page_size (int): Number of instances per page.
+        fields (tuple[str, ...]): Instance fields to fetch, e.g. `file_content` to also
+            get the current answers of the instances.
+
+    Returns:
+        dict[int, dict]: The instances returned by IASO keyed by ID, each with at least
+            its `is_locked` status.
+    """
+    states: dict[int, dict] = {}
+    for start in range(0, len(instance_ids), chunk_size):
+        chunk = instance_ids[start : start + chunk_size]
+        wanted = set(chunk)
+        # Bound the pages by the chunk size, in case the server ignores the `ids` filter
+        max_pages = math.ceil(len(chunk) / page_size)
+        for page in range(1, max_pages + 1):
+            try:
+                res = token_manager.request(
+                    "GET",
+                    "/api/instances/",
+                    params={
+                        "form_ids": form_id,
+                        "ids": ",".join(str(instance_id) for instance_id in chunk),
+                        "fields": ",".join(fields),
+                        "limit": page_size,
+                        "page": page,
+                    },
+                )
+                res.raise_for_status()
+                data = res.json()
+            except (requests.RequestException, ValueError) as exc:
+                current_run.log_warning(
+                    f"Bulk fetch of {len(chunk)} instances failed ({exc}), "
+                    "they will be checked one by one"
+                )
+                break
+
+            for instance in data.get("instances") or []:
+                instance_id = instance.get("id")
+                if instance_id in wanted and "is_locked" in instance:
+                    states[instance_id] = instance
+            if not data.get("has_next"):
+                break
+    return states
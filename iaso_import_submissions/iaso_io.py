@@ -1,17 +1,32 @@
+import threading
+import zipfile
+from collections.abc import Iterator
 from pathlib import Path
+from types import TracebackType
 
 import polars as pl
 from openhexa.sdk import current_run
 
+# Number of rows read from the submissions file at a time
+READ_BATCH_SIZE = 10_000
+# Column of the batches holding the row number of each record in the file
+ROW_INDEX = "__source_row__"
+# Size of the Excel workbooks above which loading them in memory is reported
+EXCEL_WARNING_BYTES = 20 * 1024 * 1024
 
-def read_submissions_file(file_path: Path) -> pl.DataFrame:
-    """Read and validate submissions file.
+
+def scan_submissions_file(file_path: Path) -> pl.LazyFrame:
+    """Open a submissions file lazily.
+
+    CSV and Parquet files are scanned, so they are only read when the returned frame
+    is collected. Excel workbooks cannot be scanned and are loaded once (see
+    `_read_excel`).
 
     Args:
         file_path (Path): Path to the submissions file.
 
     Returns:
-        pl.DataFrame: DataFrame containing the validated submissions data.
+        pl.LazyFrame: The submissions.
 
     Raises:
         FileNotFoundError: If the file doesn't exist
@@ -23,41 +38,186 @@ def read_submissions_file(file_path: Path) -> pl.DataFrame:
     if file_path.stat().st_size == 0:
         raise ValueError(f"File {file_path} is empty")
 
-    current_run.log_info(f"📁 Reading submissions file: {file_path}")
-
-    try:
-        file_readers = {
-            ".csv": lambda fp: pl.read_csv(
-                fp,
-                infer_schema_length=10000,
-                ignore_errors=False,
-                truncate_ragged_lines=True,
-            ),
-            ".parquet": lambda fp: pl.read_parquet(fp, use_pyarrow=True),
-            ".xlsx": lambda fp: pl.read_excel(fp, engine="calamine"),
-            ".xls": lambda fp: pl.read_excel(fp, engine="calamine"),
-        }
-
-        suffix = file_path.suffix.lower()
-        reader = file_readers.get(suffix)
-
-        if not reader:
-            supported_formats = ", ".join(file_readers.keys())
-            raise ValueError(
-                f"Unsupported file format: '{suffix}'. Supported formats: {supported_formats}"
-            )
-
-        df = reader(file_path)
-
-        if df.is_empty():
+    file_scanners = {
+        ".csv": lambda fp: pl.scan_csv(
+            fp,
+            infer_schema_length=10000,
+            ignore_errors=False,
+            truncate_ragged_lines=True,
+        ),
+        ".parquet": pl.scan_parquet,
+        ".xlsx": _read_excel,
+        ".xls": _read_excel,
+    }
+
+    suffix = file_path.suffix.lower()
+    scanner = file_scanners.get(suffix)
+
+    if not scanner:
+        supported_formats = ", ".join(file_scanners.keys())
+        raise ValueError(
+            f"Unsupported file format: '{suffix}'. Supported formats: {supported_formats}"
+        )
+
+    return scanner(file_path)
+
+
+def _read_excel(file_path: Path) -> pl.LazyFrame:
+    """Load the first sheet of an Excel workbook.
+
+    calamine parses a whole sheet before returning any of its rows, even when only a
+    window of rows is requested, so reading the sheet in batches would parse it once
+    per batch without bounding memory. The sheet is loaded once instead, and a warning
+    is logged for workbooks larger than `EXCEL_WARNING_BYTES`.
+
+    Returns:
+        pl.LazyFrame: The rows of the sheet.
+    """
+    size = file_path.stat().st_size
+    if size > EXCEL_WARNING_BYTES:
+        current_run.log_warning(
+            f"Excel file `{file_path.name}` ({size / 2**20:.0f} MB) is loaded in memory as a "
+            "whole; convert it to CSV or Parquet to read it in batches"
+        )
+    return pl.read_excel(file_path, engine="calamine").lazy()
+
+
+class SubmissionSource:
+    """Submissions file read in fixed-size batches.
+
+    The file is never loaded as a whole (except Excel workbooks, see
+    `scan_submissions_file`): each call to `batches` streams it again in batches of
+    `batch_size` rows, so the memory used by an import does not depend on the size of
+    the file. Column casts registered with `cast` are applied to every batch, and
+    `check` reads the whole file once with them before anything is pushed.
+    """
+
+    def __init__(self, file_path: Path, batch_size: int = READ_BATCH_SIZE):
+        current_run.log_info(f"📁 Reading submissions file: {file_path}")
+        try:
+            self._frame = scan_submissions_file(file_path)
+            self.schema = self._frame.collect_schema()
+            self.height = self._frame.select(pl.len()).collect().item()
+        except Exception as e:
+            current_run.log_error(f"Unexpected error reading file: {e}")
+            raise
+
+        if self.height == 0:
+            current_run.log_error(f"Unexpected error reading file: File {file_path} is empty")
             raise ValueError(f"File {file_path} is empty")
 
+        self.path = file_path
+        self.batch_size = max(1, batch_size)
+        self._casts: dict[str, pl.DataType] = {}
         current_run.log_info(
-            f"✅ File read successfully - {len(df)} records, {len(df.columns)} columns"
+            f"✅ File read successfully - {self.height} records, {len(self.schema)} columns"
         )
 
-        return df
+    @property
+    def columns(self) -> list[str]:
+        """Names of the columns of the file."""
+        return self.schema.names()
+
+    def cast(self, dtypes: dict[str, pl.DataType]) -> None:
+        """Cast columns of every batch read from now on.
+
+        Args:
+            dtypes (dict[str, pl.DataType]): Target type of each column to cast.
+        """
+        self._casts.update(dtypes)
+        self.schema = self.lazy().collect_schema()
+
+    def lazy(self, predicate: pl.Expr | None = None) -> pl.LazyFrame:
+        """Return the submissions as a lazy frame, with the registered casts applied.
+
+        Args:
+            predicate (pl.Expr | None): Optional filter of the rows.
+
+        Returns:
+            pl.LazyFrame: The submissions.
+        """
+        frame = self._frame.with_columns(
+            pl.col(name).cast(dtype) for name, dtype in self._casts.items()
+        )
+        return frame if predicate is None else frame.filter(predicate)
+
+    def check(self) -> None:
+        """Read every value of the file once, with the registered casts applied.
+
+        Batches are only parsed when they are read, so without this check a value that
+        cannot be parsed or cast (e.g. text in a numeric column past the rows used to
+        infer the schema) would only fail the import once the batches before it have
+        been pushed. The file is streamed and only the null count of each column is
+        kept.
+
+        Raises:
+            ValueError: If a value of the file cannot be parsed or cast.
+        """
+        try:
+            self.lazy().select(pl.all().null_count()).collect(engine="streaming")
+        except pl.exceptions.PolarsError as e:
+            current_run.log_error(f"Submissions file `{self.path}` cannot be read: {e}")
+            raise ValueError(f"Submissions file `{self.path}` cannot be read: {e}") from e
+
+    def batches(self, predicate: pl.Expr | None = None) -> Iterator[pl.DataFrame]:
+        """Stream the submissions in batches of `batch_size` rows.
+
+        Rows are numbered in the `ROW_INDEX` column before they are filtered, so a row
+        can be reported with its position in the file.
+
+        Args:
+            predicate (pl.Expr | None): Optional filter of the rows, applied while reading.
+
+        Yields:
+            pl.DataFrame: The next batch of rows, in file order.
+        """
+        frame = self.lazy().with_row_index(ROW_INDEX)
+        if predicate is not None:
+            frame = frame.filter(predicate)
+        yield from frame.collect_batches(chunk_size=self.batch_size, lazy=True)
+
+
+class SubmissionArchive:
+    """Opt-in sink collecting rendered XML submissions into a single zip archive.
+
+    Submissions are uploaded straight from memory; the archive only keeps a copy of
+    them for auditing, one compressed file per run instead of one file per record.
+    Entries can be added from several worker threads.
+    """
 
-    except Exception as e:
-        current_run.log_error(f"Unexpected error reading file: {e}")
-        raise
+    def __init__(self, archive_path: Path):
+        archive_path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = archive_path
+        self.count = 0
+        self._lock = threading.Lock()
+        self._zip = zipfile.ZipFile(archive_path, mode="w", compression=zipfile.ZIP_DEFLATED)
+
+    def __enter__(self) -> "SubmissionArchive":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def add(self, name: str, content: bytes) -> None:
+        """Add a rendered XML submission to the archive.
+
+        Args:
+            name (str): File name of the submission inside the archive.
+            content (bytes): XML submission content.
+        """
+        with self._lock:
+            self._zip.writestr(name, content)
+            self.count += 1
+
+    def close(self) -> None:
+        """Finalize the archive and log where it was written."""
+        with self._lock:
+            if self._zip.fp is None:
+                return
+            self._zip.close()
+        current_run.log_info(f"Archived {self.count} XML submissions in `{self.path}`")
@@ -0,0 +1,142 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from types import TracebackType
+
+from openhexa.sdk import current_run
+
+# Statuses meaning the record reached IASO and must not be pushed again on resume
+COMMITTED_STATUSES = frozenset({"imported", "updated", "deleted", "unchanged"})
+
+
+class ImportJournal:
+    """Append-only SQLite journal of the records pushed to IASO.
+
+    Each entry records the key of an input row, the submission UUID generated for it
+    and its latest status. Entries are buffered in memory and written in batches; call
+    `flush` to force a write (e.g. before registering instances whose UUID must survive
+    a crash) and `close` once the run is done.
+
+    When a run is resumed, rows whose latest status is committed are skipped and rows
+    that already received a UUID reuse it, so IASO does not get duplicate instances.
+    """
+
+    def __init__(self, path: Path, resume: bool = False, flush_every: int = 500):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if not resume:
+            path.unlink(missing_ok=True)
+
+        self.path = path
+        self.flush_every = flush_every
+        self._lock = threading.Lock()
+        self._buffer: list[tuple[str, str | None, str, str, float]] = []
+        self._occurrences: Counter = Counter()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS journal ("
+            "key TEXT NOT NULL, uuid TEXT, status TEXT NOT NULL, mode TEXT NOT NULL, "
+            "logged_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+        # Latest entry per key wins since the journal is append-only
+        self._entries: dict[str, tuple[str | None, str]] = {
+            key: (uuid, status)
+            for key, uuid, status in self._conn.execute(
+                "SELECT key, uuid, status FROM journal ORDER BY rowid"
+            )
+        }
+        if resume:
+            committed = sum(status in COMMITTED_STATUSES for _, status in self._entries.values())
+            current_run.log_info(
+                f"Resuming import from journal `{path}`: {committed} records already committed"
+            )
+
+    def __enter__(self) -> "ImportJournal":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def record_key(self, record: dict, mode: str) -> str:
+        """Return a stable key identifying an input row.
+
+        The key is derived from the row content, plus its occurrence number so that
+        identical rows of the input file get distinct keys. It must be computed for
+        the rows in input order.
+
+        Args:
+            record (dict): The input row.
+            mode (str): The import mode the row is pushed with (CREATE, UPDATE, DELETE).
+
+        Returns:
+            str: The journal key of the row.
+        """
+        content = json.dumps(record, sort_keys=True, default=str).encode("utf-8")
+        digest = f"{mode}:{hashlib.sha1(content).hexdigest()}"
+        with self._lock:
+            self._occurrences[digest] += 1
+            return f"{digest}:{self._occurrences[digest]}"
+
+    def is_committed(self, key: str) -> bool:
+        """Return whether the row with this key already reached IASO.
+
+        Returns:
+            bool: True if the latest status of the row is committed.
+        """
+        entry = self._entries.get(key)
+        return entry is not None and entry[1] in COMMITTED_STATUSES
+
+    def uuid_for(self, key: str) -> str | None:
+        """Return the submission UUID previously generated for a row, if any.
+
+        Returns:
+            str | None: The UUID recorded for the row, or None.
+        """
+        entry = self._entries.get(key)
+        return entry[0] if entry else None
+
+    def log(self, key: str, uuid: str | None, status: str, mode: str) -> None:
+        """Append an entry to the journal, writing the buffer once it is full.
+
+        Args:
+            key (str): Key of the row, from `record_key`.
+            uuid (str | None): Submission UUID of the row.
+            status (str): Status reached by the row (pending, imported, ignored, ...).
+            mode (str): The import mode the row is pushed with.
+        """
+        with self._lock:
+            self._entries[key] = (uuid, status)
+            self._buffer.append((key, uuid, status, mode, time.time()))
+            if len(self._buffer) >= self.flush_every:
+                self._write_buffer()
+
+    def flush(self) -> None:
+        """Write all buffered entries to the journal."""
+        with self._lock:
+            self._write_buffer()
+
+    def close(self) -> None:
+        """Flush the buffered entries and close the journal."""
+        with self._lock:
+            self._write_buffer()
+            self._conn.close()
+
+    def _write_buffer(self) -> None:
+        if not self._buffer:
+            return
+        with self._conn:
+            self._conn.executemany(
+                "INSERT INTO journal (key, uuid, status, mode, logged_at) VALUES (?, ?, ?, ?, ?)",
+                self._buffer,
+            )
+        self._buffer.clear()
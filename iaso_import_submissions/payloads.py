@@ -0,0 +1,130 @@
+from datetime import datetime
+
+import polars as pl
+from openhexa.sdk import current_run
+
+# Numeric instance fields sent to IASO alongside the XML submission
+FLOAT_FIELDS = ("accuracy", "altitude", "latitude", "longitude")
+COORDINATE_BOUNDS = {"latitude": (-90.0, 90.0), "longitude": (-180.0, 180.0)}
+
+
+def _raw_column(df: pl.DataFrame, name: str) -> pl.Expr:
+    """Return the raw column, with blank strings treated as missing values.
+
+    Returns:
+        pl.Expr: The column expression, or a null literal if the column does not exist.
+    """
+    if name not in df.columns:
+        return pl.lit(None)
+    column = pl.col(name)
+    if df.schema[name] == pl.String:
+        column = column.str.strip_chars()
+        column = pl.when(column.str.len_chars() > 0).then(column)
+    return column
+
+
+def normalize_instance_fields(df: pl.DataFrame) -> pl.DataFrame:
+    """Normalize the numeric instance fields of every row in a single pass.
+
+    `org_unit_id` is cast to an integer and `accuracy`, `altitude`, `latitude` and
+    `longitude` to floats. Missing accuracy/altitude default to 0, and missing
+    coordinates default to 0 when their column exists (None otherwise), as IASO
+    expects. `created_at` is the timestamp of the run.
+
+    Values that cannot be parsed, non-integer org unit IDs and coordinates out of
+    range are reported in the `error` column instead of failing row by row.
+
+    Args:
+        df (pl.DataFrame): The submissions to push.
+
+    Returns:
+        pl.DataFrame: One row per input row with the normalized fields and an `error`
+            column naming the invalid fields (null when the row is valid).
+    """
+    created_at = int(datetime.now().timestamp())
+    raw = {name: _raw_column(df, name) for name in ("org_unit_id", *FLOAT_FIELDS)}
+    parsed = {name: expr.cast(pl.Float64, strict=False) for name, expr in raw.items()}
+
+    invalid = {name: raw[name].is_not_null() & parsed[name].is_null() for name in parsed}
+    invalid["org_unit_id"] = invalid["org_unit_id"] | (
+        parsed["org_unit_id"].is_not_null() & (parsed["org_unit_id"] % 1 != 0)
+    )
+    for name, (low, high) in COORDINATE_BOUNDS.items():
+        invalid[name] = invalid[name] | ~parsed[name].is_between(low, high).fill_null(True)
+
+    fields = [parsed["org_unit_id"].cast(pl.Int64, strict=False).alias("org_unit_id")]
+    for name in FLOAT_FIELDS:
+        if name in df.columns or name not in COORDINATE_BOUNDS:
+            fields.append(parsed[name].fill_null(0.0).alias(name))
+        else:
+            fields.append(pl.lit(None, pl.Float64).alias(name))
+
+    error = pl.concat_str(
+        [pl.when(mask).then(pl.lit(name)) for name, mask in invalid.items()],
+        separator=", ",
+        ignore_nulls=True,
+    )
+    # with_columns broadcasts literals to the height of df, even when no field column exists
+    columns = [
+        *fields,
+        pl.lit(created_at, pl.Int64).alias("created_at"),
+        pl.when(error.str.len_chars() > 0).then(error).alias("error"),
+    ]
+    return df.with_columns(columns).select(column.meta.output_name() for column in columns)
+
+
+def build_instance_payloads(
+    df: pl.DataFrame, form_id: int, mode: str
+) -> tuple[list[dict | None], list[str | None]]:
+    """Build the instance payload of every row before pushing the submissions.
+
+    For CREATE, the payload is the body registering the instance in `/api/instances`,
+    without the per-row `id`, `file` and `name` keys that depend on the generated
+    UUID. For UPDATE, it is the body patching the instance org unit and coordinates,
+    or None when the row has no `org_unit_id` or an ID of 0.
+
+    Args:
+        df (pl.DataFrame): The submissions to push.
+        form_id (int): The ID of the form.
+        mode (str): The import mode, CREATE or UPDATE.
+
+    Returns:
+        tuple[list[dict | None], list[str | None]]: The payload and the validation error
+            of each row, in the order of `df`.
+    """
+    fields = normalize_instance_fields(df)
+    has_org_unit = pl.col("org_unit_id").is_not_null()
+    coordinates = [pl.col(name) for name in FLOAT_FIELDS]
+    if mode == "CREATE":
+        error = pl.coalesce(pl.col("error"), pl.when(~has_org_unit).then(pl.lit("org_unit_id")))
+        payload = pl.struct(
+            pl.col("org_unit_id").alias("orgUnitId"),
+            pl.col("created_at"),
+            pl.lit(form_id, pl.Int64).alias("formId"),
+            *coordinates,
+        )
+    else:
+        # As for any falsy ID before, an org unit ID of 0 leaves the instance unpatched
+        has_org_unit = has_org_unit & (pl.col("org_unit_id") != 0)
+        # Coordinates are only sent along with an org unit, so they only matter then
+        error = pl.when(has_org_unit | pl.col("error").str.contains("org_unit_id")).then(
+            pl.col("error")
+        )
+        payload = pl.struct(
+            pl.col("org_unit_id").cast(pl.String).alias("org_unit"),
+            pl.lit(form_id, pl.Int64).alias("formID"),
+            *coordinates,
+        )
+
+    payloads = fields.select(
+        pl.when(has_org_unit & pl.col("error").is_null()).then(payload).alias("payload"),
+        error.alias("error"),
+    )
+
+    n_invalid = payloads["error"].is_not_null().sum()
+    if n_invalid:
+        current_run.log_warning(
+            f"{n_invalid} row(s) have a missing or invalid org unit ID or coordinates "
+            "and will be ignored"
+        )
+    return payloads["payload"].to_list(), payloads["error"].to_list()
@@ -1,24 +1,41 @@
 """Template for newly generated pipelines."""
 
+import threading
 import uuid
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
 from datetime import datetime
+from functools import partial
+from itertools import islice
 from pathlib import Path
-from urllib.parse import urlparse
+from typing import TypeVar
 
 import polars as pl
 import requests
+from content_diff import CONTENT_FIELDS, find_unchanged
+from dry_run import mount_dry_run
+from enketo_client import EnketoClient
 from iaso_client import (
+    TokenManager,
     authenticate_iaso,
     fetch_form_meta,
+    fetch_instances_state,
     get_app_id,
-    get_form_metadata,
     get_form_name,
-    get_token_headers,
-    get_user_id_from_jwt,
+    load_form_metadata,
     validate_user_roles,
 )
-from iaso_io import read_submissions_file
-from jinja2 import Template
+from iaso_http import (
+    DEFAULT_POOL_MAXSIZE,
+    TokenBucket,
+    mount_resilient_adapter,
+    session_sharing_adapters,
+)
+from iaso_io import ROW_INDEX, SubmissionArchive, SubmissionSource
+from journal import ImportJournal
+from metrics import RequestMetrics, StageMetrics, write_run_profile
 from openhexa.sdk import (
     File,  # type: ignore
     IASOConnection,
@@ -29,8 +46,30 @@ from openhexa.sdk import (
 )
 from openhexa.sdk.pipelines.parameter import IASOWidget  # type: ignore
 from openhexa.toolbox.iaso import IASO
-from template import enrich_submission_xml, generate_xml_template
-from validation import validate_data_structure, validate_field_constraints, validate_global_data
+from payloads import build_instance_payloads
+from stages import produce_ahead
+from template import SubmissionRenderer, TemplateRegistry, generate_xml_template
+from utils import clean_string
+from validation import FormValidator, validate_data_structure, validate_global_data
+
+# Compiled XML templates are persisted here so later runs can skip compilation
+TEMPLATE_CACHE_DIR = Path("iaso-pipelines", "import-submissions", ".cache", "templates")
+# Parsed form metadata is persisted here so later runs can skip downloading unchanged forms
+METADATA_CACHE_DIR = Path("iaso-pipelines", "import-submissions", ".cache", "form-metadata")
+# Maximum number of records validated and rendered ahead of the requests sent to IASO
+RENDER_AHEAD = 1000
+# Maximum number of form versions whose metadata is fetched concurrently
+METADATA_FETCH_WORKERS = 8
+# Seconds between progress logs while the partitions of CREATE_AND_UPDATE are pushed
+PROGRESS_LOG_INTERVAL = 60
+# Keys of a bulk deletion response that may hold the number (or list) of deleted instances
+BULK_DELETE_COUNT_KEYS = ("deleted_count", "count", "deleted")
+
+# Serializes the choice of archive names, so concurrent pushes never share an archive
+_ARCHIVE_LOCK = threading.Lock()
+
+T = TypeVar("T")
+R = TypeVar("R")
 
 CAST_MAP = {
     "String": pl.Utf8,
@@ -40,6 +79,29 @@ CAST_MAP = {
 }
 
 
+@dataclass
+class PreparedSubmission:
+    """A record on its way to IASO, from validation to upload.
+
+    `status` is set as soon as the outcome of the record is known without sending
+    anything (e.g. `ignored` for invalid rows). Otherwise `rendering` holds the future
+    XML submission, resolved into `xml` by the stage sending it. `is_valid` is the
+    outcome of the validation of the record's batch against its form constraints.
+    """
+
+    row: int
+    key: str | None
+    record: dict
+    uuid: str | None = None
+    file_name: str = ""
+    rendering: Future | None = None
+    xml: bytes = b""
+    instance_body: dict | None = None
+    instance_state: dict | None = None
+    status: str | None = None
+    is_valid: bool = True
+
+
 @pipeline("iaso_import_submissions")
 @parameter("iaso_connection", name="IASO connection", type=IASOConnection, required=True)  # type: ignore
 @parameter(
@@ -99,6 +161,109 @@ CAST_MAP = {
     ),
     required=False,
 )
+@parameter(
+    "max_workers",
+    type=int,  # type: ignore
+    name="Concurrent uploads",
+    default=8,
+    help=(
+        "Maximum number of submissions sent to IASO in parallel (default: 8), for uploads "
+        "and one-by-one deletions. Use 1 to process the records one by one."
+    ),
+    required=False,
+)
+@parameter(
+    "archive_submissions",
+    type=bool,  # type: ignore
+    name="Archive XML submissions",
+    default=False,
+    help=(
+        "If enabled, the generated XML submissions are kept in a single zip archive per run "
+        "in the output directory. Submissions are always uploaded straight from memory."
+    ),
+    required=False,
+)
+@parameter(
+    "batch_size",
+    type=int,  # type: ignore
+    name="Registration batch size",
+    default=500,
+    help=(
+        "Number of instances registered in IASO per `/api/instances` request in CREATE mode, "
+        "or deleted per bulk delete request in DELETE mode (default: 500)."
+    ),
+    required=False,
+)
+@parameter(
+    "resume",
+    type=bool,  # type: ignore
+    name="Resume previous import",
+    default=False,
+    help=(
+        "If enabled, rows already pushed by a previous run of the same input file "
+        "(according to the import journal in the output directory) are skipped."
+    ),
+    required=False,
+)
+@parameter(
+    "max_requests_per_second",
+    type=float,  # type: ignore
+    name="Max requests per second",
+    default=20.0,
+    help=(
+        "Upper bound of the request rate sent to IASO (default: 20). The rate is lowered "
+        "automatically when the server throttles requests; use 0 to disable rate limiting."
+    ),
+    required=False,
+)
+@parameter(
+    "dry_run",
+    type=str,  # type: ignore
+    name="Dry run / benchmark",
+    help=(
+        "Run the whole import without writing anything to IASO and save per-stage throughput "
+        "metrics in the output directory. 'OFFLINE' answers the write requests in-process, "
+        "'LOCAL_STUB' sends them over HTTP to a local stub server. Form metadata is still "
+        "read from IASO."
+    ),
+    choices=["OFFLINE", "LOCAL_STUB"],
+    required=False,
+)
+@parameter(
+    "dry_run_latency_ms",
+    type=int,  # type: ignore
+    name="Dry run latency (ms)",
+    default=0,
+    help=(
+        "Milliseconds the dry run stub waits before answering each write request, to "
+        "simulate the round trip to IASO (default: 0). Ignored outside of dry runs."
+    ),
+    required=False,
+)
+@parameter(
+    "skip_unchanged",
+    type=bool,  # type: ignore
+    name="Skip unchanged submissions",
+    default=False,
+    help=(
+        "If enabled, UPDATE fetches the current content of the instances in bulk and only "
+        "uploads the rows whose answers, org unit or coordinates differ. Skipped rows are "
+        "counted as `unchanged` in the summary."
+    ),
+    required=False,
+)
+@parameter(
+    "render_processes",
+    type=int,  # type: ignore
+    name="Render processes",
+    default=0,
+    help=(
+        "Number of worker processes rendering XML submissions while others are sent to "
+        "IASO (default: 0, render in a background thread of the pipeline). Use it when "
+        "rendering, not IASO, limits the throughput of CREATE and UPDATE."
+    ),
+    required=False,
+)
 def iaso_import_submissions(
     iaso_connection: IASOConnection,
     project: int,
@@ -107,11 +272,43 @@ def iaso_import_submissions(
     import_strategy: str,
     output_directory: str,
     strict_validation: bool,
+    max_workers: int,
+    archive_submissions: bool,
+    batch_size: int,
+    resume: bool,
+    max_requests_per_second: float,
+    dry_run: str | None,
+    dry_run_latency_ms: int,
+    skip_unchanged: bool,
+    render_processes: int,
 ):
     """Write your pipeline orchestration here."""
     current_run.log_info("Starting form submissions import pipeline")
-
-    iaso = authenticate_iaso(iaso_connection)
+    metrics = StageMetrics()
+    request_metrics = RequestMetrics()
+
+    with metrics.measure("authenticate_iaso"):
+        iaso = authenticate_iaso(iaso_connection)
+    limiter = TokenBucket(max_requests_per_second or 0)
+    mount_resilient_adapter(
+        iaso.api_client,
+        limiter,
+        pool_maxsize=max(DEFAULT_POOL_MAXSIZE, max_workers or 1),
+        metrics=request_metrics,
+    )
+    stub_server = (
+        mount_dry_run(
+            iaso.api_client,
+            iaso.api_client.server_url,
+            dry_run,
+            limiter,
+            request_metrics,
+            latency=(dry_run_latency_ms or 0) / 1000,
+        )
+        if dry_run
+        else None
+    )
+    token_manager = TokenManager(iaso)
     form_name = get_form_name(iaso, form_id)
     app_id = get_app_id(iaso, project)
 
@@ -119,17 +316,23 @@ def iaso_import_submissions(
         raise PermissionError("User does not have the required roles for this application.")
 
     # Import submissions file
-    df_submissions = read_submissions_file(Path(workspace.files_path, input_file.path))
+    with metrics.measure("scan") as measurement:
+        source = SubmissionSource(Path(workspace.files_path, input_file.path))
+        measurement.records = source.height
 
     # Get form metadata
-    questions = get_form_metadata(iaso=iaso, form_id=form_id)
-    choices = get_form_metadata(iaso=iaso, form_id=form_id, type_metadata="choices")
-
-    validation_result = validate_data_structure(
-        df_submissions,
-        questions,
-        import_strategy,
-    )
+    metadata_cache_dir = Path(workspace.files_path, METADATA_CACHE_DIR)
+    with metrics.measure("form_metadata"):
+        form_metadata = load_form_metadata(iaso=iaso, form_id=form_id, cache_dir=metadata_cache_dir)
+    questions, choices = form_metadata.questions, form_metadata.choices
+
+    # The structure only depends on the columns and their types, not on the rows
+    with metrics.measure("validate_structure", source.height):
+        validation_result = validate_data_structure(
+            pl.DataFrame(schema=source.schema),
+            questions,
+            import_strategy,
+        )
     if strict_validation and not validation_result["is_valid"]:
         error_messages = "\n".join(validation_result["errors"])
         current_run.log_error(f"Data structure validation failed:\n{error_messages}")
@@ -140,25 +343,63 @@ def iaso_import_submissions(
 
     for col_name, (expected, _actual) in validation_result["invalid_types"].items():
         current_run.log_info(f"Casting column '{col_name}' to expected type '{expected}'.")
-        df_submissions = df_submissions.with_columns(
-            pl.col(col_name).cast(CAST_MAP[expected]).alias(col_name)
-        )
+        source.cast({col_name: CAST_MAP[expected]})
 
     current_run.log_info("Data structure validation passed")
 
+    # Journal of pushed records, used to resume an interrupted import. Dry runs keep
+    # their own journal so they never mark records as pushed for real runs.
+    base_output = output_directory or f"iaso-pipelines/import-submissions/{form_name}"
+    journal_suffix = "_dry_run" if dry_run else ""
+    journal_name = f"journal_{clean_string(Path(input_file.path).stem)}{journal_suffix}.sqlite"
+    journal = ImportJournal(Path(workspace.files_path, base_output, journal_name), resume=resume)
+
     # process record by record to parse to endpoint
-    push_submissions(
-        iaso=iaso,
-        df=df_submissions,
-        questions=questions,
-        choices=choices,
-        form_name=form_name,
-        form_id=form_id,
-        app_id=app_id,
-        import_strategy=import_strategy,
-        output_directory=output_directory,
-        strict_validation=strict_validation,
-    )
+    summary = None
+    try:
+        with journal, metrics.measure("push_submissions", source.height) as measurement:
+            summary = push_submissions(
+                iaso=iaso,
+                source=source,
+                questions=questions,
+                choices=choices,
+                form_name=form_name,
+                form_id=form_id,
+                app_id=app_id,
+                import_strategy=import_strategy,
+                output_directory=output_directory,
+                strict_validation=strict_validation,
+                max_workers=max_workers,
+                archive_submissions=archive_submissions,
+                batch_size=batch_size,
+                journal=journal,
+                token_manager=token_manager,
+                metrics=metrics,
+                skip_unchanged=skip_unchanged,
+                render_processes=render_processes,
+            )
+            measurement.records_out = summary["imported"] + summary["updated"] + summary["deleted"]
+    finally:
+        if stub_server is not None:
+            stub_server.close()
+
+        # Every run leaves its per-stage profile next to its outputs, failed runs included
+        write_run_profile(
+            Path(workspace.files_path, base_output),
+            metrics,
+            request_metrics,
+            name="dry_run_metrics" if dry_run else "run_profile",
+            dry_run=dry_run,
+            import_strategy=import_strategy,
+            records=source.height,
+            max_workers=max_workers,
+            render_processes=render_processes,
+            batch_size=batch_size,
+            max_requests_per_second=max_requests_per_second,
+            summary=summary,
+        )
+
+    current_run.log_info(f"Access token requested {token_manager.refresh_count} time(s)")
 
 
 def generate_templates_for_versions(
@@ -168,39 +409,55 @@ def generate_templates_for_versions(
     meta: dict,
     questions: pl.DataFrame,
     choices: pl.DataFrame,
-) -> dict:
+    cache_dir: Path | None = None,
+    metadata_cache_dir: Path | None = None,
+) -> TemplateRegistry:
     """Generate XML templates keyed by form version.
 
     If no `form_version` column exists, only a `latest_version` template is created
     using the latest version id from metadata. Otherwise, each distinct version
-    in the dataframe gets its own template generated with version-specific questions.
+    in the dataframe gets its own template generated with version-specific questions,
+    the metadata of the versions being fetched concurrently.
+
+    Templates are compiled once in the returned registry; `cache_dir` optionally
+    persists the compiled templates across runs, and `metadata_cache_dir` the form
+    metadata of each version.
 
     Returns:
-        dict: {version_or_latest: xml_template_string}
+        TemplateRegistry: compiled templates keyed by version (or `latest_version`).
     """
-    templates: dict = {}
+    templates = TemplateRegistry(cache_dir=cache_dir)
 
     if "form_version" not in df.columns:
         latest_version = meta.get("latest_form_version") or {}
         latest_version_id = (
             str(latest_version.get("version_id", "")) if isinstance(latest_version, dict) else ""
         )
-        templates["latest_version"] = generate_xml_template(
-            df=df,
-            questions=questions,
-            id_form=str(meta.get("form_id") or ""),
-            form_version=latest_version_id,
-        )
-    else:
-        for version in df["form_version"].unique().to_list():
-            questions_for_version = get_form_metadata(
-                iaso=iaso, form_id=form_id, form_version=version
-            )
-            templates[version] = generate_xml_template(
+        templates.add(
+            "latest_version",
+            generate_xml_template(
                 df=df,
-                questions=questions_for_version,
+                questions=questions,
                 id_form=str(meta.get("form_id") or ""),
-                form_version=version,
+                form_version=latest_version_id,
+            ),
+        )
+    else:
+        versions = df["form_version"].unique(maintain_order=True).to_list()
+        fetch = partial(load_form_metadata, iaso, form_id, cache_dir=metadata_cache_dir)
+        with ThreadPoolExecutor(
+            max_workers=max(1, min(len(versions), METADATA_FETCH_WORKERS))
+        ) as executor:
+            metadata = list(executor.map(fetch, versions))
+        for version, form_metadata in zip(versions, metadata, strict=True):
+            templates.add(
+                version,
+                generate_xml_template(
+                    df=df,
+                    questions=form_metadata.questions,
+                    id_form=str(meta.get("form_id") or ""),
+                    form_version=version,
+                ),
             )
 
     return templates
@@ -208,18 +465,17 @@ def generate_templates_for_versions(
 
 def _select_template_and_is_valid(
     record: dict,
-    df: pl.DataFrame,
     strict_validation: bool,
-    questions: pl.DataFrame,
-    choices: pl.DataFrame,
-    templates: dict,
+    templates: TemplateRegistry,
+    is_valid: bool = True,
 ) -> tuple[bool, str | None]:
-    """Return (is_valid, xml_template) for a record.
+    """Return (is_valid, template_version) for a record.
 
     - If a 'latest_version' template exists, prefer it and use global summary columns
       when present to determine validity.
-    - Otherwise, validate the record against field constraints and select the
-      template matching the record's form_version.
+    - Otherwise, use `is_valid`, the result of the batch validation of the record
+      against the form constraints, and select the template matching the record's
+      form_version.
 
     If strict_validation is False, records are considered valid regardless of
     validation results.
@@ -227,11 +483,12 @@ def _select_template_and_is_valid(
     Returns:
         tuple[bool, str | None]:
             - is_valid: whether the record passes validation (or strict_validation is disabled)
-            - xml_template: the XML template string to use for rendering this record, or None
+            - template_version: the version of the XML template used to render this record
+              in `templates`, or None if there is none
     """
     if "latest_version" in templates:
-        constraints_present = "constraints_validation_summary" in df.columns
-        choices_present = "choices_validation_summary" in df.columns
+        constraints_present = "constraints_validation_summary" in record
+        choices_present = "choices_validation_summary" in record
 
         if constraints_present and choices_present:
             is_valid = bool(record.get("constraints_validation_summary")) and bool(
@@ -244,70 +501,558 @@ def _select_template_and_is_valid(
         else:
             is_valid = True
 
-        xml_template = templates["latest_version"]
+        template_version = "latest_version"
     else:
-        is_valid = validate_field_constraints(record, questions, choices)
-        xml_template = templates.get(record.get("form_version"))
+        form_version = record.get("form_version")
+        template_version = str(form_version) if form_version in templates else None
 
     # If strict validation is disabled, accept the record regardless
     if not strict_validation:
         is_valid = True
 
-    return is_valid, xml_template
+    return is_valid, template_version
 
 
-def handle_delete_mode(iaso: IASO, df: pl.DataFrame, headers: dict) -> dict[str, int]:
-    """Handle deletion of instances specified in the dataframe's 'id' column.
+def _new_summary() -> dict[str, int]:
+    """Return an empty summary of push outcomes.
 
     Returns:
-        dict[str, int]: summary counts for deleted/ignored.
+        dict[str, int]: zeroed counts for imported/updated/ignored/deleted/skipped/unchanged.
+    """
+    return {
+        "imported": 0,
+        "updated": 0,
+        "ignored": 0,
+        "deleted": 0,
+        "skipped": 0,
+        "unchanged": 0,
+    }
+
+
+def _pending_records(
+    df: pl.DataFrame,
+    mode: str,
+    journal: ImportJournal | None,
+    summary: dict[str, int],
+) -> Iterator[tuple[int, int, str | None, dict]]:
+    """Iterate over the rows that still have to be pushed to IASO.
+
+    Rows already committed according to the journal (when resuming a run) are
+    counted as `skipped` in the summary and not yielded. Rows are numbered after the
+    `ROW_INDEX` column of the batches read from the file, which is not part of the
+    yielded records, or after their position in `df` without it.
+
+    Yields:
+        tuple[int, int, str | None, dict]: position in `df`, row number in the file,
+            journal key and record.
+    """
+    for index, record in enumerate(df.iter_rows(named=True)):
+        row = record.pop(ROW_INDEX, index)
+        key = journal.record_key(record, mode) if journal is not None else None
+        if key is not None and journal.is_committed(key):
+            summary["skipped"] += 1
+            continue
+        yield index, row, key, record
+
+
+def _parse_instance_ids(df: pl.DataFrame) -> pl.Series:
+    """Parse the `id` column into IASO instance IDs in a single vectorized pass.
+
+    Invalid and missing IDs are reported in one log line each.
+
+    Returns:
+        pl.Series: The instance ID of each row, null when missing or invalid.
     """
-    summary = {"imported": 0, "updated": 0, "ignored": 0, "deleted": 0}
+    raw = df["id"]
+    if raw.dtype == pl.String:
+        raw = raw.str.strip_chars()
+        raw = raw.set(raw.str.len_chars() == 0, None)
+    instance_ids = raw.cast(pl.Int64, strict=False)
+
+    n_missing = raw.is_null().sum()
+    if n_missing:
+        current_run.log_error(f"Skipping {n_missing} record(s) with missing 'id' column value")
+    invalid = raw.filter(raw.is_not_null() & instance_ids.is_null()).cast(pl.String)
+    if len(invalid):
+        shown = ", ".join(invalid.head(20).to_list())
+        more = f" and {len(invalid) - 20} more" if len(invalid) > 20 else ""
+        current_run.log_error(
+            f"Skipping {len(invalid)} record(s) with invalid instance id: {shown}{more}"
+        )
+    return instance_ids
+
+
+def _delete_instance(instance_id: int, token_manager: TokenManager, metrics: StageMetrics) -> str:
+    """Delete one IASO instance.
 
-    if "id" not in df.columns:
-        msg = "DELETE mode requires an 'id' column with IASO Instance IDs"
+    Returns:
+        str: the summary key to increment ("deleted" or "ignored").
+    """
+    try:
+        with metrics.measure("delete"):
+            inst_res = token_manager.request("DELETE", f"/api/instances/{instance_id}")
+
+        if inst_res.status_code in (200, 201, 204):
+            return "deleted"
+
+        err = getattr(inst_res, "text", None)
+        msg = (
+            f"Failed to delete instance (id={instance_id}, "
+            f"status={inst_res.status_code}, resp={err})"
+        )
         current_run.log_error(msg)
-        raise RuntimeError(msg)
-
-    for record in df.iter_rows(named=True):
-        try:
-            record_id = record.get("id")
-            if record_id is None:
-                current_run.log_error("Skipping record with missing 'id' column value")
-                summary["ignored"] += 1
-                continue
-
-            try:
-                instance_id = int(record_id)
-            except (ValueError, TypeError):
-                current_run.log_error(f"Invalid instance id for record: {record_id}")
-                summary["ignored"] += 1
-                continue
-
-            inst_res = iaso.api_client.delete(f"/api/instances/{instance_id}", headers=headers)
-
-            if inst_res.status_code in (200, 201, 204):
-                summary["deleted"] += 1
-            else:
-                err = getattr(inst_res, "text", None)
-                msg = (
-                    f"Failed to delete instance (id={instance_id}, "
-                    f"status={inst_res.status_code}, resp={err})"
-                )
-                current_run.log_error(msg)
-                summary["ignored"] += 1
 
-        except Exception as exc:
-            current_run.log_error(f"Error processing record (id={record.get('id')}): {exc}")
-            summary["ignored"] += 1
+    except Exception as exc:
+        current_run.log_error(f"Error processing record (id={instance_id}): {exc}")
+
+    return "ignored"
+
+
+def _bulk_delete_instances(token_manager: TokenManager, instance_ids: list[int]) -> int | None:
+    """Delete a batch of instances with a single `/api/instances/bulkdelete/` call.
+
+    The toolbox API client raises on error statuses, so a missing endpoint (404/405)
+    is detected from either the response or the raised `requests.HTTPError`. The number
+    of deleted instances is read from the response (see `BULK_DELETE_COUNT_KEYS`); a
+    response without it counts every instance of the batch as deleted.
+
+    Returns:
+        int | None: The number of distinct instances deleted, 0 if the batch was
+            rejected, or None if the server does not provide the bulk endpoint.
+    """
+    expected = len(set(instance_ids))
+    try:
+        res = token_manager.request(
+            "POST",
+            "/api/instances/bulkdelete/",
+            json={
+                "select_all": False,
+                "selected_ids": sorted(set(instance_ids)),
+                "unselected_ids": [],
+                "is_deletion": True,
+            },
+        )
+    except Exception as exc:
+        response = getattr(exc, "response", None)
+        if response is not None and response.status_code in (404, 405):
+            return None
+        current_run.log_warning(f"Bulk deletion of {len(instance_ids)} instances failed: {exc}")
+        return 0
+
+    if res.status_code in (404, 405):
+        return None
+    if res.status_code in (200, 201, 204):
+        return _bulk_deleted_count(res, expected)
+
+    current_run.log_warning(
+        f"Bulk deletion of {len(instance_ids)} instances failed "
+        f"(status={res.status_code}, resp={getattr(res, 'text', None)})"
+    )
+    return 0
+
+
+def _bulk_deleted_count(res: requests.Response, expected: int) -> int:
+    """Read the number of instances deleted from a bulk deletion response.
+
+    Returns:
+        int: The first count found under `BULK_DELETE_COUNT_KEYS` (a list counting its
+            items), capped to `expected`, or `expected` if the response reports none.
+    """
+    try:
+        body = res.json()
+    except ValueError:
+        return expected
+    if not isinstance(body, dict):
+        return expected
+    for key in BULK_DELETE_COUNT_KEYS:
+        count = body.get(key)
+        if isinstance(count, list):
+            count = len(count)
+        if isinstance(count, int) and not isinstance(count, bool):
+            return max(0, min(count, expected))
+    return expected
+
+
+def handle_delete_mode(
+    iaso: IASO,
+    batches: Iterable[pl.DataFrame],
+    token_manager: TokenManager,
+    journal: ImportJournal | None = None,
+    metrics: StageMetrics | None = None,
+    max_workers: int = 1,
+    batch_size: int = 500,
+) -> dict[str, int]:
+    """Handle deletion of instances specified in the 'id' column of the input batches.
+
+    IDs are parsed one input batch at a time, so missing and invalid IDs are reported in
+    one pass per batch. Valid IDs are deleted in batches of `batch_size` through IASO's
+    bulk delete endpoint. If the endpoint is not available, or rejects a batch, the
+    instances of the batch are deleted one by one with up to `max_workers` requests in
+    flight.
+
+    Returns:
+        dict[str, int]: summary counts for deleted/ignored.
+    """
+    summary = _new_summary()
+    metrics = metrics or StageMetrics()
+    delete_instance = partial(_delete_instance, token_manager=token_manager, metrics=metrics)
+    bulk_supported = True
+
+    try:
+        for df in batches:
+            if "id" not in df.columns:
+                msg = "DELETE mode requires an 'id' column with IASO Instance IDs"
+                current_run.log_error(msg)
+                raise RuntimeError(msg)
+
+            instance_ids = _parse_instance_ids(df).to_list()
+            pending = _pending_records(df, "DELETE", journal, summary)
+            for chunk in _chunked(pending, batch_size):
+                valid = [
+                    (index, key)
+                    for index, _row, key, _record in chunk
+                    if instance_ids[index] is not None
+                ]
+                summary["ignored"] += len(chunk) - len(valid)
+                if journal is not None:
+                    for index, _row, key, _record in chunk:
+                        if instance_ids[index] is None:
+                            journal.log(key, None, "ignored", "DELETE")
+
+                chunk_ids = [instance_ids[index] for index, _key in valid]
+                deleted = None
+                if bulk_supported and chunk_ids:
+                    with metrics.measure("delete_bulk", len(chunk_ids)) as measurement:
+                        deleted = _bulk_delete_instances(token_manager, chunk_ids)
+                        measurement.records_out = deleted or 0
+                    if deleted is None:
+                        current_run.log_info(
+                            "Bulk deletion is not available on this server, "
+                            "deleting instances one by one"
+                        )
+                        bulk_supported = False
+
+                if deleted and deleted < len(set(chunk_ids)):
+                    # IASO does not say which instances it left: the rows stay uncommitted
+                    # in the journal, so a resumed import deletes them again
+                    missed = len(set(chunk_ids)) - deleted
+                    current_run.log_warning(
+                        f"Bulk deletion removed {deleted} of {len(set(chunk_ids))} instances, "
+                        f"{missed} were not found or could not be deleted; counting "
+                        f"{len(chunk_ids) - deleted} row(s) as ignored"
+                    )
+                    statuses: Iterable[str] = ["ignored"] * len(chunk_ids)
+                    summary["deleted"] += deleted
+                    summary["ignored"] -= deleted
+                elif deleted:
+                    statuses = ["deleted"] * len(chunk_ids)
+                else:
+                    statuses = _run_concurrently(delete_instance, chunk_ids, max_workers)
+
+                for (_index, key), status in zip(valid, statuses, strict=True):
+                    summary[status] += 1
+                    if key is not None:
+                        journal.log(key, None, status, "DELETE")
+    finally:
+        if journal is not None:
+            journal.flush()
 
     current_run.log_info(f"Deleted submissions successfully. Summary: {summary}")
     return summary
 
 
+def _run_concurrently(
+    func: Callable[[T], R],
+    records: Iterable[T],
+    max_workers: int,
+    executor: ThreadPoolExecutor | None = None,
+) -> Iterator[R]:
+    """Apply `func` to every record keeping at most a bounded number of records in flight.
+
+    Results are yielded in input order so callers can aggregate them from a single
+    thread. With `max_workers <= 1` records are processed in the calling thread, unless
+    an `executor` shared with other concurrent pushes is given: its workers then bound
+    the requests in flight across all of them.
+
+    Yields:
+        the result of `func` for each record (e.g. its status).
+    """
+    if executor is not None:
+        yield from _in_order(executor, func, records, max(1, max_workers) * 2)
+        return
+    if max_workers <= 1:
+        yield from map(func, records)
+        return
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="iaso-push") as executor:
+        yield from _in_order(executor, func, records, max_workers * 2)
+
+
+def _in_order(
+    executor: ThreadPoolExecutor, func: Callable[[T], R], records: Iterable[T], window: int
+) -> Iterator[R]:
+    """Submit `func` for every record with at most `window` results pending.
+
+    Yields:
+        the result of `func` for each record, in input order.
+    """
+    pending: deque[Future] = deque()
+    for record in records:
+        pending.append(executor.submit(func, record))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def _chunked(items: Iterable[T], size: int) -> Iterator[list[T]]:
+    """Split an iterable into lists of at most `size` items.
+
+    Yields:
+        list: the next chunk of items.
+    """
+    iterator = iter(items)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _open_archive(output_dir: Path) -> SubmissionArchive:
+    """Open the per-run zip archive collecting XML submissions in `output_dir`.
+
+    A numbered suffix is added if an archive with the same name already exists, e.g.
+    when both partitions of CREATE_AND_UPDATE archive into the same directory.
+
+    Returns:
+        SubmissionArchive: the archive sink; it must be closed once the run is done.
+    """
+    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    with _ARCHIVE_LOCK:
+        path = output_dir / f"submissions_{timestamp}.zip"
+        suffix = 1
+        while path.exists():
+            suffix += 1
+            path = output_dir / f"submissions_{timestamp}_{suffix}.zip"
+        return SubmissionArchive(path)
+
+
+def _validate_batch(
+    df: pl.DataFrame, validator: FormValidator, metrics: StageMetrics
+) -> list[bool]:
+    """Validate the constraints and choices of a batch with a `form_version` column.
+
+    Batches without it carry the summary columns of `validate_global_data` instead.
+
+    Returns:
+        list[bool]: Whether each row of `df` is valid, in order.
+    """
+    if "form_version" not in df.columns:
+        return [True] * len(df)
+    with metrics.measure("validate_batch", len(df)) as measurement:
+        valid = validator.validate_batch(df).to_list()
+        measurement.records_out = sum(valid)
+    return valid
+
+
+def _create_submissions(
+    batches: Iterable[pl.DataFrame],
+    form_id: int,
+    validator: FormValidator,
+    journal: ImportJournal | None,
+    summary: dict[str, int],
+    metrics: StageMetrics,
+) -> Iterator[PreparedSubmission]:
+    """Iterate over the rows to create, with their instance payload and validity.
+
+    Rows with an invalid org unit ID or coordinates are yielded as `ignored`.
+
+    Yields:
+        PreparedSubmission: the next row to create, not validated nor rendered yet.
+    """
+    for df in batches:
+        with metrics.measure("payloads", len(df)):
+            payloads, errors = build_instance_payloads(df, form_id, "CREATE")
+        valid = _validate_batch(df, validator, metrics)
+        for index, row, key, record in _pending_records(df, "CREATE", journal, summary):
+            sub = PreparedSubmission(row=row, key=key, record=record, is_valid=valid[index])
+            if errors[index] is not None:
+                current_run.log_error(f"Invalid {errors[index]} for row {row}, skipping")
+                sub.status = "ignored"
+            else:
+                sub.instance_body = payloads[index]
+            yield sub
+
+
+def _prepare_create(
+    sub: PreparedSubmission,
+    strict_validation: bool,
+    templates: TemplateRegistry,
+    renderer: SubmissionRenderer,
+    journal: ImportJournal | None,
+    metrics: StageMetrics,
+) -> PreparedSubmission:
+    """Validate a record, start rendering it and build the body registering its instance.
+
+    `sub.instance_body` initially holds the normalized instance fields of the record,
+    built by `build_instance_payloads`.
+
+    Returns:
+        PreparedSubmission: the submission being rendered, or `ignored`.
+    """
+    if sub.status is not None:
+        return sub
+
+    record = sub.record
+    try:
+        with metrics.measure("validate"):
+            is_valid, template_version = _select_template_and_is_valid(
+                record=record,
+                strict_validation=strict_validation,
+                templates=templates,
+                is_valid=sub.is_valid,
+            )
+        if not is_valid:
+            sub.status = "ignored"
+            return sub
+
+        if not template_version:
+            current_run.log_error(
+                f"No XML template available for row {sub.row} "
+                f"form_version={record.get('form_version')}, skipping"
+            )
+            sub.status = "ignored"
+            return sub
+
+        the_uuid = (journal.uuid_for(sub.key) if sub.key is not None else None) or str(uuid.uuid4())
+        file_name = f"{the_uuid}.xml"
+        sub.rendering = renderer.submit(template_version, {**record, **{"uuid": the_uuid}})
+        sub.uuid = the_uuid
+        sub.file_name = file_name
+        sub.instance_body = {
+            "id": the_uuid,
+            **(sub.instance_body or {}),
+            "file": file_name,
+            "name": file_name,
+        }
+    except Exception as exc:
+        current_run.log_error(
+            f"Error processing row {sub.row} (org_unit_id={record.get('org_unit_id')}): {exc}"
+        )
+        sub.status = "ignored"
+
+    return sub
+
+
+def _resolve_xml(sub: PreparedSubmission, archive: SubmissionArchive | None) -> bool:
+    """Wait for the XML of a submission to be rendered, and archive it.
+
+    Returns:
+        bool: True if the XML is available in `sub.xml`, False if rendering failed.
+    """
+    if sub.rendering is None:
+        return False
+    try:
+        sub.xml = sub.rendering.result()
+    except Exception as exc:
+        current_run.log_error(
+            f"Error rendering row {sub.row} (org_unit_id={sub.record.get('org_unit_id')}): {exc}"
+        )
+        return False
+
+    if archive is not None:
+        archive.add(sub.file_name, sub.xml)
+    return True
+
+
+def _register_instances(
+    token_manager: TokenManager,
+    submissions: list[PreparedSubmission],
+    app_id: str,
+) -> list[PreparedSubmission]:
+    """Register a batch of instances in IASO with a single `/api/instances` call.
+
+    `/api/instances` accepts a list of instance bodies but reports the outcome for the
+    whole batch only. If the batch is rejected, its instances are registered one by one
+    so the failing rows can still be identified and reported.
+
+    Returns:
+        list[PreparedSubmission]: the submissions whose instance was registered.
+    """
+    if not submissions:
+        return []
+
+    try:
+        inst_res = token_manager.request(
+            "POST",
+            "/api/instances",
+            json=[sub.instance_body for sub in submissions],
+            params={"app_id": str(app_id)},
+        )
+        if inst_res.status_code in (200, 201):
+            return submissions
+        error = f"status={inst_res.status_code}, resp={getattr(inst_res, 'text', None)}"
+    except Exception as exc:
+        error = str(exc)
+
+    if len(submissions) == 1:
+        sub = submissions[0]
+        current_run.log_error(
+            f"Failed to create instance for row {sub.row} "
+            f"(org_unit_id={sub.record.get('org_unit_id')}), {error}"
+        )
+        return []
+
+    current_run.log_warning(
+        f"Batch registration of {len(submissions)} instances failed ({error}), "
+        "registering them one by one"
+    )
+    return [
+        sub
+        for sub in submissions
+        if _register_instances(token_manager=token_manager, submissions=[sub], app_id=app_id)
+    ]
+
+
+def _upload_submission(
+    submission: PreparedSubmission, token_manager: TokenManager, metrics: StageMetrics
+) -> str:
+    """Upload the XML of a registered instance to `/sync/form_upload/`.
+
+    Returns:
+        str: the summary key to increment ("imported" or "ignored").
+    """
+    try:
+        with metrics.measure("upload") as measurement:
+            measurement.bytes = len(submission.xml)
+            upload_res = token_manager.request(
+                "POST",
+                "/sync/form_upload/",
+                files={
+                    "xml_submission_file": (
+                        submission.file_name,
+                        submission.xml,
+                        "application/xml",
+                    )
+                },
+            )
+            measurement.records_out = int(upload_res.status_code == 201)
+        if upload_res.status_code == 201:
+            return "imported"
+
+        current_run.log_error(
+            f"Upload failed for row {submission.row} "
+            f"({submission.file_name}): status={upload_res.status_code} "
+            f"resp={getattr(upload_res, 'text', None)}"
+        )
+    except Exception as exc:
+        current_run.log_error(
+            f"Error uploading row {submission.row} ({submission.file_name}): {exc}"
+        )
+    return "ignored"
+
+
 def handle_create_mode(
     iaso: IASO,
-    df: pl.DataFrame,
+    batches: Iterable[pl.DataFrame],
     questions: pl.DataFrame,
     choices: pl.DataFrame,
     form_name: str,
@@ -315,260 +1060,524 @@ def handle_create_mode(
     app_id: str,
     strict_validation: bool,
     output_directory: str | None,
-    templates: dict,
+    token_manager: TokenManager,
+    templates: TemplateRegistry,
+    max_workers: int = 1,
+    archive_submissions: bool = False,
+    batch_size: int = 500,
+    journal: ImportJournal | None = None,
+    metrics: StageMetrics | None = None,
+    render_processes: int = 0,
+    validator: FormValidator | None = None,
+    summary: dict[str, int] | None = None,
+    executor: ThreadPoolExecutor | None = None,
 ) -> dict[str, int]:
-    """Handle creation/import of new instances from the dataframe.
+    """Handle creation/import of new instances from the input batches.
+
+    The import runs as two overlapping stages connected by a bounded queue. A
+    background thread reads the input batches, validates the records and renders
+    their XML, in `render_processes` worker processes if set. Meanwhile the calling
+    thread takes the rendered records in chunks of `batch_size`: the instances of a
+    chunk are registered with a single `/api/instances` call, then the XML submissions
+    are uploaded with up to `max_workers` uploads in flight. XML is sent from memory
+    and, if `archive_submissions` is set, collected into a zip archive.
+
+    When a `journal` is given, the UUID generated for each row is persisted before its
+    instance is registered and the outcome of each row is recorded. Rows already
+    committed are skipped and rows interrupted mid-way reuse their UUID, so resuming
+    a run does not create duplicate instances.
+
+    Counts are accumulated in `summary` if given, so they can be followed while the
+    import runs. Uploads are sent through `executor` if given, sharing its workers with
+    other concurrent pushes instead of starting `max_workers` threads of their own.
 
     Returns:
         dict[str, int]: summary counts for imported/ignored/updated.
     """
-    summary = {"imported": 0, "updated": 0, "ignored": 0, "deleted": 0}
+    summary = summary if summary is not None else _new_summary()
+    metrics = metrics or StageMetrics()
+    validator = validator or FormValidator(questions, choices)
 
     default_output = f"iaso-pipelines/import-submissions/{form_name}/creates"
     output_dir = Path(workspace.files_path) / (output_directory or default_output)
-    output_dir.mkdir(exist_ok=True, parents=True)
+    archive = _open_archive(output_dir) if archive_submissions else None
+
+    upload = partial(_upload_submission, token_manager=token_manager, metrics=metrics)
+    try:
+        with SubmissionRenderer(templates, render_processes, metrics) as renderer:
+            prepare = partial(
+                _prepare_create,
+                strict_validation=strict_validation,
+                templates=templates,
+                renderer=renderer,
+                journal=journal,
+                metrics=metrics,
+            )
+            submissions = produce_ahead(
+                _create_submissions(batches, form_id, validator, journal, summary, metrics),
+                prepare,
+                buffer=max(RENDER_AHEAD, batch_size),
+                metrics=metrics,
+                stage="render",
+            )
+            for chunk in _chunked(submissions, batch_size):
+                prepared = [
+                    sub for sub in chunk if sub.status is None and _resolve_xml(sub, archive)
+                ]
+                if journal is not None:
+                    prepared_rows = {sub.row for sub in prepared}
+                    for sub in chunk:
+                        if sub.row not in prepared_rows and sub.key is not None:
+                            journal.log(sub.key, sub.uuid, "ignored", "CREATE")
+                    for sub in prepared:
+                        journal.log(sub.key, sub.uuid, "pending", "CREATE")
+                    journal.flush()
+
+                with metrics.measure("register", len(prepared)) as measurement:
+                    registered = _register_instances(
+                        token_manager=token_manager, submissions=prepared, app_id=app_id
+                    )
+                    measurement.records_out = len(registered)
+                summary["ignored"] += len(chunk) - len(registered)
+                if journal is not None:
+                    registered_uuids = {sub.uuid for sub in registered}
+                    for sub in prepared:
+                        if sub.uuid not in registered_uuids:
+                            journal.log(sub.key, sub.uuid, "ignored", "CREATE")
+
+                for sub, status in zip(
+                    registered,
+                    _run_concurrently(upload, registered, max_workers, executor),
+                    strict=True,
+                ):
+                    summary[status] += 1
+                    if journal is not None:
+                        journal.log(sub.key, sub.uuid, status, "CREATE")
+    finally:
+        if archive is not None:
+            archive.close()
+        if journal is not None:
+            journal.flush()
+
+    return summary
 
-    headers = get_token_headers(iaso)
 
-    for record in df.iter_rows(named=True):
-        try:
-            is_valid, xml_template = _select_template_and_is_valid(
+def _prepare_update(
+    sub: PreparedSubmission,
+    strict_validation: bool,
+    templates: TemplateRegistry,
+    renderer: SubmissionRenderer,
+    user_id: str,
+    metrics: StageMetrics,
+) -> PreparedSubmission:
+    """Validate a record and start rendering the XML submission editing its instance.
+
+    Returns:
+        PreparedSubmission: the submission being rendered (without `rendering` if no
+            template is available for the record), or `ignored`.
+    """
+    if sub.status is not None:
+        return sub
+
+    record = sub.record
+    try:
+        with metrics.measure("validate"):
+            is_valid, template_version = _select_template_and_is_valid(
                 record=record,
-                df=df,
                 strict_validation=strict_validation,
-                questions=questions,
-                choices=choices,
                 templates=templates,
+                is_valid=sub.is_valid,
             )
-            if not is_valid:
-                summary["ignored"] += 1
-                continue
+        if not is_valid:
+            sub.status = "ignored"
+            return sub
+
+        instance_uuid_raw = record.get("instanceID")
+        instance_uuid = (
+            instance_uuid_raw.removeprefix("uuid:") if isinstance(instance_uuid_raw, str) else None
+        )
+
+        if instance_uuid is None:
+            current_run.log_error("Skipping record with missing 'instanceID' column value")
+            sub.status = "ignored"
+            return sub
+
+        sub.uuid = str(instance_uuid)
+        sub.file_name = f"update_{sub.uuid}.xml"
+        if template_version:
+            sub.rendering = renderer.submit(
+                template_version,
+                {**record, **{"uuid": sub.uuid}},
+                iaso_instance=int(record.get("id")),  # type: ignore
+                edit_user_id=int(user_id) if user_id else None,
+            )
+    except Exception as exc:
+        current_run.log_error(f"Error processing record {record.get('org_unit_id', '')}: {exc}")
+        sub.status = "ignored"
+
+    return sub
+
 
-            the_uuid = str(uuid.uuid4())
-            file_path = output_dir / f"{the_uuid}.xml"
+def _send_update(
+    sub: PreparedSubmission,
+    token_manager: TokenManager,
+    enketo: EnketoClient,
+    archive: SubmissionArchive | None,
+    metrics: StageMetrics,
+) -> tuple[PreparedSubmission, str]:
+    """Update an existing IASO instance from a prepared record.
 
-            if not xml_template:
+    The instance org unit and coordinates are patched when `sub.instance_body` is set,
+    then the rendered submission is uploaded to Enketo unless the instance is locked.
+    `sub.instance_state` is the instance prefetched by `_prefetch_instance_states`; when
+    missing, its lock status is fetched here.
+
+    Returns:
+        tuple[PreparedSubmission, str]: the submission and the summary key to increment
+            ("updated", "ignored" or the status already set on the submission).
+    """
+    if sub.status is not None:
+        return sub, sub.status
+
+    record = sub.record
+    try:
+        with metrics.measure("update") as measurement:
+            measurement.records_out = 0
+            if sub.instance_body is not None:
+                # Handle the case where org_unit_id is present
+                token_manager.request(
+                    "PATCH", f"/api/instances/{record.get('id')}", json=sub.instance_body
+                )
+
+            if sub.rendering is None:
                 current_run.log_error(
                     "No XML template available for record "
                     f"form_version={record.get('form_version')}, skipping"
                 )
-                summary["ignored"] += 1
-                continue
+                return sub, "ignored"
 
-            data = {**record, **{"uuid": the_uuid}}
-            xml_data = Template(xml_template).render(
-                **{k: v if v is not None else "" for k, v in data.items()}
-            )
-            with file_path.open("w", encoding="utf-8") as f:
-                f.write(xml_data)
-
-            instance_body = {
-                "id": the_uuid,
-                "orgUnitId": int(record.get("org_unit_id")),  # type: ignore
-                "created_at": int(datetime.now().timestamp()),
-                "formId": form_id,
-                "accuracy": float(record.get("accuracy") or 0) if "accuracy" in record else 0,
-                "altitude": float(record.get("altitude") or 0) if "altitude" in record else 0,
-                "latitude": float(record.get("latitude") or 0) if "latitude" in record else None,
-                "longitude": float(record.get("longitude") or 0) if "longitude" in record else None,
-                "file": file_path.as_posix(),
-                "name": file_path.name,
-            }
-
-            inst_res = iaso.api_client.post(
-                "/api/instances",
-                json=[instance_body],
-                headers=headers,
-                params={"app_id": str(app_id)},
-            )
-            if inst_res.status_code not in (200, 201):
-                current_run.log_error(
-                    "Failed to create instance for record "
-                    f"(org_unit_id={record.get('org_unit_id')}), "
-                    f"status={inst_res.status_code}, resp={getattr(inst_res, 'text', None)}"
+            # Get iaso instance from xml instances, unless it was prefetched
+            instance_state = sub.instance_state
+            if instance_state is None:
+                res = token_manager.request(
+                    "GET", f"/api/instances/{record.get('id')}/", params={"fields": "is_locked"}
                 )
-                summary["ignored"] += 1
-                continue
+                instance_state = res.json()
 
-            with file_path.open("rb") as fp:
-                upload_res = iaso.api_client.post(
-                    "/sync/form_upload/", files={"xml_submission_file": fp}, headers=headers
+            if instance_state.get("is_locked", False):
+                current_run.log_warning(
+                    f"Instance id={record.get('id')} is locked, skipping update."
                 )
+                return sub, "ignored"
+
+            if not _resolve_xml(sub, archive):
+                return sub, "ignored"
+            current_run.log_debug(sub.xml.decode("utf-8"))
+
+            measurement.bytes = len(sub.xml)
+            upload_res = enketo.submit(sub.uuid, sub.file_name, sub.xml)
+            measurement.records_out = int(upload_res.status_code in (200, 201))
+        if upload_res.status_code in (200, 201):
+            return sub, "updated"
+
+        current_run.log_error(
+            "Update failed for id"
+            f"{record.get('id', '')}: status={upload_res.status_code} "
+            f"resp={getattr(upload_res, 'text', None)}"
+        )
+    except Exception as exc:
+        current_run.log_error(f"Error processing record {record.get('org_unit_id', '')}: {exc}")
 
-            if upload_res.status_code == 201:
-                summary["imported"] += 1
-            else:
-                current_run.log_error(
-                    "Upload failed for "
-                    f"{file_path.name}: status={upload_res.status_code} "
-                    f"resp={getattr(upload_res, 'text', None)}"
-                )
-                summary["ignored"] += 1
+    return sub, "ignored"
 
-        except Exception as exc:
-            current_run.log_error(f"Error processing record {record.get('org_unit_id')}: {exc}")
-            summary["ignored"] += 1
-            continue
 
-    return summary
+def _prefetch_instance_states(
+    df: pl.DataFrame,
+    form_id: int,
+    token_manager: TokenManager,
+    fields: tuple[str, ...] = ("id", "is_locked"),
+) -> tuple[list[dict | None], list[bool]]:
+    """Prefetch the state of all the instances targeted by the dataframe.
+
+    Instances are fetched with bulk list calls, then rows targeting a locked instance
+    are flagged in a single vectorized pass and reported before any update starts.
+    `fields` can add instance fields to fetch, such as their current content.
+
+    Returns:
+        tuple[list[dict | None], list[bool]]: The prefetched instance of each row (None
+            if it could not be prefetched) and whether it is locked, in the order of `df`.
+    """
+    instance_ids = df["id"].cast(pl.Int64, strict=False)
+    states = fetch_instances_state(
+        token_manager, form_id, instance_ids.drop_nulls().unique().sort().to_list(), fields=fields
+    )
+    locked_ids = [instance_id for instance_id, state in states.items() if state.get("is_locked")]
+    locked = instance_ids.is_in(locked_ids).fill_null(False)
+
+    current_run.log_info(f"Prefetched the state of {len(states)} instances to update")
+    if locked_ids:
+        shown = ", ".join(str(instance_id) for instance_id in sorted(locked_ids)[:20])
+        more = f" and {len(locked_ids) - 20} more" if len(locked_ids) > 20 else ""
+        current_run.log_warning(
+            f"{locked.sum()} row(s) target locked instances and will be ignored "
+            f"(instance ids: {shown}{more})"
+        )
+    return [states.get(instance_id) for instance_id in instance_ids.to_list()], locked.to_list()
+
+
+def _update_submissions(
+    batches: Iterable[pl.DataFrame],
+    form_id: int,
+    questions: pl.DataFrame,
+    validator: FormValidator,
+    token_manager: TokenManager,
+    journal: ImportJournal | None,
+    summary: dict[str, int],
+    metrics: StageMetrics,
+    skip_unchanged: bool = False,
+) -> Iterator[PreparedSubmission]:
+    """Iterate over the rows to update, with their payload, prefetched state and validity.
+
+    For each input batch, the state of the targeted instances is prefetched in bulk
+    (and their content with `skip_unchanged`). Rows with an invalid org unit ID or
+    coordinates, or targeting a locked instance, are yielded as `ignored`, and rows
+    already matching their instance as `unchanged`.
+
+    Yields:
+        PreparedSubmission: the next row to update, not validated nor rendered yet.
+
+    Raises:
+        RuntimeError: If the `id` or `instanceID` column is missing.
+    """
+    fields = CONTENT_FIELDS if skip_unchanged else ("id", "is_locked")
+    question_names = questions["name"].to_list() if "name" in questions.columns else []
+    for df in batches:
+        if "id" not in df.columns:
+            msg = "UPDATE mode requires an 'id' column with IASO Instance IDs"
+            current_run.log_error(msg)
+            raise RuntimeError(msg)
+
+        if "instanceID" not in df.columns:
+            msg = "UPDATE mode requires an 'instanceID' column with IASO Instance UUIDs"
+            current_run.log_warning(msg)
+            raise RuntimeError(msg)
+
+        with metrics.measure("payloads", len(df)):
+            payloads, errors = build_instance_payloads(df, form_id, "UPDATE")
+        with metrics.measure("prefetch", len(df)):
+            instance_states, locked = _prefetch_instance_states(df, form_id, token_manager, fields)
+        unchanged = [False] * len(df)
+        if skip_unchanged:
+            answer_columns = [name for name in question_names if name in df.columns]
+            with metrics.measure("diff", len(df)) as measurement:
+                unchanged = find_unchanged(df, answer_columns, payloads, instance_states)
+                measurement.records_out = len(df) - sum(unchanged)
+        valid = _validate_batch(df, validator, metrics)
+
+        for index, row, key, record in _pending_records(df, "UPDATE", journal, summary):
+            sub = PreparedSubmission(
+                row=row,
+                key=key,
+                record=record,
+                instance_body=payloads[index],
+                instance_state=instance_states[index],
+                is_valid=valid[index],
+            )
+            if locked[index] or errors[index] is not None:
+                if not locked[index]:
+                    current_run.log_error(f"Invalid {errors[index]} for row {row}, skipping")
+                sub.status = "ignored"
+            elif unchanged[index]:
+                sub.status = "unchanged"
+            yield sub
 
 
 def handle_update_mode(
     iaso: IASO,
-    df: pl.DataFrame,
+    batches: Iterable[pl.DataFrame],
     questions: pl.DataFrame,
     choices: pl.DataFrame,
     form_name: str,
     form_id: int,
     strict_validation: bool,
     output_directory: str | None,
-    templates: dict,
+    token_manager: TokenManager,
+    templates: TemplateRegistry,
+    archive_submissions: bool = False,
+    journal: ImportJournal | None = None,
+    metrics: StageMetrics | None = None,
+    skip_unchanged: bool = False,
+    max_workers: int = 1,
+    render_processes: int = 0,
+    validator: FormValidator | None = None,
+    summary: dict[str, int] | None = None,
+    executor: ThreadPoolExecutor | None = None,
 ) -> dict[str, int]:
-    """Handle update of existing instances from the dataframe.
+    """Handle update of existing instances from the input batches.
+
+    For each input batch, the lock status of the targeted instances is prefetched in
+    bulk, so rows targeting locked instances are reported and ignored before any update
+    of the batch starts. With `skip_unchanged`, their current content is prefetched as
+    well and rows whose answers, org unit and coordinates already match their instance
+    are counted as `unchanged` instead of being uploaded again.
+
+    Like in CREATE mode, records are validated and rendered (in `render_processes`
+    worker processes if set) by a background thread, ahead of the calling thread which
+    sends up to `max_workers` updates to IASO in parallel. XML submissions are uploaded
+    from memory and, if `archive_submissions` is set, collected into a single zip
+    archive. When a `journal` is given, the outcome of each row is recorded and rows
+    already committed are skipped.
+
+    As in CREATE mode, counts are accumulated in `summary` and updates are sent through
+    `executor` when they are given.
 
     Returns:
-        dict[str, int]: summary counts for updated/ignored/imported.
+        dict[str, int]: summary counts for updated/ignored/unchanged.
     """
-    summary = {"imported": 0, "updated": 0, "ignored": 0, "deleted": 0}
+    summary = summary if summary is not None else _new_summary()
+    metrics = metrics or StageMetrics()
+    validator = validator or FormValidator(questions, choices)
     default_output = f"iaso-pipelines/import-submissions/{form_name}/updates"
     output_dir = Path(workspace.files_path) / (output_directory or default_output)
-    output_dir.mkdir(exist_ok=True, parents=True)
 
-    if "id" not in df.columns:
-        msg = "UPDATE mode requires an 'id' column with IASO Instance IDs"
-        current_run.log_error(msg)
-        raise RuntimeError(msg)
-
-    if "instanceID" not in df.columns:
-        msg = "UPDATE mode requires an 'instanceID' column with IASO Instance UUIDs"
-        current_run.log_warning(msg)
-        raise RuntimeError(msg)
-
-    headers = get_token_headers(iaso)
-    token = headers.get("Authorization", "").removeprefix("Bearer ")
-    user_id = get_user_id_from_jwt(token)
-    for record in df.iter_rows(named=True):
-        try:
-            is_valid, xml_template = _select_template_and_is_valid(
-                record=record,
-                df=df,
+    enketo = EnketoClient(token_manager, session_sharing_adapters(iaso.api_client))
+    archive = _open_archive(output_dir) if archive_submissions else None
+    send = partial(
+        _send_update,
+        token_manager=token_manager,
+        enketo=enketo,
+        archive=archive,
+        metrics=metrics,
+    )
+
+    try:
+        with SubmissionRenderer(templates, render_processes, metrics) as renderer:
+            prepare = partial(
+                _prepare_update,
                 strict_validation=strict_validation,
-                questions=questions,
-                choices=choices,
                 templates=templates,
+                renderer=renderer,
+                user_id=token_manager.user_id,
+                metrics=metrics,
             )
-            if not is_valid:
-                summary["ignored"] += 1
-                continue
-
-            instance_uuid_raw = record.get("instanceID")
-            instance_uuid = (
-                instance_uuid_raw.removeprefix("uuid:")
-                if isinstance(instance_uuid_raw, str)
-                else None
+            submissions = produce_ahead(
+                _update_submissions(
+                    batches,
+                    form_id,
+                    questions,
+                    validator,
+                    token_manager,
+                    journal,
+                    summary,
+                    metrics,
+                    skip_unchanged=skip_unchanged,
+                ),
+                prepare,
+                buffer=RENDER_AHEAD,
+                metrics=metrics,
+                stage="render",
             )
+            for sub, status in _run_concurrently(send, submissions, max_workers, executor):
+                summary[status] += 1
+                if sub.key is not None:
+                    journal.log(sub.key, sub.record.get("instanceID"), status, "UPDATE")
+    finally:
+        if archive is not None:
+            archive.close()
+        if journal is not None:
+            journal.flush()
+
+    current_run.log_info(f"Enketo submission route resolved {enketo.resolve_count} time(s)")
+    return summary
 
-            if instance_uuid is None:
-                current_run.log_error("Skipping record with missing 'instanceID' column value")
-                summary["ignored"] += 1
-                continue
 
-            if record.get("org_unit_id"):
-                # Handle the case where org_unit_id is present
-                payload = {
-                    "org_unit": str(record.get("org_unit_id")),
-                    "formID": int(form_id),
-                    "accuracy": float(record.get("accuracy") or 0) if "accuracy" in record else 0,
-                    "altitude": float(record.get("altitude") or 0) if "altitude" in record else 0,
-                    "latitude": float(record.get("latitude") or 0)
-                    if "latitude" in record
-                    else None,
-                    "longitude": float(record.get("longitude") or 0)
-                    if "longitude" in record
-                    else None,
-                }
-
-                iaso.api_client.patch(
-                    f"/api/instances/{record.get('id')}",
-                    json=payload,
-                    headers=headers,
-                )
+def _read_batches(
+    source: SubmissionSource,
+    questions: pl.DataFrame,
+    choices: pl.DataFrame,
+    validator: FormValidator,
+    metrics: StageMetrics,
+    predicate: pl.Expr | None = None,
+) -> Iterator[pl.DataFrame]:
+    """Stream the input batches, with global validation applied when needed.
 
-            if not xml_template:
-                current_run.log_error(
-                    "No XML template available for record "
-                    f"form_version={record.get('form_version')}, skipping"
-                )
-                summary["ignored"] += 1
-                continue
-
-            # Get iaso instance from xml instances
-            res = iaso.api_client.get(
-                f"/api/instances/{record.get('id')}/",
-                headers=headers,
-                params={"fields": "is_locked"},
-            )
-            res_json = res.json()
+    Without a `form_version` column, each batch goes through `validate_global_data` so
+    the constraint/choice summary columns exist.
 
-            is_locked = res_json.get("is_locked", False)
-            if is_locked:
-                current_run.log_warning(
-                    f"Instance id={record.get('id')} is locked, skipping update."
+    Yields:
+        pl.DataFrame: the next batch of submissions to push.
+    """
+    batches = source.batches(predicate)
+    while True:
+        with metrics.measure("read") as measurement:
+            df = next(batches, None)
+            measurement.records = 0 if df is None else len(df)
+        if df is None:
+            return
+
+        if "form_version" not in df.columns:
+            with metrics.measure("validate_global", len(df)):
+                df = validate_global_data(
+                    df=df, questions=questions, choices=choices, validator=validator
                 )
-                summary["ignored"] += 1
-                continue
-
-            the_uuid = str(instance_uuid)
-            file_path = output_dir / f"update_{the_uuid}.xml"
-            data = {**record, **{"uuid": the_uuid}}
-            xml_data = Template(xml_template).render(
-                **{k: v if v is not None else "" for k, v in data.items()}
-            )
-            current_run.log_debug(xml_data)
-            xml_data = enrich_submission_xml(
-                xml_str=xml_data,
-                iaso_instance=int(record.get("id")),  # type: ignore
-                edit_user_id=int(user_id) if user_id else None,
-            )
-            current_run.log_debug(xml_data.decode("utf-8"))
+        yield df
 
-            with file_path.open("wb") as f:
-                f.write(xml_data)
 
-            edit_url_res = iaso.api_client.get(
-                f"api/enketo/edit/{instance_uuid}/",
-                headers=headers,
-            )
+def _merge_summaries(summaries: Iterable[dict[str, int]]) -> dict[str, int]:
+    """Add up the summaries of several pushes.
 
-            edit_url = urlparse(edit_url_res.json().get("edit_url", ""))
+    Returns:
+        dict[str, int]: summed counts for imported/updated/ignored/deleted/skipped/unchanged.
+    """
+    merged = _new_summary()
+    for summary in summaries:
+        for status, count in summary.items():
+            merged[status] += count
+    return merged
 
-            with file_path.open("rb") as fp:
-                files = {"xml_submission_file": (file_path.name, fp, "application/xml")}
-                upload_res = requests.post(
-                    f"{edit_url.scheme}://{edit_url.netloc}/submission/{edit_url.path.split('/')[-1]}",
-                    headers=headers,
-                    files=files,
-                )
-            if upload_res.status_code in (200, 201):
-                summary["updated"] += 1
-            else:
-                current_run.log_error(
-                    "Update failed for id"
-                    f"{record.get('id', '')}: status={upload_res.status_code} "
-                    f"resp={getattr(upload_res, 'text', None)}"
-                )
-                summary["ignored"] += 1
-        except Exception as exc:
-            current_run.log_error(f"Error processing record {record.get('org_unit_id', '')}: {exc}")
-            summary["ignored"] += 1
-            continue
 
-    return summary
+def _wait_logging_progress(pushes: list[Future], summaries: list[dict[str, int]]) -> None:
+    """Wait for concurrent pushes, logging their merged summary while they run.
+
+    Raises:
+        BaseException: The exception raised by a failed push, once all pushes are done.
+    """
+    pending = set(pushes)
+    while pending:
+        _done, pending = wait(pending, timeout=PROGRESS_LOG_INTERVAL)
+        if pending:
+            current_run.log_info(f"Push in progress. Summary: {_merge_summaries(summaries)}")
+    for push in pushes:
+        push.result()
+
+
+def _template_sample(
+    source: SubmissionSource,
+    questions: pl.DataFrame,
+    choices: pl.DataFrame,
+    validator: FormValidator,
+    predicate: pl.Expr | None = None,
+) -> pl.DataFrame:
+    """Return the rows needed to generate the XML templates of the submissions.
+
+    Templates only depend on the columns of the batches and on their form versions, so
+    one row per form version (or the first row when there is no `form_version` column)
+    stands for the whole input file.
+
+    Returns:
+        pl.DataFrame: the sample, with the columns of the batches yielded by `_read_batches`.
+    """
+    rows = source.lazy(predicate)
+    if "form_version" in source.columns:
+        return rows.unique(subset="form_version", keep="first", maintain_order=True).collect()
+    return validate_global_data(
+        df=rows.head(1).collect(), questions=questions, choices=choices, validator=validator
+    )
 
 
 def push_submissions(
     iaso: IASO,
-    df: pl.DataFrame,
+    source: SubmissionSource,
     questions: pl.DataFrame,
     choices: pl.DataFrame,
     form_name: str,
@@ -577,33 +1586,72 @@ def push_submissions(
     import_strategy: str,
     output_directory: str | None,
     strict_validation: bool,
+    max_workers: int = 1,
+    archive_submissions: bool = False,
+    batch_size: int = 500,
+    journal: ImportJournal | None = None,
+    token_manager: TokenManager | None = None,
+    metrics: StageMetrics | None = None,
+    skip_unchanged: bool = False,
+    render_processes: int = 0,
 ) -> dict[str, int]:
     """Orchestrate pushing submissions to IASO by delegating to per-mode handlers.
 
-    Currently supports CREATE and DELETE.
+    The input file is read once to check that all its values can be parsed, then
+    streamed to the handlers in fixed-size batches, so memory does not grow with the
+    size of the file. All handlers share a single `TokenManager`, so
+    the run only requests a new access token when the current one is about to expire.
+    Per-stage timings are collected in `metrics` when given. `skip_unchanged` only
+    applies to updated rows, `render_processes` to created and updated rows.
 
     Returns:
-        dict[str, int]: summary counts for imported/updated/ignored/deleted.
+        dict[str, int]: summary counts for imported/updated/ignored/deleted/unchanged.
     """
-    headers = get_token_headers(iaso)
+    token_manager = token_manager or TokenManager(iaso)
+    metrics = metrics or StageMetrics()
+    # Unreadable values only surface when their batch is read: fail before any write
+    with metrics.measure("check", source.height):
+        source.check()
     meta = fetch_form_meta(iaso, form_id)
+    max_workers = max(1, max_workers or 1)
+    batch_size = max(1, batch_size or 500)
+    render_processes = max(0, render_processes or 0)
+    template_cache_dir = Path(workspace.files_path, TEMPLATE_CACHE_DIR)
+    metadata_cache_dir = Path(workspace.files_path, METADATA_CACHE_DIR)
+    validator = FormValidator(questions, choices)
 
     if import_strategy == "DELETE":
         current_run.log_info(
-            f"Starting deletion of {len(df)} submissions in IASO for app ID {app_id}."
+            f"Starting deletion of {source.height} submissions in IASO for app ID {app_id}."
+        )
+        return handle_delete_mode(
+            iaso=iaso,
+            batches=source.batches(),
+            token_manager=token_manager,
+            journal=journal,
+            metrics=metrics,
+            max_workers=max_workers,
+            batch_size=batch_size,
         )
-        return handle_delete_mode(iaso=iaso, df=df, headers=headers)
-
-    if "form_version" not in df.columns:
-        # Run global validation to ensure summary columns exist
-        df = validate_global_data(df=df, questions=questions, choices=choices)
 
     if import_strategy == "CREATE":
-        templates = generate_templates_for_versions(iaso, df, form_id, meta, questions, choices)
-        current_run.log_info(f"Pushing {len(df)} submissions to IASO for app ID {app_id} start")
+        with metrics.measure("templates"):
+            templates = generate_templates_for_versions(
+                iaso,
+                _template_sample(source, questions, choices, validator),
+                form_id,
+                meta,
+                questions,
+                choices,
+                cache_dir=template_cache_dir,
+                metadata_cache_dir=metadata_cache_dir,
+            )
+        current_run.log_info(
+            f"Pushing {source.height} submissions to IASO for app ID {app_id} start"
+        )
         summary = handle_create_mode(
             iaso=iaso,
-            df=df,
+            batches=_read_batches(source, questions, choices, validator, metrics),
             questions=questions,
             choices=choices,
             form_name=form_name,
@@ -611,63 +1659,125 @@ def push_submissions(
             app_id=app_id,
             strict_validation=strict_validation,
             output_directory=output_directory,
+            token_manager=token_manager,
             templates=templates,
+            max_workers=max_workers,
+            archive_submissions=archive_submissions,
+            batch_size=batch_size,
+            journal=journal,
+            metrics=metrics,
+            render_processes=render_processes,
+            validator=validator,
         )
         current_run.log_info(f"Push finished. Summary: {summary}")
 
     if import_strategy == "UPDATE":
-        templates = generate_templates_for_versions(iaso, df, form_id, meta, questions, choices)
-        current_run.log_info(f"Updating {len(df)} submissions in IASO for app ID {app_id} start")
+        with metrics.measure("templates"):
+            templates = generate_templates_for_versions(
+                iaso,
+                _template_sample(source, questions, choices, validator),
+                form_id,
+                meta,
+                questions,
+                choices,
+                cache_dir=template_cache_dir,
+                metadata_cache_dir=metadata_cache_dir,
+            )
+        current_run.log_info(
+            f"Updating {source.height} submissions in IASO for app ID {app_id} start"
+        )
         summary = handle_update_mode(
             iaso=iaso,
-            df=df,
+            batches=_read_batches(source, questions, choices, validator, metrics),
             questions=questions,
             choices=choices,
             form_name=form_name,
             form_id=form_id,
             strict_validation=strict_validation,
             output_directory=output_directory,
+            token_manager=token_manager,
             templates=templates,
+            archive_submissions=archive_submissions,
+            journal=journal,
+            metrics=metrics,
+            skip_unchanged=skip_unchanged,
+            max_workers=max_workers,
+            render_processes=render_processes,
+            validator=validator,
         )
         current_run.log_info(f"Update finished. Summary: {summary}")
 
     if import_strategy == "CREATE_AND_UPDATE":
-        df_create = df.filter(pl.col("id").is_null() & pl.col("org_unit_id").is_not_null())
-        df_update = df.filter(pl.col("id").is_not_null())
+        create_rows = pl.col("id").is_null() & pl.col("org_unit_id").is_not_null()
+        update_rows = pl.col("id").is_not_null()
+        with metrics.measure("templates"):
+            # Both partitions share one registry, so each version is fetched only once
+            templates = generate_templates_for_versions(
+                iaso,
+                _template_sample(source, questions, choices, validator, create_rows | update_rows),
+                form_id,
+                meta,
+                questions,
+                choices,
+                cache_dir=template_cache_dir,
+                metadata_cache_dir=metadata_cache_dir,
+            )
 
-        summary_create = handle_create_mode(
-            iaso=iaso,
-            df=df_create,
-            questions=questions,
-            choices=choices,
-            form_name=form_name,
-            form_id=form_id,
-            app_id=app_id,
-            strict_validation=strict_validation,
-            output_directory=output_directory,
-            templates=generate_templates_for_versions(
-                iaso, df_create, form_id, meta, questions, choices
-            ),
-        )
-        summary_update = handle_update_mode(
-            iaso=iaso,
-            df=df_update,
-            questions=questions,
-            choices=choices,
-            form_name=form_name,
-            form_id=form_id,
-            strict_validation=strict_validation,
-            output_directory=output_directory,
-            templates=generate_templates_for_versions(
-                iaso, df_update, form_id, meta, questions, choices
-            ),
-        )
-        summary = {
-            "imported": summary_create["imported"],
-            "updated": summary_update["updated"],
-            "ignored": summary_create["ignored"] + summary_update["ignored"],
-            "deleted": 0,
-        }
+        # Both partitions target disjoint instances: they are pushed concurrently, their
+        # uploads sharing one pool of `max_workers` threads
+        summary_create = _new_summary()
+        summary_update = _new_summary()
+        with (
+            ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="iaso-push") as pool,
+            ThreadPoolExecutor(max_workers=2, thread_name_prefix="iaso-partition") as partitions,
+        ):
+            create = partitions.submit(
+                handle_create_mode,
+                iaso=iaso,
+                batches=_read_batches(source, questions, choices, validator, metrics, create_rows),
+                questions=questions,
+                choices=choices,
+                form_name=form_name,
+                form_id=form_id,
+                app_id=app_id,
+                strict_validation=strict_validation,
+                output_directory=output_directory,
+                token_manager=token_manager,
+                templates=templates,
+                max_workers=max_workers,
+                archive_submissions=archive_submissions,
+                batch_size=batch_size,
+                journal=journal,
+                metrics=metrics,
+                render_processes=render_processes,
+                validator=validator,
+                summary=summary_create,
+                executor=pool,
+            )
+            update = partitions.submit(
+                handle_update_mode,
+                iaso=iaso,
+                batches=_read_batches(source, questions, choices, validator, metrics, update_rows),
+                questions=questions,
+                choices=choices,
+                form_name=form_name,
+                form_id=form_id,
+                strict_validation=strict_validation,
+                output_directory=output_directory,
+                token_manager=token_manager,
+                templates=templates,
+                archive_submissions=archive_submissions,
+                journal=journal,
+                metrics=metrics,
+                skip_unchanged=skip_unchanged,
+                max_workers=max_workers,
+                render_processes=render_processes,
+                validator=validator,
+                summary=summary_update,
+                executor=pool,
+            )
+            _wait_logging_progress([create, update], [summary_create, summary_update])
+        summary = _merge_summaries([summary_create, summary_update])
 
         current_run.log_info(f"Create and Update finished. Summary: {summary}")
 
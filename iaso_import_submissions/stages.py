@@ -0,0 +1,91 @@
+import queue
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass
+from typing import TypeVar
+
+from metrics import StageMetrics
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# Marks the end of the items produced by a stage
+_END = object()
+
+
+@dataclass
+class _Failure:
+    """Exception raised by a producer, re-raised on the consumer side."""
+
+    exc: BaseException
+
+
+def produce_ahead(
+    items: Iterable[T],
+    func: Callable[[T], R],
+    buffer: int,
+    metrics: StageMetrics | None = None,
+    stage: str = "produce",
+) -> Iterator[R]:
+    """Apply `func` to every item in a background thread, ahead of the consumer.
+
+    Results are handed over through a queue bounded to `buffer` items: the producer
+    blocks when the consumer falls behind (backpressure), so at most `buffer` results
+    are held in memory. Time spent blocked on each side is recorded in `metrics`:
+    `<stage>_backpressure` when the producer waits for the consumer, and
+    `<stage>_starvation` when the consumer waits for the producer. The larger of the
+    two points at the bottleneck of the pipeline.
+
+    Args:
+        items (Iterable[T]): Items to process, consumed from the background thread.
+        func (Callable[[T], R]): Function applied to each item.
+        buffer (int): Maximum number of results waiting for the consumer.
+        metrics (StageMetrics | None): Collector of the waiting times.
+        stage (str): Name of the producing stage, used to name the metrics.
+
+    Yields:
+        R: The result of `func` for each item, in input order.
+
+    Raises:
+        BaseException: Any exception raised while producing, once the results produced
+            before it have been consumed.
+    """
+    metrics = metrics or StageMetrics()
+    results: queue.Queue = queue.Queue(maxsize=max(1, buffer))
+    stop = threading.Event()
+
+    def put(result: object) -> bool:
+        started_at = time.perf_counter()
+        while not stop.is_set():
+            try:
+                results.put(result, timeout=0.1)
+            except queue.Full:
+                continue
+            metrics.add(f"{stage}_backpressure", time.perf_counter() - started_at, 0, started_at)
+            return True
+        return False
+
+    def produce() -> None:
+        try:
+            for item in items:
+                if not put(func(item)):
+                    return
+            put(_END)
+        except BaseException as exc:
+            put(_Failure(exc))
+
+    producer = threading.Thread(target=produce, name=f"iaso-{stage}", daemon=True)
+    producer.start()
+    try:
+        while True:
+            with metrics.measure(f"{stage}_starvation", 0):
+                result = results.get()
+            if result is _END:
+                return
+            if isinstance(result, _Failure):
+                raise result.exc
+            yield result
+    finally:
+        stop.set()
+        producer.join()
@@ -1,9 +1,238 @@
+import multiprocessing
+import threading
+import time
 import xml.etree.ElementTree as ET
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from types import TracebackType
 
 import polars as pl
+from jinja2 import DictLoader, Environment, FileSystemBytecodeCache, Template
+from metrics import StageMetrics
 from utils import local_name_xml_tag
 
 
+class TemplateRegistry:
+    """Compiled XML submission templates keyed by form version.
+
+    Each template source is compiled once per run, so rendering a record is a pure
+    `Template.render` call. When `cache_dir` is given, the compiled bytecode is also
+    persisted there and reused by later runs as long as the template source is unchanged.
+    """
+
+    def __init__(self, cache_dir: Path | None = None):
+        bytecode_cache = None
+        if cache_dir is not None:
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            bytecode_cache = FileSystemBytecodeCache(str(cache_dir))
+
+        self._sources: dict[str, str] = {}
+        self._compiled: dict[str, Template] = {}
+        self._lock = threading.Lock()
+        self._env = Environment(
+            loader=DictLoader(self._sources),
+            bytecode_cache=bytecode_cache,
+            auto_reload=False,
+        )
+
+    def __contains__(self, version: object) -> bool:
+        return str(version) in self._sources
+
+    def __len__(self) -> int:
+        return len(self._sources)
+
+    def add(self, version: object, source: str) -> None:
+        """Register the XML template source for a form version.
+
+        Args:
+            version (object): Form version (or `latest_version`) the template belongs to.
+            source (str): Jinja XML template source, as built by `generate_xml_template`.
+        """
+        key = str(version)
+        with self._lock:
+            if self._sources.get(key) != source:
+                self._sources[key] = source
+                self._compiled.pop(key, None)
+
+    def get(self, version: object) -> Template | None:
+        """Return the compiled template for a form version, compiling it on first use.
+
+        Args:
+            version (object): Form version (or `latest_version`) to look up.
+
+        Returns:
+            Template | None: The compiled template, or None if no template is registered.
+        """
+        key = str(version)
+        template = self._compiled.get(key)
+        if template is not None:
+            return template
+
+        with self._lock:
+            if key not in self._sources:
+                return None
+            if key not in self._compiled:
+                self._compiled[key] = self._env.get_template(key)
+            return self._compiled[key]
+
+    def source(self, version: object) -> str | None:
+        """Return the raw template source registered for a form version.
+
+        Returns:
+            str | None: The template source, or None if no template is registered.
+        """
+        return self._sources.get(str(version))
+
+    def sources(self) -> dict[str, str]:
+        """Return the raw template sources of all the registered versions.
+
+        Returns:
+            dict[str, str]: The template sources keyed by version.
+        """
+        with self._lock:
+            return dict(self._sources)
+
+
+# Templates of the current render worker process, see `SubmissionRenderer`
+_worker_templates = TemplateRegistry()
+
+
+def render_submission(
+    templates: TemplateRegistry,
+    version: str,
+    values: dict,
+    iaso_instance: int | None = None,
+    edit_user_id: int | None = None,
+) -> bytes:
+    """Render the XML submission of a record.
+
+    Args:
+        templates (TemplateRegistry): Registry holding the template of `version`.
+        version (str): Form version (or `latest_version`) of the template to render.
+        values (dict): Values of the record, including its `uuid`.
+        iaso_instance (int | None): ID of the edited IASO instance, for updates.
+        edit_user_id (int | None): ID of the user editing the instance, for updates.
+
+    Returns:
+        bytes: The XML submission, enriched with the instance metadata for updates.
+
+    Raises:
+        KeyError: If no template is registered for `version`.
+    """
+    template = templates.get(version)
+    if template is None:
+        raise KeyError(f"No XML template registered for form version {version}")
+
+    xml_data = template.render(**{k: v if v is not None else "" for k, v in values.items()})
+    if iaso_instance is None:
+        return xml_data.encode("utf-8")
+    return enrich_submission_xml(xml_data, iaso_instance=iaso_instance, edit_user_id=edit_user_id)
+
+
+def _init_render_worker(sources: dict[str, str]) -> None:
+    """Register the templates of a render worker process."""
+    for version, source in sources.items():
+        _worker_templates.add(version, source)
+
+
+def _render_in_worker(version: str, values: dict, **kwargs: int | None) -> tuple[bytes, float]:
+    """Render a submission in a render worker process.
+
+    Returns:
+        tuple[bytes, float]: The XML submission and the time spent rendering it.
+    """
+    started_at = time.perf_counter()
+    xml_data = render_submission(_worker_templates, version, values, **kwargs)
+    return xml_data, time.perf_counter() - started_at
+
+
+class SubmissionRenderer:
+    """Render XML submissions in the calling thread or in a pool of processes.
+
+    Rendering (Jinja plus the ElementTree round-trip of updates) is CPU-bound, so with
+    `processes > 0` it runs in worker processes, each compiling the templates once,
+    and does not compete for the GIL with the threads sending requests to IASO.
+    Rendering times are recorded in `metrics` under the `render` stage.
+    """
+
+    def __init__(
+        self,
+        templates: TemplateRegistry,
+        processes: int = 0,
+        metrics: StageMetrics | None = None,
+    ):
+        self.templates = templates
+        self.metrics = metrics or StageMetrics()
+        self._executor = None
+        if processes > 0:
+            # Workers are spawned rather than forked, as the parent runs threads
+            self._executor = ProcessPoolExecutor(
+                max_workers=processes,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_render_worker,
+                initargs=(templates.sources(),),
+            )
+
+    def __enter__(self) -> "SubmissionRenderer":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def submit(
+        self,
+        version: str,
+        values: dict,
+        iaso_instance: int | None = None,
+        edit_user_id: int | None = None,
+    ) -> Future:
+        """Start rendering a submission, see `render_submission`.
+
+        Returns:
+            Future: The future XML submission (bytes). It is already resolved when
+                rendering in the calling thread.
+        """
+        rendered: Future = Future()
+        if self._executor is None:
+            try:
+                with self.metrics.measure("render"):
+                    xml_data = render_submission(
+                        self.templates, version, values, iaso_instance, edit_user_id
+                    )
+                rendered.set_result(xml_data)
+            except Exception as exc:
+                rendered.set_exception(exc)
+            return rendered
+
+        def on_done(job: Future) -> None:
+            try:
+                xml_data, seconds = job.result()
+            except Exception as exc:
+                rendered.set_exception(exc)
+                return
+            self.metrics.add("render", seconds)
+            rendered.set_result(xml_data)
+
+        self._executor.submit(
+            _render_in_worker,
+            version,
+            values,
+            iaso_instance=iaso_instance,
+            edit_user_id=edit_user_id,
+        ).add_done_callback(on_done)
+        return rendered
+
+    def close(self) -> None:
+        """Stop the render worker processes, if any."""
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+
+
 def generate_xml_template(
     df: pl.DataFrame,
     questions: pl.DataFrame,
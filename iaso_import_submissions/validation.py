@@ -1,9 +1,7 @@
-import re
-
 import polars as pl
 from openhexa.sdk import current_run
 from pydantic import BaseModel  # type: ignore
-from utils import calculate_to_polars_expr
+from xpath import Calculation, Constraint, XPathSyntaxError, compile_calculation, compile_constraint
 
 
 class ValidationResult(BaseModel):
@@ -136,7 +134,10 @@ def validate_data_structure(
 
 
 def validate_global_data(
-    df: pl.DataFrame, questions: pl.DataFrame, choices: pl.DataFrame
+    df: pl.DataFrame,
+    questions: pl.DataFrame,
+    choices: pl.DataFrame,
+    validator: "FormValidator | None" = None,
 ) -> pl.DataFrame:
     """Validate global data constraints and choices for form submissions.
 
@@ -144,175 +145,184 @@ def validate_global_data(
         df: DataFrame containing the submissions data.
         questions: DataFrame containing the form questions metadata.
         choices: DataFrame containing the form choices metadata.
+        validator: Validator compiled from `questions` and `choices`, built if not given.
 
     Returns:
         DataFrame with added validation columns for constraints and choices.
     """
-    # 1) Computed fields: add missing calculate columns
-    computed_fields = (
-        questions.filter(pl.col("type") == "calculate").select(["name", "calculation"]).to_dicts()
-    )
-    for rule in computed_fields:
-        col_name = rule["name"]
-        calculation = rule.get("calculation")
-        if not calculation or col_name in df.columns:
-            continue
+    validator = validator or FormValidator(questions, choices)
 
-        expr_str = calculate_to_polars_expr(calculation)
-        try:
-            # expr_str is expected to be a Polars expression string using `pl` namespace
-            expr = eval(expr_str, {"pl": pl})
-            df = df.with_columns(expr.round().cast(pl.Int64).alias(col_name))
-            current_run.log_info(
-                f"Added calculated column '{col_name}' to submissions after computation."
-            )
-        except Exception as exc:  # keep narrow enough but robust
-            current_run.log_critical(
-                f"Failed to compute calculated column '{col_name}': {exc}; filling with 0"
-            )
-            df = df.with_columns(pl.lit(0).alias(col_name))
+    # 1) Computed fields: add missing calculate columns
+    df = validator.add_calculations(df)
 
-    # 2) Constraints validation: add <col>_valid boolean columns
-    constraints_list = (
-        questions.filter(pl.col("constraint").is_not_null())
-        .select(["name", "constraint"])
-        .to_dicts()
-    )
-    constraint_cols = []
-    for rule in constraints_list:
-        col_name = rule["name"]
-        constraint = rule["constraint"]
+    # 2) Constraints validation: combine the constraints into a per-row summary
+    for col_name in validator.constraints:
         if col_name not in df.columns:
             current_run.log_warning(f"Constraint for missing column '{col_name}' skipped")
-            continue
-
-        # Use a Python validator per element because constraints may be arbitrary;
-        # bind the constraint string into the function to avoid late-binding issues.
-        def _validate_elem(v: object, c: str = constraint) -> bool:
-            try:
-                return bool(_validate_value(str(v), c))
-            except Exception:
-                return False
-
-        df = df.with_columns(
-            pl.col(col_name)
-            .map_elements(_validate_elem)
-            .cast(pl.Boolean)
-            .fill_null(False)
-            .alias(f"{col_name}_valid")
-        )
-        constraint_cols.append(f"{col_name}_valid")
-
-    # combine constraints into a per-row summary
-    if constraint_cols:
-        df = df.with_columns(
-            pl.fold(
-                acc=pl.lit(True),
-                function=lambda acc, x: acc & x,
-                exprs=[pl.col(c) for c in constraint_cols],
-            ).alias("constraints_validation_summary")
-        )
-        # drop individual constraint columns to keep output tidy
-        df = df.drop(constraint_cols)
+    constraints_mask = validator.constraints_mask(df)
+    if constraints_mask is not None:
+        df = df.with_columns(constraints_mask.alias("constraints_validation_summary"))
 
     # 3) Choices validation: vectorized membership checks where possible
-    choices_field = questions.filter(pl.col("type").str.contains("select"))["name"].to_list()
-    list_name = next((c for c in ("list name", "list_name") if c in choices.columns), None)
-    if list_name is None:
+    if validator.choices is None:
         current_run.log_warning(
             "Choices metadata missing expected column 'list name' or 'list_name'; "
             "skipping choices validation"
         )
         return df
-
-    choices_cols = []
-    for col_name in choices_field:
-        if col_name not in df.columns:
-            # nothing to validate for absent column
-            continue
-
-        # build allowed values for this question
-        allowed = choices.filter(pl.col(list_name) == col_name)["label"].to_list()
-        if not allowed:
-            # no allowed values defined; mark as invalid conservatively
-            df = df.with_columns(pl.lit(False).alias(f"{col_name}_choices_valid"))
-            choices_cols.append(f"{col_name}_choices_valid")
-            continue
-
-        # vectorized membership test
-        df = df.with_columns(
-            pl.col(col_name).is_in(allowed).fill_null(False).alias(f"{col_name}_choices_valid")
-        )
-        choices_cols.append(f"{col_name}_choices_valid")
-
-    if choices_cols:
-        df = df.with_columns(
-            pl.fold(
-                acc=pl.lit(True),
-                function=lambda acc, x: acc & x,
-                exprs=[pl.col(c) for c in choices_cols],
-            ).alias("choices_validation_summary")
-        )
+    choices_mask = validator.choices_mask(df)
+    if choices_mask is not None:
+        df = df.with_columns(choices_mask.alias("choices_validation_summary"))
 
     return df
 
 
-def validate_field_constraints(
-    record: dict, questions: pl.DataFrame, choices: pl.DataFrame
-) -> bool:
-    """Validate field constraints and choices for a single record.
+class FormValidator:
+    """Calculations, constraints and choices of a form, compiled once for many submissions.
 
-    Args:
-        record: Dictionary containing field values to validate.
-        questions: DataFrame containing form questions metadata.
-        choices: DataFrame containing form choices metadata.
+    Calculations and constraints are compiled into native Polars expressions (see
+    `xpath`) and the allowed choice labels are gathered per question, so whole batches
+    are computed and validated column-wise without calling back into Python for every
+    value. Constraints the compiler does not support are reported once and not checked.
 
-    Returns:
-        bool: True if all field values satisfy their constraints, False otherwise.
+    Attributes:
+        calculations (dict[str, Calculation | None]): Compiled calculation of each
+            calculate column, None when the compiler does not support it.
+        constraints (dict[str, Constraint]): Compiled constraint of each column.
+        choices (dict[str, frozenset] | None): Allowed labels of each select column, or
+            None if the choices metadata has no list name column.
     """
-    constraints_fields = questions.filter(pl.col("constraint").is_not_null())["name"].to_list()
-    multiple_choices = questions.filter(pl.col("type").str.contains("select"))["name"].to_list()
-    is_valid = True
-    for col, value in record.items():
-        if col in constraints_fields:
-            constraints = questions.filter(pl.col("name") == col)["constraint"][0]
-            is_valid = _validate_value(value, constraints)
-
-        if col in multiple_choices:
-            is_valid = (
-                is_valid and value in choices.filter(pl.col("list name") == col)["label"].to_list()
-            )
-    return is_valid
-
 
-def _validate_value(value: str, constraints: str) -> bool:
-    if constraints.startswith("regex"):
-        # Extract pattern
-        pattern = re.search(r"regex\(.,\s*'(.+)'\)", constraints)
-        if pattern:
+    def __init__(self, questions: pl.DataFrame, choices: pl.DataFrame):
+        # The survey sheet only has the columns of the features used by the form
+        calculations = constraints = []
+        if "calculation" in questions.columns:
+            calculations = questions.filter(pl.col("type") == "calculate").to_dicts()
+        if "constraint" in questions.columns:
+            constraints = questions.filter(pl.col("constraint").is_not_null()).to_dicts()
+
+        self.calculations: dict[str, Calculation | None] = {}
+        for rule in calculations:
+            if not rule.get("calculation"):
+                continue
             try:
-                return bool(re.match(pattern.group(1), str(value)))
-            except (ValueError, TypeError):
-                return False
-
-    if constraints.startswith(".<="):
-        threshold = float(constraints[3:])
-        try:
-            return float(value) <= threshold
-        except (ValueError, TypeError):
-            return False
-
-    elif constraints.startswith(".>="):
-        threshold = float(constraints[3:])
-        try:
-            return float(value) >= threshold
-        except (ValueError, TypeError):
-            return False
-
-    # Other constraintss
-    else:
-        # not yet implemented
-        return True
+                self.calculations[rule["name"]] = compile_calculation(rule["calculation"])
+            except XPathSyntaxError as exc:
+                current_run.log_critical(
+                    f"Failed to compute calculated column '{rule['name']}': {exc}; filling with 0"
+                )
+                self.calculations[rule["name"]] = None
+        self._added_calculations: set[str] = set()
+
+        self.constraints: dict[str, Constraint] = {}
+        for rule in constraints:
+            try:
+                self.constraints[rule["name"]] = compile_constraint(rule["constraint"])
+            except XPathSyntaxError as exc:
+                current_run.log_warning(
+                    f"Constraint of '{rule['name']}' is not supported and will not be "
+                    f"checked: {rule['constraint']} ({exc})"
+                )
+
+        self.choices: dict[str, frozenset] | None = None
+        list_name = next((c for c in ("list name", "list_name") if c in choices.columns), None)
+        if list_name is not None:
+            select_fields = questions.filter(pl.col("type").str.contains("select"))["name"]
+            allowed = {}
+            if len(select_fields):
+                labels = choices.group_by(list_name).agg(pl.col("label"))
+                allowed = dict(zip(labels[list_name], labels["label"].to_list(), strict=True))
+            self.choices = {name: frozenset(allowed.get(name) or ()) for name in select_fields}
+
+    def add_calculations(self, df: pl.DataFrame) -> pl.DataFrame:
+        """Add the calculate columns missing from `df`.
+
+        Calculations are evaluated together in one `with_columns` call, or in a few
+        when they depend on one another. Calculations that cannot be compiled (or that
+        reference each other in a cycle) are filled with 0.
+
+        Args:
+            df (pl.DataFrame): The submissions.
+
+        Returns:
+            pl.DataFrame: The submissions with the calculated columns.
+        """
+        pending = {name: calc for name, calc in self.calculations.items() if name not in df.columns}
+        while pending:
+            ready = {
+                name: calc
+                for name, calc in pending.items()
+                if calc is None or not calc.references & pending.keys()
+            }
+            if not ready:
+                for name in pending:
+                    current_run.log_critical(
+                        f"Failed to compute calculated column '{name}': circular reference; "
+                        "filling with 0"
+                    )
+                ready = dict.fromkeys(pending)
+            df = df.with_columns(
+                (pl.lit(0) if calc is None else calc.to_expr(df.schema)).alias(name)
+                for name, calc in ready.items()
+            )
+            for name, calc in ready.items():
+                del pending[name]
+                if calc is not None and name not in self._added_calculations:
+                    self._added_calculations.add(name)
+                    current_run.log_info(
+                        f"Added calculated column '{name}' to submissions after computation."
+                    )
+        return df
+
+    def validate_batch(self, df: pl.DataFrame) -> pl.Series:
+        """Validate the constraints and choices of every submission of a batch.
+
+        Args:
+            df (pl.DataFrame): The submissions to validate.
+
+        Returns:
+            pl.Series: Whether each submission is valid, in the order of `df`.
+        """
+        masks = [
+            mask for mask in (self.constraints_mask(df), self.choices_mask(df)) if mask is not None
+        ]
+        if not masks:
+            return pl.Series("is_valid", [True] * len(df), dtype=pl.Boolean)
+        return df.select(pl.all_horizontal(masks).alias("is_valid"))["is_valid"]
+
+    def constraints_mask(self, df: pl.DataFrame) -> pl.Expr | None:
+        """Build the expression checking the constraints of the columns of `df`.
+
+        Returns:
+            pl.Expr | None: True for the rows satisfying all constraints, or None if
+                `df` has no column with a constraint.
+        """
+        masks = [
+            constraint.to_expr(col, df.schema)
+            for col, constraint in self.constraints.items()
+            if col in df.columns
+        ]
+        return pl.all_horizontal(masks) if masks else None
+
+    def choices_mask(self, df: pl.DataFrame) -> pl.Expr | None:
+        """Build the expression checking the choices of the select columns of `df`.
+
+        Returns:
+            pl.Expr | None: True for the rows whose answers are all allowed choices, or
+                None if `df` has no select column.
+        """
+        masks = []
+        for col, allowed in (self.choices or {}).items():
+            if col not in df.columns:
+                continue
+            labels = [label for label in allowed if label is not None]
+            if labels and df.schema[col] == pl.String:
+                mask = pl.col(col).is_in(labels).fill_null(None in allowed)
+            else:
+                # Labels are strings: answers of other types are never allowed
+                mask = pl.col(col).is_null() & (None in allowed)
+            masks.append(mask)
+        return pl.all_horizontal(masks) if masks else None
 
 
 def _validate_column_types(
@@ -0,0 +1,504 @@
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+
+import polars as pl
+
+# Tokens of the ODK XPath subset used in XLSForm constraints and calculations, in order
+_TOKEN = re.compile(
+    r"""
+    \s*(?:
+        (?P<number>\d+(?:\.\d*)?|\.\d+)
+        |(?P<string>'[^']*'|"[^"]*")
+        |\$\{(?P<ref>[^}]+)\}
+        |(?P<op>!=|<=|>=|=|<|>|\+|-|\*|\(|\)|,)
+        |(?P<current>\.(?!\.))
+        |(?P<name>[A-Za-z_][\w.:-]*)
+    )
+    """,
+    re.VERBOSE,
+)
+# Binary operators by increasing precedence
+_PRECEDENCE = (
+    ("or",),
+    ("and",),
+    ("=", "!="),
+    ("<", "<=", ">", ">="),
+    ("+", "-"),
+    ("*", "div", "mod"),
+)
+
+
+class XPathSyntaxError(ValueError):
+    """Raised when an expression uses syntax or functions the compiler does not support."""
+
+
+@dataclass(frozen=True)
+class _Node:
+    """Node of a parsed expression: `kind` is current, ref, number, string, call or op."""
+
+    kind: str
+    value: object = None
+    args: tuple["_Node", ...] = ()
+
+
+@dataclass
+class _Typed:
+    """A compiled sub-expression and the XPath type of its values.
+
+    Numbers are computed as floats; `integral` tells the ones that are always whole
+    numbers, e.g. integer answers, their sums or the result of `int()`.
+    """
+
+    expr: pl.Expr
+    type: str  # number, string or boolean
+    integral: bool = False
+
+
+class _Parser:
+    """Recursive descent parser of the ODK XPath subset used in forms."""
+
+    def __init__(self, text: str):
+        self.tokens: list[tuple[str, str]] = []
+        position = 0
+        text = text.strip()
+        while position < len(text):
+            match = _TOKEN.match(text, position)
+            if match is None or match.end() == position:
+                raise XPathSyntaxError(f"unexpected character at {text[position:]!r}")
+            kind = match.lastgroup or ""
+            value = match.group(kind)
+            if kind == "name" and value in ("and", "or", "div", "mod"):
+                kind = "op"
+            self.tokens.append((kind, value))
+            position = match.end()
+        self.position = 0
+
+    def parse(self) -> _Node:
+        node = self._binary(0)
+        if self.position < len(self.tokens):
+            raise XPathSyntaxError(f"unexpected {self.tokens[self.position][1]!r}")
+        return node
+
+    def _peek(self) -> tuple[str, str]:
+        return self.tokens[self.position] if self.position < len(self.tokens) else ("end", "")
+
+    def _expect(self, value: str) -> None:
+        if self._peek() != ("op", value):
+            raise XPathSyntaxError(f"expected {value!r}, got {self._peek()[1]!r}")
+        self.position += 1
+
+    def _binary(self, level: int) -> _Node:
+        if level == len(_PRECEDENCE):
+            return self._unary()
+        node = self._binary(level + 1)
+        while self._peek()[0] == "op" and self._peek()[1] in _PRECEDENCE[level]:
+            operator = self._peek()[1]
+            self.position += 1
+            node = _Node("op", operator, (node, self._binary(level + 1)))
+        return node
+
+    def _unary(self) -> _Node:
+        if self._peek() == ("op", "-"):
+            self.position += 1
+            return _Node("op", "neg", (self._unary(),))
+        return self._primary()
+
+    def _primary(self) -> _Node:
+        kind, value = self._peek()
+        self.position += 1
+        if kind == "number":
+            return _Node("number", float(value))
+        if kind == "string":
+            return _Node("string", value[1:-1])
+        if kind == "ref":
+            return _Node("ref", value.strip())
+        if kind == "current":
+            return _Node("current")
+        if (kind, value) == ("op", "("):
+            node = self._binary(0)
+            self._expect(")")
+            return node
+        if kind == "name" and self._peek() == ("op", "("):
+            self.position += 1
+            args = []
+            if self._peek() != ("op", ")"):
+                args.append(self._binary(0))
+                while self._peek() == ("op", ","):
+                    self.position += 1
+                    args.append(self._binary(0))
+            self._expect(")")
+            return _Node("call", value, tuple(args))
+        raise XPathSyntaxError(f"unexpected {value or 'end of expression'!r}")
+
+
+def _regex_supported(pattern: str) -> bool:
+    """Return whether the Polars (Rust) regex engine accepts a pattern.
+
+    Returns:
+        bool: False for patterns relying on Python-only syntax, such as lookarounds.
+    """
+    try:
+        pl.select(pl.lit("").str.contains(pattern))
+    except Exception:
+        return False
+    return True
+
+
+class _Expression:
+    """An ODK XPath expression parsed once, compiled into Polars expressions on demand.
+
+    Supported syntax: `.` (the current answer), `${name}` references to other answers,
+    number and string literals, comparisons, `+ - * div mod`, `and`/`or`, and the
+    functions listed in `_ARITIES`.
+
+    Attributes:
+        text (str): The expression as written in the form.
+        references (frozenset[str]): Answers referenced with `${name}`.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self._tree = _Parser(text).parse()
+        self.references = frozenset(_references(self._tree))
+        # Check the function names and arguments once, before any data is seen
+        _compile(self._tree, None, pl.Schema())
+
+
+class Constraint(_Expression):
+    """An ODK constraint, validating the answers of a column."""
+
+    def to_expr(self, column: str, schema: pl.Schema) -> pl.Expr:
+        """Compile the constraint of `column` for a dataframe with `schema`.
+
+        Missing answers (and values that cannot be compared, e.g. text compared with a
+        number) never satisfy the constraint.
+
+        Args:
+            column (str): The constrained column, referenced by `.`.
+            schema (pl.Schema): Schema of the dataframe the expression is evaluated on.
+
+        Returns:
+            pl.Expr: True for the rows satisfying the constraint.
+        """
+        result = _compile(self._tree, column, schema)
+        return _as_boolean(result).fill_null(False) & pl.col(column).is_not_null()
+
+
+class Calculation(_Expression):
+    """An ODK `calculate` expression, computing the value of a column."""
+
+    def to_expr(self, schema: pl.Schema) -> pl.Expr:
+        """Compile the calculation for a dataframe with `schema`.
+
+        Results that are whole numbers by construction (integer answers and literals
+        combined with `+ - * mod`, `int()`, `round()` without decimals, counts and
+        booleans) are integers. Other numbers, e.g. `round(${x}, 1)` or the result of
+        `div`, are kept as floats, and text results as text. Missing answers, and
+        numbers that are not finite, are empty as in ODK.
+
+        Args:
+            schema (pl.Schema): Schema of the dataframe the expression is evaluated on.
+
+        Returns:
+            pl.Expr: The calculated value of each row.
+        """
+        result = _compile(self._tree, None, schema)
+        if result.type == "string":
+            return result.expr
+        value = _as_number(result)
+        if result.integral or result.type == "boolean":
+            return value.round(mode="half_away_from_zero").cast(pl.Int64, strict=False)
+        return pl.when(value.is_finite()).then(value)
+
+
+@lru_cache(maxsize=1024)
+def compile_constraint(text: str) -> Constraint:
+    """Parse an ODK constraint, reusing the result for identical constraints.
+
+    Returns:
+        Constraint: The parsed constraint.
+
+    Raises:
+        XPathSyntaxError: If the constraint is not supported.
+    """
+    return Constraint(text)
+
+
+@lru_cache(maxsize=1024)
+def compile_calculation(text: str) -> Calculation:
+    """Parse an ODK calculation, reusing the result for identical calculations.
+
+    Returns:
+        Calculation: The parsed calculation.
+
+    Raises:
+        XPathSyntaxError: If the calculation is not supported.
+    """
+    return Calculation(text)
+
+
+def _references(node: _Node) -> set[str]:
+    names = {str(node.value)} if node.kind == "ref" else set()
+    for arg in node.args:
+        names |= _references(arg)
+    return names
+
+
+def _column(name: str | None, schema: pl.Schema) -> _Typed:
+    """Type a column reference after its dtype.
+
+    Returns:
+        _Typed: The column, typed as number, boolean or string; missing columns are
+            empty strings.
+    """
+    dtype = schema.get(name) if name is not None else None
+    if dtype is None:
+        return _Typed(pl.lit(None, pl.String), "string")
+    if dtype.is_numeric():
+        return _Typed(pl.col(name).cast(pl.Float64), "number", dtype.is_integer())
+    if dtype == pl.Boolean:
+        return _Typed(pl.col(name), "boolean")
+    return _Typed(pl.col(name).cast(pl.String), "string")
+
+
+def _as_number(value: _Typed) -> pl.Expr:
+    if value.type == "string":
+        return value.expr.str.strip_chars().cast(pl.Float64, strict=False)
+    return value.expr.cast(pl.Float64)
+
+
+def _as_string(value: _Typed) -> pl.Expr:
+    if value.type == "number":
+        # XPath writes integral numbers without decimals
+        return (
+            pl.when(value.expr % 1 == 0)
+            .then(value.expr.cast(pl.Int64, strict=False).cast(pl.String))
+            .otherwise(value.expr.cast(pl.String))
+        )
+    if value.type == "boolean":
+        return pl.when(value.expr).then(pl.lit("true")).otherwise(pl.lit("false"))
+    return value.expr
+
+
+def _as_boolean(value: _Typed) -> pl.Expr:
+    if value.type == "number":
+        return (value.expr != 0) & ~value.expr.is_nan()
+    if value.type == "string":
+        return value.expr.str.len_chars() > 0
+    return value.expr
+
+
+def _non_empty(value: _Typed) -> pl.Expr:
+    """Return the value, with empty strings as null so they can be coalesced.
+
+    Returns:
+        pl.Expr: The value, null when empty.
+    """
+    if value.type != "string":
+        return value.expr
+    return pl.when(value.expr.str.len_chars() > 0).then(value.expr)
+
+
+def _string_literal(node: _Node, function: str) -> str:
+    if node.kind != "string":
+        raise XPathSyntaxError(f"{function}() expects a string literal")
+    return str(node.value)
+
+
+def _compile(node: _Node, column: str | None, schema: pl.Schema) -> _Typed:
+    """Compile a parsed expression into a typed Polars expression.
+
+    Returns:
+        _Typed: The compiled expression.
+    """
+    if node.kind == "current":
+        return _column(column, schema)
+    if node.kind == "ref":
+        return _column(str(node.value), schema)
+    if node.kind == "number":
+        value = float(node.value)  # type: ignore
+        return _Typed(pl.lit(value, pl.Float64), "number", value.is_integer())
+    if node.kind == "string":
+        return _Typed(pl.lit(node.value, pl.String), "string")
+
+    args = [_compile(arg, column, schema) for arg in node.args]
+    if node.kind == "call":
+        return _call(node, args)
+
+    operator = node.value
+    if operator == "neg":
+        return _Typed(-_as_number(args[0]), "number", args[0].integral)
+    left, right = args
+    if operator in ("and", "or"):
+        a, b = _as_boolean(left), _as_boolean(right)
+        return _Typed(a & b if operator == "and" else a | b, "boolean")
+    if operator in ("=", "!="):
+        types = {left.type, right.type}
+        if "boolean" in types:
+            a, b = _as_boolean(left), _as_boolean(right)
+        elif "number" in types:
+            a, b = _as_number(left), _as_number(right)
+        else:
+            a, b = _as_string(left), _as_string(right)
+        return _Typed(a == b if operator == "=" else a != b, "boolean")
+    a, b = _as_number(left), _as_number(right)
+    comparisons = {
+        "<": a < b,
+        "<=": a <= b,
+        ">": a > b,
+        ">=": a >= b,
+    }
+    if operator in comparisons:
+        # NaN compares greater than any number in Polars, never in XPath
+        return _Typed(comparisons[operator] & ~a.is_nan() & ~b.is_nan(), "boolean")
+    arithmetic = {"+": a + b, "-": a - b, "*": a * b, "div": a / b, "mod": a % b}
+    integral = operator != "div" and left.integral and right.integral
+    return _Typed(arithmetic[str(operator)], "number", integral)
+
+
+# Supported functions, with their minimum and maximum number of arguments
+_ARITIES = {
+    "regex": (2, 2),
+    "selected": (2, 2),
+    "count-selected": (1, 1),
+    "string-length": (1, 1),
+    "contains": (2, 2),
+    "starts-with": (2, 2),
+    "not": (1, 1),
+    "number": (1, 1),
+    "string": (1, 1),
+    "true": (0, 0),
+    "false": (0, 0),
+    "if": (3, 3),
+    "concat": (1, None),
+    "coalesce": (2, 2),
+    "int": (1, 1),
+    "round": (1, 2),
+    "abs": (1, 1),
+}
+
+
+def _call(node: _Node, args: list[_Typed]) -> _Typed:
+    """Compile a function call.
+
+    Returns:
+        _Typed: The compiled call.
+
+    Raises:
+        XPathSyntaxError: If the function is unknown or called with wrong arguments.
+    """
+    function = str(node.value)
+    if function not in _ARITIES:
+        raise XPathSyntaxError(f"unsupported function {function}()")
+    low, high = _ARITIES[function]
+    if len(args) < low or (high is not None and len(args) > high):
+        raise XPathSyntaxError(f"wrong number of arguments for {function}()")
+
+    if function == "regex":
+        return _regex(args[0], _string_literal(node.args[1], function))
+    if function in ("selected", "count-selected"):
+        choices = (
+            _as_string(args[0])
+            .str.strip_chars()
+            .str.split(" ")
+            .list.eval(pl.element().filter(pl.element().str.len_chars() > 0))
+        )
+        if function == "count-selected":
+            return _Typed(choices.list.len().cast(pl.Float64), "number", integral=True)
+        return _Typed(choices.list.contains(_string_literal(node.args[1], function)), "boolean")
+    if function == "string-length":
+        return _Typed(_as_string(args[0]).str.len_chars().cast(pl.Float64), "number", integral=True)
+    if function == "contains":
+        return _Typed(
+            _as_string(args[0]).str.contains(_as_string(args[1]), literal=True), "boolean"
+        )
+    if function == "starts-with":
+        return _Typed(_as_string(args[0]).str.starts_with(_as_string(args[1])), "boolean")
+    if function == "not":
+        return _Typed(~_as_boolean(args[0]), "boolean")
+    if function in ("number", "int", "abs", "round"):
+        return _number_function(node, args)
+    if function == "string":
+        return _Typed(_as_string(args[0]), "string")
+    if function == "if":
+        return _if(*args)
+    if function == "concat":
+        return _Typed(pl.concat_str([_as_string(arg).fill_null("") for arg in args]), "string")
+    if function == "coalesce":
+        if all(arg.type == "number" for arg in args):
+            integral = all(arg.integral for arg in args)
+            return _Typed(pl.coalesce([arg.expr for arg in args]), "number", integral)
+        return _Typed(
+            pl.coalesce([_non_empty(_Typed(_as_string(a), "string")) for a in args]), "string"
+        )
+    return _Typed(pl.lit(function == "true"), "boolean")
+
+
+def _number_function(node: _Node, args: list[_Typed]) -> _Typed:
+    """Compile `number()`, `int()`, `abs()` and `round()`.
+
+    Returns:
+        _Typed: The compiled call.
+
+    Raises:
+        XPathSyntaxError: If the number of decimals of `round()` is not a number literal.
+    """
+    function = str(node.value)
+    value = _as_number(args[0])
+    integral = args[0].integral
+    if function == "int":
+        # Truncated towards zero
+        value = value.cast(pl.Int64, strict=False).cast(pl.Float64)
+        integral = True
+    elif function == "abs":
+        value = value.abs()
+    elif function == "round":
+        decimals = 0
+        if len(node.args) == 2:
+            if node.args[1].kind != "number":
+                raise XPathSyntaxError("round() expects a number of decimals literal")
+            decimals = int(float(node.args[1].value))  # type: ignore
+        value = value.round(decimals, mode="half_away_from_zero")
+        integral = integral or decimals <= 0
+    return _Typed(value, "number", integral)
+
+
+def _if(condition: _Typed, then: _Typed, otherwise: _Typed) -> _Typed:
+    """Compile `if(condition, then, otherwise)`.
+
+    Returns:
+        _Typed: The compiled call, typed after its branches.
+    """
+    if then.type == otherwise.type:
+        branches, kind = (then.expr, otherwise.expr), then.type
+    else:
+        branches, kind = (_as_string(then), _as_string(otherwise)), "string"
+    expr = pl.when(_as_boolean(condition).fill_null(False)).then(branches[0])
+    return _Typed(expr.otherwise(branches[1]), kind, then.integral and otherwise.integral)
+
+
+def _regex(value: _Typed, pattern: str) -> _Typed:
+    """Compile `regex(value, pattern)`, matched at the start of the value like re.match.
+
+    Patterns the Polars regex engine does not support (e.g. lookarounds) are matched
+    in Python instead.
+
+    Returns:
+        _Typed: The compiled call.
+
+    Raises:
+        XPathSyntaxError: If the pattern is not a valid regular expression.
+    """
+    try:
+        compiled = re.compile(pattern)
+    except re.error as exc:
+        raise XPathSyntaxError(f"invalid regex {pattern!r}: {exc}") from exc
+    if _regex_supported(pattern):
+        return _Typed(_as_string(value).str.contains(f"^(?:{pattern})"), "boolean")
+    return _Typed(
+        _as_string(value).map_elements(
+            lambda text: compiled.match(text) is not None, return_dtype=pl.Boolean
+        ),
+        "boolean",
+    )
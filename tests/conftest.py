@@ -0,0 +1,223 @@
+import json
+import re
+import time
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass
+from pathlib import Path
+from types import SimpleNamespace
+from urllib.parse import urljoin, urlsplit
+
+import pipeline
+import polars as pl
+import pytest
+import requests
+from dry_run import RedirectAdapter, mount_dry_run
+from iaso_http import mount_resilient_adapter
+from iaso_io import SubmissionSource
+from metrics import RequestMetrics
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+IASO_URL = "http://iaso.test"
+FORM_ID = 1
+FORM_META = {
+    "form_id": "test_form",
+    "org_unit_type_ids": [1],
+    "latest_form_version": {"version_id": "2024010101"},
+}
+
+# Seconds the stub server waits before answering each request
+STUB_LATENCY = 0.02
+
+# A route answers a request with its status, body (bytes or JSON) and headers
+Route = Callable[[requests.PreparedRequest], tuple[int, object, dict[str, str]]]
+
+
+class ApiClient(requests.Session):
+    """Session sending relative URLs to the IASO server, like the toolbox API client.
+
+    As the toolbox client, it raises `requests.HTTPError` on error statuses.
+    """
+
+    def __init__(self, server_url: str):
+        super().__init__()
+        self.server_url = server_url
+        self.username = "user"
+        self.password = "password"
+
+    def request(self, method: str, url: str, *args: object, **kwargs: object) -> requests.Response:
+        """Send a request to the IASO server.
+
+        Returns:
+            requests.Response: The response, if its status is not an error.
+        """
+        response = super().request(method, urljoin(self.server_url, url), *args, **kwargs)
+        response.raise_for_status()
+        return response
+
+
+class FakeIASO:
+    """IASO client of the toolbox, without the login request of its constructor."""
+
+    def __init__(self, server_url: str = IASO_URL):
+        self.api_client = ApiClient(server_url)
+
+
+class RoutesAdapter(HTTPAdapter):
+    """Transport adapter answering requests in-process, by URL path."""
+
+    def __init__(self, routes: dict[str, Route]):
+        super().__init__()
+        self.routes = routes
+        self.requests: list[requests.PreparedRequest] = []
+
+    def send(self, request: requests.PreparedRequest, **kwargs: object) -> requests.Response:
+        """Answer the request with the route of its path.
+
+        Returns:
+            requests.Response: The response of the route, or a 404 response.
+        """
+        self.requests.append(request)
+        route = self.routes.get(urlsplit(request.url).path.rstrip("/"))
+        status, body, headers = route(request) if route else (404, {"detail": "Not found."}, {})
+        response = requests.Response()
+        response.status_code = status
+        response.headers = CaseInsensitiveDict(headers)
+        response._content = body if isinstance(body, bytes) else json.dumps(body).encode()
+        response.url = request.url or ""
+        response.request = request
+        return response
+
+
+@dataclass
+class SentRequest:
+    """Request sent to the stub server."""
+
+    endpoint: str
+    files: set[str]  # Names of the XML submissions referred to by the request
+    started_at: float
+    ended_at: float
+
+
+@pytest.fixture
+def files_path(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """Workspace files directory of the pipeline, in a temporary directory.
+
+    Returns:
+        Path: The directory.
+    """
+    monkeypatch.setattr(pipeline, "workspace", SimpleNamespace(files_path=str(tmp_path)))
+    return tmp_path
+
+
+@pytest.fixture
+def iaso() -> FakeIASO:
+    """IASO client whose form endpoint is answered in-process.
+
+    Write endpoints are left to the test, e.g. `dry_run.mount_dry_run`.
+
+    Returns:
+        FakeIASO: The client.
+    """
+    client = FakeIASO()
+    mount_resilient_adapter(client.api_client, retries=0)
+    client.api_client.mount(
+        f"{IASO_URL}/api/forms/",
+        RoutesAdapter({f"/api/forms/{FORM_ID}": lambda _request: (200, FORM_META, {})}),
+    )
+    return client
+
+
+@pytest.fixture
+def questions() -> pl.DataFrame:
+    """Survey sheet of the test form: one integer question with a constraint.
+
+    Returns:
+        pl.DataFrame: The questions.
+    """
+    return pl.DataFrame(
+        {
+            "type": ["integer", "text"],
+            "name": ["age", "comment"],
+            "required": [None, None],
+            "constraint": [". >= 0", None],
+        },
+        schema={name: pl.String for name in ("type", "name", "required", "constraint")},
+    )
+
+
+@pytest.fixture
+def stub_requests(iaso: FakeIASO) -> Iterator[RequestMetrics]:
+    """Send the write requests of `iaso` to a local `StubServer`, as a LOCAL_STUB dry run.
+
+    Yields:
+        RequestMetrics: The requests received by the stub server.
+    """
+    request_metrics = RequestMetrics()
+    server = mount_dry_run(
+        iaso.api_client, IASO_URL, "LOCAL_STUB", metrics=request_metrics, latency=STUB_LATENCY
+    )
+    yield request_metrics
+    server.close()
+
+
+@pytest.fixture
+def sent_requests(monkeypatch: pytest.MonkeyPatch) -> list[SentRequest]:
+    """Record the requests sent to the stub server, with the time they were in flight.
+
+    Returns:
+        list[SentRequest]: The requests, in the order their response was received.
+    """
+    sent = []
+    send = RedirectAdapter.send
+
+    def recording_send(
+        adapter: RedirectAdapter, request: requests.PreparedRequest, **kwargs: object
+    ) -> requests.Response:
+        started_at = time.perf_counter()
+        response = send(adapter, request, **kwargs)
+        body = request.body or b""
+        files = re.findall(r"[0-9a-f-]{36}\.xml", body if isinstance(body, str) else body.decode())
+        sent.append(
+            SentRequest(
+                f"{request.method} {urlsplit(request.url).path}",
+                set(files),
+                started_at,
+                time.perf_counter(),
+            )
+        )
+        return response
+
+    monkeypatch.setattr(RedirectAdapter, "send", recording_send)
+    return sent
+
+
+@pytest.fixture
+def push(
+    iaso: FakeIASO, questions: pl.DataFrame, files_path: Path
+) -> Callable[..., dict[str, int]]:
+    """Push submissions of the test form with `pipeline.push_submissions`.
+
+    Returns:
+        Callable[..., dict[str, int]]: Function pushing the given rows with an import
+            strategy and extra arguments of `push_submissions`, returning its summary.
+    """
+
+    def push_rows(rows: pl.DataFrame, import_strategy: str, **kwargs: object) -> dict[str, int]:
+        path = files_path / "submissions.csv"
+        rows.write_csv(path)
+        return pipeline.push_submissions(
+            iaso=iaso,
+            source=SubmissionSource(path, batch_size=kwargs.pop("read_batch_size", 4)),
+            questions=questions,
+            choices=pl.DataFrame(),
+            form_name="test_form",
+            form_id=FORM_ID,
+            app_id="test_app",
+            import_strategy=import_strategy,
+            output_directory=None,
+            strict_validation=True,
+            **kwargs,
+        )
+
+    return push_rows
@@ -0,0 +1,174 @@
+import time
+from collections.abc import Callable, Iterator
+from pathlib import Path
+
+import polars as pl
+import pytest
+from conftest import IASO_URL, STUB_LATENCY, FakeIASO, RoutesAdapter
+from dry_run import mount_dry_run
+from iaso_http import mount_resilient_adapter
+from journal import ImportJournal
+from metrics import RequestMetrics
+
+SUBMISSIONS = pl.DataFrame(
+    {
+        "id": [None, None, 11, 12],
+        "instanceID": [None, None, "uuid:a1", "uuid:b2"],
+        "org_unit_id": [101, 102, 103, 104],
+        "age": [30, 40, 50, 60],
+        "comment": ["new", "new", "edited", "edited"],
+    }
+)
+CREATED = SUBMISSIONS.filter(pl.col("id").is_null()).drop("id", "instanceID")
+UPDATED = SUBMISSIONS.filter(pl.col("id").is_not_null())
+
+
+@pytest.fixture(params=["LOCAL_STUB", "OFFLINE"])
+def stub(request: pytest.FixtureRequest, iaso: FakeIASO) -> Iterator[RequestMetrics | None]:
+    """Answer the write requests of `iaso` as each dry run mode does.
+
+    Yields:
+        RequestMetrics | None: The requests received by the stub server, None when the
+            requests are answered offline.
+    """
+    if request.param == "OFFLINE":
+        mount_dry_run(iaso.api_client, IASO_URL, "OFFLINE", latency=STUB_LATENCY)
+        yield None
+        return
+    request_metrics = RequestMetrics()
+    # Enketo submissions are sent to the stub server URL, through the IASO adapter
+    mount_resilient_adapter(iaso.api_client, retries=0, metrics=request_metrics)
+    server = mount_dry_run(
+        iaso.api_client, IASO_URL, "LOCAL_STUB", metrics=request_metrics, latency=STUB_LATENCY
+    )
+    yield request_metrics
+    server.close()
+
+
+def _assert_sent(stub: RequestMetrics | None, expected: dict[str, int]) -> None:
+    if stub is None:
+        return
+    sent = {name: endpoint["requests"] for name, endpoint in stub.summary().items()}
+    assert sent == {"POST /api/token/": 1, **expected}
+
+
+@pytest.mark.parametrize("mode", ["LOCAL_STUB", "OFFLINE"])
+def test_latency(iaso: FakeIASO, mode: str):
+    """Each request is answered after the latency of the stub."""
+    latency = 0.05
+    server = mount_dry_run(iaso.api_client, IASO_URL, mode, latency=latency)
+    try:
+        started_at = time.perf_counter()
+        for _ in range(2):
+            iaso.api_client.post("/api/token/")
+        elapsed = time.perf_counter() - started_at
+    finally:
+        if server is not None:
+            server.close()
+
+    assert elapsed >= 2 * latency
+
+
+def test_create(push: Callable[..., dict[str, int]], stub: RequestMetrics | None):
+    """New submissions are registered in bulk and uploaded."""
+    summary = push(CREATED, "CREATE")
+
+    assert (summary["imported"], summary["ignored"]) == (2, 0)
+    _assert_sent(stub, {"POST /api/instances": 1, "POST /sync/form_upload/": 2})
+
+
+def test_update(push: Callable[..., dict[str, int]], stub: RequestMetrics | None):
+    """Existing submissions are submitted again through Enketo and moved."""
+    summary = push(UPDATED, "UPDATE")
+
+    assert (summary["updated"], summary["ignored"]) == (2, 0)
+    _assert_sent(
+        stub,
+        {
+            "GET /api/instances/": 1,
+            "GET /api/enketo/edit/a1/": 1,
+            "POST /submission/stub": 2,
+            "PATCH /api/instances/{id}": 2,
+        },
+    )
+
+
+def test_create_and_update(push: Callable[..., dict[str, int]], stub: RequestMetrics | None):
+    """Rows without ID are created, the others updated."""
+    summary = push(SUBMISSIONS, "CREATE_AND_UPDATE")
+
+    assert (summary["imported"], summary["updated"], summary["ignored"]) == (2, 2, 0)
+    _assert_sent(
+        stub,
+        {
+            "POST /api/instances": 1,
+            "POST /sync/form_upload/": 2,
+            "GET /api/instances/": 1,
+            "GET /api/enketo/edit/a1/": 1,
+            "POST /submission/stub": 2,
+            "PATCH /api/instances/{id}": 2,
+        },
+    )
+
+
+def test_delete(push: Callable[..., dict[str, int]], stub: RequestMetrics | None):
+    """Submissions are deleted in bulk by ID."""
+    summary = push(UPDATED.select("id"), "DELETE")
+
+    assert (summary["deleted"], summary["ignored"]) == (2, 0)
+    _assert_sent(stub, {"POST /api/instances/bulkdelete/": 1})
+
+
+def test_resume_create_and_update(
+    push: Callable[..., dict[str, int]], stub: RequestMetrics | None, tmp_path: Path
+):
+    """A resumed import skips the rows created and updated by the interrupted one."""
+    journal_path = tmp_path / "journal.sqlite"
+    with ImportJournal(journal_path) as journal:
+        push(SUBMISSIONS[[0, 2]], "CREATE_AND_UPDATE", journal=journal)
+    with ImportJournal(journal_path, resume=True) as journal:
+        summary = push(SUBMISSIONS, "CREATE_AND_UPDATE", journal=journal)
+
+    assert (summary["skipped"], summary["imported"], summary["updated"]) == (2, 1, 1)
+
+
+@pytest.mark.parametrize("status", [404, 405])
+def test_delete_without_bulk_endpoint(
+    push: Callable[..., dict[str, int]], iaso: FakeIASO, status: int
+):
+    """Without the bulk endpoint, instances are deleted one by one for the rest of the run."""
+    mount_dry_run(iaso.api_client, IASO_URL, "OFFLINE")
+    bulk = RoutesAdapter({"/api/instances/bulkdelete": lambda _request: (status, {}, {})})
+    iaso.api_client.mount(f"{IASO_URL}/api/instances/bulkdelete/", bulk)
+
+    summary = push(pl.DataFrame({"id": [11, 12, 13, 14, 15]}), "DELETE", batch_size=2)
+
+    assert (summary["deleted"], summary["ignored"]) == (5, 0)
+    assert len(bulk.requests) == 1
+
+
+def test_delete_reports_partial_bulk_deletion(
+    push: Callable[..., dict[str, int]], iaso: FakeIASO, tmp_path: Path
+):
+    """Instances a bulk deletion reports as not deleted are ignored and retried on resume."""
+    mount_dry_run(iaso.api_client, IASO_URL, "OFFLINE")
+    bulk = RoutesAdapter(
+        {
+            "/api/instances/bulkdelete": lambda request: (
+                200,
+                {"deleted_count": 1 if b"13" in request.body else 2},
+                {},
+            )
+        }
+    )
+    iaso.api_client.mount(f"{IASO_URL}/api/instances/bulkdelete/", bulk)
+    journal_path = tmp_path / "journal.sqlite"
+    rows = pl.DataFrame({"id": [11, 12, 13, 14]})
+
+    with ImportJournal(journal_path) as journal:
+        summary = push(rows, "DELETE", batch_size=2, journal=journal)
+    with ImportJournal(journal_path, resume=True) as journal:
+        resumed = push(rows, "DELETE", batch_size=2, journal=journal)
+
+    assert (summary["deleted"], summary["ignored"]) == (3, 1)
+    assert (resumed["skipped"], resumed["deleted"]) == (2, 1)
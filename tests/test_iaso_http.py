@@ -0,0 +1,91 @@
+import contextlib
+import io
+from collections.abc import Callable
+
+import pytest
+import requests
+from iaso_http import ResilientAdapter
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import MaxRetryError, NewConnectionError, ProtocolError
+
+URL = "http://iaso.test/api/instances/"
+
+# Outcomes of the first attempt of a request, the next attempts succeed
+REFUSED = requests.ConnectionError(
+    MaxRetryError(None, URL, reason=NewConnectionError(None, "Connection refused"))
+)
+RESET = requests.ConnectionError(ProtocolError("Connection aborted."))
+CONNECT_TIMEOUT = requests.ConnectTimeout()
+READ_TIMEOUT = requests.ReadTimeout()
+
+
+@pytest.fixture
+def send(monkeypatch: pytest.MonkeyPatch) -> Callable[[str, object], int]:
+    """Send a request whose first attempt fails with a status code or an exception.
+
+    Returns:
+        Callable[[str, object], int]: Function sending a request with a method and the
+            outcome of its first attempt, returning the number of attempts.
+    """
+
+    def send_request(method: str, first_attempt: object) -> int:
+        attempts = []
+
+        def transport(
+            adapter: HTTPAdapter, request: requests.PreparedRequest, **kwargs: object
+        ) -> requests.Response:
+            attempts.append(request)
+            if isinstance(first_attempt, Exception) and len(attempts) == 1:
+                raise first_attempt
+            response = requests.Response()
+            response.status_code = first_attempt if len(attempts) == 1 else 200
+            response.raw = io.BytesIO()
+            response.request = request
+            return response
+
+        monkeypatch.setattr(HTTPAdapter, "send", transport)
+        session = requests.Session()
+        session.mount("http://", ResilientAdapter(retries=2, backoff_factor=0))
+        with contextlib.suppress(requests.RequestException):
+            session.request(method, URL)
+        return len(attempts)
+
+    return send_request
+
+
+@pytest.mark.parametrize("method", ["GET", "PUT", "DELETE"])
+@pytest.mark.parametrize(
+    "first_attempt", [429, 502, 503, 504, REFUSED, RESET, CONNECT_TIMEOUT, READ_TIMEOUT]
+)
+def test_idempotent_requests_are_retried(
+    send: Callable[[str, object], int], method: str, first_attempt: object
+):
+    """Idempotent requests are retried on every transient failure."""
+    assert send(method, first_attempt) == 2
+
+
+@pytest.mark.parametrize("method", ["POST", "PATCH"])
+@pytest.mark.parametrize(
+    ("first_attempt", "attempts"),
+    [
+        (429, 2),
+        (503, 2),
+        (REFUSED, 2),
+        (CONNECT_TIMEOUT, 2),
+        (502, 1),
+        (504, 1),
+        (RESET, 1),
+        (READ_TIMEOUT, 1),
+    ],
+)
+def test_non_idempotent_requests_are_retried_if_not_handled(
+    send: Callable[[str, object], int], method: str, first_attempt: object, attempts: int
+):
+    """POST and PATCH are only retried when the server cannot have handled them."""
+    assert send(method, first_attempt) == attempts
+
+
+def test_errors_are_not_retried(send: Callable[[str, object], int]):
+    """Client and server errors other than the transient ones are final."""
+    assert send("GET", 500) == 1
+    assert send("POST", 400) == 1
@@ -0,0 +1,59 @@
+from pathlib import Path
+
+import iaso_io
+import polars as pl
+import pytest
+from iaso_io import ROW_INDEX, SubmissionSource
+
+
+def _source(tmp_path: Path, df: pl.DataFrame, batch_size: int = 2) -> SubmissionSource:
+    path = tmp_path / "submissions.csv"
+    df.write_csv(path)
+    return SubmissionSource(path, batch_size=batch_size)
+
+
+def test_batches_number_rows_before_filtering(tmp_path: Path):
+    """Filtered batches keep the row number of each record in the file."""
+    source = _source(tmp_path, pl.DataFrame({"id": [None, 1, None, 2, 3]}))
+
+    batches = list(source.batches(pl.col("id").is_not_null()))
+
+    assert [len(batch) for batch in batches] == [2, 1]
+    assert pl.concat(batches)[ROW_INDEX].to_list() == [1, 3, 4]
+
+
+def test_check_fails_on_values_past_schema_inference(tmp_path: Path):
+    """A value that does not match the inferred type fails the check, not a late batch."""
+    ages = [str(age % 90) for age in range(10_000)] + ["unknown"]
+    source = _source(tmp_path, pl.DataFrame({"age": ages}), batch_size=1000)
+    assert source.schema["age"] == pl.Int64
+
+    with pytest.raises(ValueError, match="cannot be read"):
+        source.check()
+
+
+def test_check_applies_casts(tmp_path: Path):
+    """Values that cannot be cast to the registered types fail the check."""
+    source = _source(tmp_path, pl.DataFrame({"age": ["1", "2", "x"]}))
+    source.check()
+
+    source.cast({"age": pl.Int64})
+
+    with pytest.raises(ValueError, match="cannot be read"):
+        source.check()
+
+
+def test_large_excel_workbook_is_reported(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    """Excel workbooks are loaded as a whole, with a warning beyond the size limit."""
+    path = tmp_path / "submissions.xlsx"
+    path.write_bytes(b"x" * 100)
+    warnings = []
+    monkeypatch.setattr(iaso_io, "EXCEL_WARNING_BYTES", 10)
+    monkeypatch.setattr(iaso_io.current_run, "log_warning", warnings.append)
+    monkeypatch.setattr(pl, "read_excel", lambda *_args, **_kwargs: pl.DataFrame({"age": [1]}))
+
+    source = SubmissionSource(path)
+
+    assert source.height == 1
+    assert len(warnings) == 1
+    assert "loaded in memory as a whole" in warnings[0]
@@ -0,0 +1,46 @@
+from pathlib import Path
+
+from journal import ImportJournal
+
+ROW = {"org_unit_id": 1, "age": 30}
+
+
+def test_record_key_counts_identical_rows(tmp_path: Path):
+    """Identical rows get distinct keys, and the same keys in a later run."""
+    with ImportJournal(tmp_path / "journal.sqlite") as journal:
+        keys = [journal.record_key(ROW, "CREATE") for _ in range(2)]
+        other_mode = journal.record_key(ROW, "UPDATE")
+    with ImportJournal(tmp_path / "journal.sqlite", resume=True) as journal:
+        assert [journal.record_key(ROW, "CREATE") for _ in range(2)] == keys
+
+    assert keys[0] != keys[1]
+    assert other_mode not in keys
+
+
+def test_resume_skips_committed_rows(tmp_path: Path):
+    """Only committed rows are skipped on resume, pending rows keep their UUID."""
+    path = tmp_path / "journal.sqlite"
+    with ImportJournal(path, flush_every=1000) as journal:
+        imported, pending, ignored = (journal.record_key({"row": i}, "CREATE") for i in range(3))
+        journal.log(imported, "uuid-0", "pending", "CREATE")
+        journal.log(imported, "uuid-0", "imported", "CREATE")
+        journal.log(pending, "uuid-1", "pending", "CREATE")
+        journal.log(ignored, None, "ignored", "CREATE")
+
+    with ImportJournal(path, resume=True) as journal:
+        assert journal.is_committed(imported)
+        assert not journal.is_committed(pending)
+        assert not journal.is_committed(ignored)
+        assert journal.uuid_for(pending) == "uuid-1"
+        assert journal.uuid_for(ignored) is None
+
+
+def test_new_run_discards_the_journal(tmp_path: Path):
+    """A run that does not resume starts from an empty journal."""
+    path = tmp_path / "journal.sqlite"
+    with ImportJournal(path) as journal:
+        key = journal.record_key(ROW, "CREATE")
+        journal.log(key, "uuid-0", "imported", "CREATE")
+
+    with ImportJournal(path) as journal:
+        assert not journal.is_committed(key)
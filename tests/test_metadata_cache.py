@@ -0,0 +1,236 @@
+from collections.abc import Callable
+from pathlib import Path
+from types import SimpleNamespace
+
+import iaso_client
+import metadata_cache
+import polars as pl
+import pytest
+import requests
+from conftest import FORM_ID, FORM_META, IASO_URL, FakeIASO, RoutesAdapter
+from metadata_cache import FormMetadataCache, get_cached_form_metadata
+
+XLS_URL = "http://files.test/forms/form.xlsx"
+SHEETS = {
+    "questions": pl.DataFrame({"type": ["integer"], "name": ["age"]}),
+    "choices": pl.DataFrame({"list_name": ["yes_no"], "name": ["yes"], "label": ["Yes"]}),
+}
+# Form metadata as returned by `dataframe.get_form_metadata` of the toolbox
+TOOLBOX_METADATA = {
+    2024010101: {
+        "questions": {
+            "age": {"name": "age", "type": "integer", "label": "Age", "calculate": None},
+            "sick": {
+                "name": "sick",
+                "type": "select_one yes_no",
+                "label": "Sick",
+                "calculate": None,
+            },
+        },
+        "choices": {
+            "yes_no": [{"name": "yes", "label": "Yes"}, {"name": "no", "label": "No"}],
+        },
+    },
+    "draft": {
+        "questions": {
+            "age": {"name": "age", "type": "integer", "label": "Age", "calculate": None},
+        },
+        "choices": {},
+    },
+}
+
+
+class XLSFile:
+    """XLS file of the test form, served with an ETag and conditional requests."""
+
+    def __init__(self):
+        self.etag = '"v1"'
+        self.downloads = 0
+        self.revalidations = 0
+
+    def __call__(self, request: requests.PreparedRequest) -> tuple[int, object, dict[str, str]]:
+        """Answer a download of the file.
+
+        Returns:
+            tuple[int, object, dict[str, str]]: 304 if the file is unchanged, else 200.
+        """
+        if request.headers.get("If-None-Match") == self.etag:
+            self.revalidations += 1
+            return 304, b"", {"ETag": self.etag}
+        self.downloads += 1
+        return 200, f"xls {self.etag}".encode(), {"ETag": self.etag}
+
+
+@pytest.fixture
+def xls_file(iaso: FakeIASO) -> XLSFile:
+    """Serve the form of `iaso` with an XLS file.
+
+    Returns:
+        XLSFile: The served file.
+    """
+    form = {**FORM_META, "latest_form_version": {"version_id": "v1", "xls_file": XLS_URL}}
+    served = XLSFile()
+    iaso.api_client.mount(
+        f"{IASO_URL}/api/forms/",
+        RoutesAdapter({f"/api/forms/{FORM_ID}": lambda _request: (200, form, {})}),
+    )
+    iaso.api_client.mount("http://files.test/", RoutesAdapter({"/forms/form.xlsx": served}))
+    return served
+
+
+@pytest.fixture
+def parsed(monkeypatch: pytest.MonkeyPatch) -> list[bytes]:
+    """Parse every XLS file into `SHEETS`, without reading it.
+
+    Returns:
+        list[bytes]: The contents of the files parsed.
+    """
+    contents = []
+
+    def parse(content: bytes) -> dict[str, pl.DataFrame]:
+        contents.append(content)
+        return SHEETS
+
+    monkeypatch.setattr(iaso_client, "_parse_xlsform", parse)
+    return contents
+
+
+@pytest.fixture
+def load(iaso: FakeIASO, tmp_path: Path) -> Callable[[], iaso_client.FormMetadata]:
+    """Load the metadata of the test form, as a new run would.
+
+    Returns:
+        Callable[[], iaso_client.FormMetadata]: Function loading the metadata.
+    """
+
+    def load_metadata() -> iaso_client.FormMetadata:
+        # Results are also cached in memory for the rest of a run
+        iaso_client.load_form_metadata.cache_clear()
+        return iaso_client.load_form_metadata(iaso, FORM_ID, cache_dir=tmp_path / "cache")
+
+    return load_metadata
+
+
+def test_unchanged_file_is_revalidated(
+    load: Callable[[], iaso_client.FormMetadata], xls_file: XLSFile, parsed: list[bytes]
+):
+    """The file is downloaded and parsed once, then revalidated with its ETag."""
+    first = load()
+    second = load()
+
+    assert (xls_file.downloads, xls_file.revalidations) == (1, 1)
+    assert parsed == [b'xls "v1"']
+    for metadata in (first, second):
+        assert metadata.version_id == "v1"
+        assert metadata.questions.equals(SHEETS["questions"])
+        assert metadata.choices.equals(SHEETS["choices"])
+
+
+def test_changed_file_is_downloaded_again(
+    load: Callable[[], iaso_client.FormMetadata], xls_file: XLSFile, parsed: list[bytes]
+):
+    """A file with a new ETag is downloaded and parsed again."""
+    load()
+    xls_file.etag = '"v2"'
+    load()
+
+    assert (xls_file.downloads, xls_file.revalidations) == (2, 0)
+    assert parsed == [b'xls "v1"', b'xls "v2"']
+
+
+def test_cache_without_sheets_is_not_revalidated(tmp_path: Path):
+    """No conditional headers are sent when a cached sheet is missing."""
+    cache = FormMetadataCache(tmp_path)
+    response = requests.Response()
+    response.headers["ETag"] = '"v1"'
+    cache.store(FORM_ID, "v1", SHEETS, response)
+
+    assert cache.conditional_headers(FORM_ID, "v1", ("questions", "choices")) == {
+        "If-None-Match": '"v1"'
+    }
+    assert cache.conditional_headers(FORM_ID, "v1", ("questions", "settings")) == {}
+    assert cache.load(FORM_ID, "v1", ("settings",)) is None
+
+
+def test_form_without_choices(tmp_path: Path):
+    """A sheet without columns is cached as a marker and loaded as an empty frame."""
+    cache = FormMetadataCache(tmp_path)
+    response = requests.Response()
+    response.headers["ETag"] = '"v1"'
+    cache.store(FORM_ID, "v1", {**SHEETS, "choices": pl.DataFrame()}, response)
+
+    assert not list(tmp_path.rglob("choices.parquet"))
+    assert cache.conditional_headers(FORM_ID, "v1", ("questions", "choices"))
+    sheets = cache.load(FORM_ID, "v1", ("questions", "choices"))
+    assert sheets is not None
+    assert sheets["questions"].equals(SHEETS["questions"])
+    assert sheets["choices"].shape == (0, 0)
+
+
+@pytest.fixture
+def form_versions(iaso: FakeIASO) -> list[dict]:
+    """Serve the versions of the test form.
+
+    Returns:
+        list[dict]: The served versions, which can be changed.
+    """
+    versions = [
+        {"id": 1, "version_id": "2024010101", "updated_at": 1.0, "xls_file": f"{XLS_URL}?sig=a"}
+    ]
+    iaso.api_client.mount(
+        f"{IASO_URL}/api/formversions/",
+        RoutesAdapter(
+            {"/api/formversions": lambda _request: (200, {"form_versions": versions}, {})}
+        ),
+    )
+    return versions
+
+
+@pytest.fixture
+def toolbox(monkeypatch: pytest.MonkeyPatch) -> list[dict]:
+    """Answer `dataframe.get_form_metadata` with `TOOLBOX_METADATA`, or the last item added.
+
+    Returns:
+        list[dict]: The metadata returned, one item per call of the toolbox.
+    """
+    returned = []
+
+    def get_form_metadata(_iaso: FakeIASO, form_id: int) -> dict:
+        assert form_id == FORM_ID
+        returned.append(returned[-1] if returned else TOOLBOX_METADATA)
+        return returned[-1]
+
+    monkeypatch.setattr(
+        metadata_cache, "dataframe", SimpleNamespace(get_form_metadata=get_form_metadata)
+    )
+    return returned
+
+
+def test_toolbox_metadata_is_cached(
+    iaso: FakeIASO, form_versions: list[dict], toolbox: list[dict], tmp_path: Path
+):
+    """Toolbox metadata is restored from the cache until the form versions change."""
+    first = get_cached_form_metadata(iaso, FORM_ID, tmp_path)
+    # Signed URLs change between requests without changing the file
+    form_versions[0]["xls_file"] = f"{XLS_URL}?sig=b"
+    second = get_cached_form_metadata(iaso, FORM_ID, tmp_path)
+    form_versions[0]["updated_at"] = 2.0
+    get_cached_form_metadata(iaso, FORM_ID, tmp_path)
+
+    assert first == second == TOOLBOX_METADATA
+    assert list(second) == list(TOOLBOX_METADATA)
+    assert len(toolbox) == 2
+
+
+def test_toolbox_metadata_not_restored_exactly_is_not_cached(
+    iaso: FakeIASO, form_versions: list[dict], toolbox: list[dict], tmp_path: Path
+):
+    """Metadata whose questions do not share the same fields is fetched on every run."""
+    version = TOOLBOX_METADATA[2024010101]
+    toolbox.append({1: {**version, "questions": {"age": {"name": "age"}, "sick": {}}}})
+
+    get_cached_form_metadata(iaso, FORM_ID, tmp_path)
+    get_cached_form_metadata(iaso, FORM_ID, tmp_path)
+
+    assert len(toolbox) == 3
+    assert not list(tmp_path.rglob("*.parquet"))
@@ -0,0 +1,91 @@
+import random
+
+import pytest
+from metrics import LATENCY_BUCKET_RATIO, MAX_BUSY_SPANS, RequestMetrics, StageMetrics
+
+
+def test_stage_summary():
+    """Calls are counted and overlapping calls are not counted twice in the wall time."""
+    metrics = StageMetrics()
+    metrics.add("upload", 2.0, records=3, started_at=10.0, bytes_written=100)
+    metrics.add("upload", 2.0, records=2, started_at=11.0, failed=True)
+    metrics.add("upload", 1.0, records=1, started_at=20.0)
+
+    stage = metrics.summary()["upload"]
+
+    assert (stage["calls"], stage["failures"], stage["bytes"]) == (3, 1, 100)
+    assert (stage["records_in"], stage["records_out"]) == (6, 6)
+    assert (stage["cumulative_call_seconds"], stage["wall_seconds"]) == pytest.approx((5.0, 4.0))
+    assert stage["records_per_second"] == pytest.approx(1.5)
+    assert stage["max_ms"] == pytest.approx(2000.0)
+
+
+def test_records_out():
+    """Records produced by a call default to the records it received."""
+    metrics = StageMetrics()
+    with metrics.measure("validate", 10) as measurement:
+        measurement.records_out = 7
+    with metrics.measure("validate", 5):
+        pass
+
+    stage = metrics.summary()["validate"]
+
+    assert (stage["records_in"], stage["records_out"]) == (15, 12)
+
+
+def test_wall_time_of_long_calls():
+    """A call spanning earlier calls and idle gaps covers them once."""
+    metrics = StageMetrics()
+    for start in range(10):
+        metrics.add("render", 0.5, started_at=start)
+    metrics.add("render", 9.0, started_at=0.25)
+
+    assert metrics.summary()["render"]["wall_seconds"] == pytest.approx(9.5)
+
+
+def test_wall_time_is_bounded():
+    """Spans separated by idle gaps are folded beyond the latest ones, keeping the total."""
+    metrics = StageMetrics()
+    calls = 50 * MAX_BUSY_SPANS
+    for start in range(calls):
+        metrics.add("register", 0.5, started_at=start)
+
+    assert metrics.summary()["register"]["wall_seconds"] == pytest.approx(calls * 0.5)
+    assert len(metrics._stages["register"].busy.spans) == MAX_BUSY_SPANS
+
+
+def test_percentiles_are_close_to_nearest_rank():
+    """Percentiles read from the histogram are within a bucket of the exact ones."""
+    durations = [random.lognormvariate(-3, 1) for _ in range(5000)]
+    metrics = RequestMetrics()
+    for seconds in durations:
+        metrics.add("GET /api/instances/", 200, seconds)
+
+    endpoint = metrics.summary()["GET /api/instances/"]
+
+    ordered = sorted(durations)
+    for percentile in (50, 90, 99):
+        exact = ordered[round(percentile / 100 * len(ordered)) - 1] * 1000
+        assert exact <= endpoint[f"p{percentile}_ms"] <= exact * LATENCY_BUCKET_RATIO + 0.001
+    assert endpoint["max_ms"] == round(ordered[-1] * 1000, 3)
+    assert endpoint["total_seconds"] == pytest.approx(sum(durations), abs=1e-5)
+    assert sum(endpoint["histogram"].values()) == endpoint["requests"] == 5000
+
+
+def test_request_summary():
+    """Requests are counted per status and histogram bucket, slowest endpoints first."""
+    metrics = RequestMetrics()
+    metrics.add("POST /api/instances", 201, 0.03, bytes_sent=10)
+    metrics.add("POST /api/instances", 503, 0.3)
+    metrics.add("POST /api/instances", "ConnectTimeout", 12.0, retry=True)
+    metrics.add("GET /api/forms/{id}", 200, 0.0, bytes_received=5)
+
+    summary = metrics.summary()
+
+    assert list(summary) == ["POST /api/instances", "GET /api/forms/{id}"]
+    endpoint = summary["POST /api/instances"]
+    assert endpoint["statuses"] == {"201": 1, "503": 1, "ConnectTimeout": 1}
+    assert endpoint["histogram"] == {"<=50ms": 1, "<=500ms": 1, ">10000ms": 1}
+    assert (endpoint["requests"], endpoint["retries"], endpoint["bytes_sent"]) == (3, 1, 10)
+    assert endpoint["p50_ms"] == pytest.approx(300, rel=0.05)
+    assert summary["GET /api/forms/{id}"]["p99_ms"] == pytest.approx(0.0)
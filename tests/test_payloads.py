@@ -0,0 +1,78 @@
+import polars as pl
+from payloads import build_instance_payloads, normalize_instance_fields
+
+
+def test_normalize_without_instance_columns():
+    """Rows without any instance column still get one normalized row each."""
+    fields = normalize_instance_fields(pl.DataFrame({"age": [1, 2, 3]}))
+
+    assert fields.height == 3
+    assert fields["org_unit_id"].to_list() == [None] * 3
+    assert fields["accuracy"].to_list() == [0.0] * 3
+    assert fields["latitude"].to_list() == [None] * 3
+    assert fields["error"].to_list() == [None] * 3
+
+
+def test_normalize_reports_invalid_fields():
+    """Unparsable values, decimal org unit IDs and out-of-range coordinates are errors."""
+    df = pl.DataFrame(
+        {
+            "org_unit_id": ["12", "1.5", " ", "abc"],
+            "latitude": ["45.5", "91", None, "1"],
+            "longitude": ["-73", "0", "", "x"],
+        }
+    )
+
+    fields = normalize_instance_fields(df)
+
+    assert fields["org_unit_id"].to_list()[::2] == [12, None]
+    assert fields["latitude"].to_list() == [45.5, 91.0, 0.0, 1.0]
+    assert fields["longitude"].to_list() == [-73.0, 0.0, 0.0, 0.0]
+    assert fields["error"].to_list() == [
+        None,
+        "org_unit_id, latitude",
+        None,
+        "org_unit_id, longitude",
+    ]
+
+
+def test_create_payloads_require_an_org_unit():
+    """CREATE rows without a valid org unit have no payload and an error."""
+    df = pl.DataFrame({"org_unit_id": [7, None], "latitude": [1.0, 2.0], "longitude": [3.0, 4.0]})
+
+    payloads, errors = build_instance_payloads(df, form_id=5, mode="CREATE")
+
+    assert errors == [None, "org_unit_id"]
+    assert payloads[1] is None
+    assert payloads[0]["orgUnitId"] == 7
+    assert payloads[0]["formId"] == 5
+    assert (payloads[0]["latitude"], payloads[0]["longitude"]) == (1.0, 3.0)
+
+
+def test_update_payloads_without_org_unit():
+    """UPDATE rows without an org unit are not patched, and invalid coordinates are ignored."""
+    df = pl.DataFrame({"org_unit_id": ["7", None, "x"], "latitude": ["1", "100", "1"]})
+
+    payloads, errors = build_instance_payloads(df, form_id=5, mode="UPDATE")
+
+    assert errors == [None, None, "org_unit_id"]
+    assert payloads[0] == {
+        "org_unit": "7",
+        "formID": 5,
+        "accuracy": 0.0,
+        "altitude": 0.0,
+        "latitude": 1.0,
+        "longitude": None,
+    }
+    assert payloads[1:] == [None, None]
+
+
+def test_update_payloads_with_falsy_org_unit():
+    """UPDATE rows with a blank or 0 org unit ID are not patched, without error."""
+    df = pl.DataFrame({"org_unit_id": ["0", "", "7"], "latitude": ["100", "100", "1"]})
+
+    payloads, errors = build_instance_payloads(df, form_id=5, mode="UPDATE")
+
+    assert errors == [None, None, None]
+    assert payloads[:2] == [None, None]
+    assert payloads[2]["org_unit"] == "7"
@@ -0,0 +1,122 @@
+from collections.abc import Callable
+from itertools import accumulate
+from pathlib import Path
+
+import pipeline
+import polars as pl
+import pytest
+from conftest import SentRequest
+from journal import ImportJournal
+from metrics import RequestMetrics
+
+UPLOAD = "POST /sync/form_upload/"
+REGISTER = "POST /api/instances"
+
+
+def _requests(request_metrics: RequestMetrics) -> dict[str, int]:
+    return {name: endpoint["requests"] for name, endpoint in request_metrics.summary().items()}
+
+
+def _peak_in_flight(sent: list[SentRequest]) -> int:
+    # Requests ending when others start are not counted as overlapping
+    events = sorted([(r.started_at, 1) for r in sent] + [(r.ended_at, -1) for r in sent])
+    return max(accumulate(delta for _, delta in events), default=0)
+
+
+def _submissions(n: int) -> pl.DataFrame:
+    return pl.DataFrame(
+        {
+            "org_unit_id": [100 + i for i in range(n)],
+            "age": [20 + i for i in range(n)],
+            "comment": [f"visit {i}" for i in range(n)],
+        }
+    )
+
+
+def test_create_pushes_concurrently(
+    push: Callable[..., dict[str, int]],
+    stub_requests: RequestMetrics,
+    sent_requests: list[SentRequest],
+):
+    """Valid rows are registered in batches and uploaded concurrently, invalid rows ignored."""
+    rows = _submissions(10).with_columns(
+        age=pl.when(pl.col("org_unit_id") == 103).then(-1).otherwise(pl.col("age")),
+        org_unit_id=pl.when(pl.col("org_unit_id") == 105).then(None).otherwise("org_unit_id"),
+    )
+
+    summary = push(rows, "CREATE", max_workers=4, batch_size=3)
+
+    assert summary["imported"] == 8
+    assert summary["ignored"] == 2
+    requests = _requests(stub_requests)
+    assert requests[UPLOAD] == 8
+    # The instances are registered in bulk, at most 3 per request
+    assert 3 <= requests[REGISTER] < 8
+
+    # The stub answers after a delay, so the uploads of the 4 workers overlap
+    uploads = [r for r in sent_requests if r.endpoint == UPLOAD]
+    assert 1 < _peak_in_flight(uploads) <= 4
+    # Each submission is uploaded once its instance is registered
+    registered_at = {
+        file: r.ended_at for r in sent_requests if r.endpoint == REGISTER for file in r.files
+    }
+    assert len(registered_at) == 8
+    for upload in uploads:
+        (file,) = upload.files
+        assert registered_at[file] <= upload.started_at
+
+
+def test_create_resume_skips_committed_rows(
+    push: Callable[..., dict[str, int]], stub_requests: RequestMetrics, tmp_path: Path
+):
+    """A resumed import only pushes the rows not committed by the interrupted one."""
+    rows = _submissions(6)
+    journal_path = tmp_path / "journal.sqlite"
+    with ImportJournal(journal_path) as journal:
+        first = push(rows.head(4), "CREATE", journal=journal)
+    uploaded = _requests(stub_requests)[UPLOAD]
+
+    with ImportJournal(journal_path, resume=True) as journal:
+        resumed = push(rows, "CREATE", journal=journal, max_workers=2)
+
+    assert first["imported"] == 4
+    assert resumed["skipped"] == 4
+    assert resumed["imported"] == 2
+    assert _requests(stub_requests)[UPLOAD] - uploaded == 2
+
+
+def test_create_and_update_reports_file_rows(
+    push: Callable[..., dict[str, int]],
+    stub_requests: RequestMetrics,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    """Rows of each partition are reported with their row number in the file."""
+    errors = []
+    monkeypatch.setattr(pipeline.current_run, "log_error", errors.append)
+    rows = pl.DataFrame(
+        {
+            "id": [11, None, 12, None],
+            "instanceID": ["uuid:a1", None, "uuid:b2", None],
+            "org_unit_id": [101, 102, 103, 104],
+            "latitude": [1.0, 1.0, 1.0, 100.0],
+            "age": [30, 40, 50, 60],
+        }
+    )
+
+    summary = push(rows, "CREATE_AND_UPDATE", read_batch_size=1)
+
+    assert (summary["imported"], summary["updated"], summary["ignored"]) == (1, 2, 1)
+    assert "Invalid latitude for row 3, skipping" in errors
+
+
+def test_unreadable_file_fails_before_pushing(
+    push: Callable[..., dict[str, int]], stub_requests: RequestMetrics
+):
+    """A value that cannot be parsed fails the import before any request is sent."""
+    ages = [str(age % 90) for age in range(10_000)] + ["unknown"]
+    rows = pl.DataFrame({"org_unit_id": "101", "age": ages})
+
+    with pytest.raises(ValueError, match="cannot be read"):
+        push(rows, "CREATE", read_batch_size=1000)
+
+    assert stub_requests.summary() == {}
@@ -0,0 +1,112 @@
+import polars as pl
+import pytest
+from xpath import XPathSyntaxError, compile_calculation, compile_constraint
+
+
+def _constraint(text: str, values: list) -> list[bool]:
+    df = pl.DataFrame({"value": values})
+    return df.select(compile_constraint(text).to_expr("value", df.schema))["value"].to_list()
+
+
+def _calculation(text: str, df: pl.DataFrame) -> list:
+    # with_columns broadcasts constant calculations, as when they are added to a batch
+    result = compile_calculation(text).to_expr(df.schema).alias("result")
+    return df.with_columns(result)["result"].to_list()
+
+
+# Constraints the pipeline checked before they were compiled, with the results it gave
+@pytest.mark.parametrize(
+    ("constraint", "values", "expected"),
+    [
+        (".>=0", [5, -1, 0, None], [True, False, True, False]),
+        (".<=120", [5, 120, 121, None], [True, True, False, False]),
+        (".>=1.5", ["2", " 1.5", "1", "x", None], [True, True, False, False, False]),
+        ("regex(., '^[A-Z]{2}\\d+$')", ["AB12", "ab12", "AB", None], [True, False, False, False]),
+        # Matched at the start of the value, as re.match
+        ("regex(., '[0-9]+')", ["12a", "a12"], [True, False]),
+    ],
+)
+def test_constraint_matches_previous_checks(constraint: str, values: list, expected: list):
+    """Compiled constraints agree with the checks the pipeline made row by row."""
+    assert _constraint(constraint, values) == expected
+
+
+def test_constraint_operators():
+    """Constraints combine comparisons, boolean operators and functions."""
+    values = [3, 12, -4, None]
+
+    assert _constraint(". > 0 and . < 10", values) == [True, False, False, False]
+    assert _constraint(". = 3 or . mod 4 = 0", values) == [True, True, True, False]
+    assert _constraint("not(. > 0)", values) == [False, False, True, False]
+
+
+def test_constraint_with_lookaround_regex():
+    """Patterns the Polars engine does not support are matched in Python."""
+    assert _constraint("regex(., '(?!0)\\d+')", ["12", "012"]) == [True, False]
+
+
+def test_unsupported_syntax():
+    """Unknown functions and malformed expressions are rejected when compiled."""
+    with pytest.raises(XPathSyntaxError):
+        compile_constraint("jr:choice-name(., 'list')")
+    with pytest.raises(XPathSyntaxError):
+        compile_calculation("${a} +")
+
+
+# Calculations the pipeline evaluated before they were compiled, with the results it gave
+@pytest.mark.parametrize(
+    ("calculation", "expected"),
+    [
+        ("${a} + ${b}", [9, -1, None]),
+        ("round(${a} div 3, 0)", [2, -1, None]),
+        ("abs(${a} - ${b})", [5, 7, None]),
+        ("coalesce(${a}, 0)", [7, -4, 0]),
+        ("0", [0, 0, 0]),
+    ],
+)
+def test_calculation_matches_previous_results(calculation: str, expected: list):
+    """Compiled calculations agree with the results of the evaluated Polars strings."""
+    df = pl.DataFrame({"a": [7, -4, None], "b": [2, 3, 1]})
+
+    assert _calculation(calculation, df) == expected
+
+
+def test_calculation_text_results():
+    """Text calculations are kept as text, numbers are written without decimals."""
+    df = pl.DataFrame({"a": [7, None], "name": ["Ada", "Bob"]})
+
+    assert _calculation("concat(${name}, '-', ${a})", df) == ["Ada-7", "Bob-"]
+    assert _calculation("if(${a} > 5, 'big', 'small')", df) == ["big", "small"]
+
+
+def test_calculation_result_types():
+    """Only whole numbers by construction are cast to integers, other numbers stay floats."""
+    df = pl.DataFrame({"a": [7, -4, None], "b": [2, 3, 1], "x": [2.46, 0.5, 1.0]})
+
+    def calculated(text: str) -> pl.Series:
+        return df.with_columns(compile_calculation(text).to_expr(df.schema).alias("r"))["r"]
+
+    integers = {
+        "${a} * 2 - ${b} mod 2": [14, -9, None],
+        "int(${x} * 10)": [24, 5, 10],
+        "round(${x})": [2, 1, 1],
+        "round(${a} div ${b}, 0)": [4, -1, None],
+        "if(${a} > 0, ${a}, 0)": [7, 0, 0],
+        "count-selected('a b c')": [3, 3, 3],
+        "${a} > 0": [1, 0, None],
+    }
+    for text, expected in integers.items():
+        result = calculated(text)
+        assert (result.dtype, result.to_list()) == (pl.Int64, expected), text
+
+    floats = {
+        "round(${x}, 1)": [2.5, 0.5, 1.0],
+        "${a} div ${b}": [3.5, -4 / 3, None],
+        "${x} + 1": [3.46, 1.5, 2.0],
+        "${a} + 0.5": [7.5, -3.5, None],
+        "${b} div 0": [None, None, None],
+    }
+    for text, expected in floats.items():
+        result = calculated(text)
+        assert result.dtype == pl.Float64, text
+        assert result.to_list() == pytest.approx(expected, nan_ok=True), text